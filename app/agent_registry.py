@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from .store import MemoryStore, utc_now
+
+
+DEFAULT_REGISTRY = {
+    "max_live": 500,
+    "max_running": 2000,
+    "max_age_seconds": 3600,
+    "flush_batch": 50,
+    "flush_interval": 2.0,
+}
+
+
+@dataclass(slots=True)
+class AgentStatus:
+    agent_id: str
+    parent_id: str | None
+    role: str
+    task: str
+    status: str
+    task_id: str
+    output: str | None = None
+    token_usage: int = 0
+    started_at: str = field(default_factory=lambda: utc_now().isoformat())
+    ended_at: str | None = None
+
+
+class AgentRegistry:
+    def __init__(self, store: MemoryStore, settings: dict[str, Any] | None = None):
+        self.store = store
+        self.max_live = DEFAULT_REGISTRY["max_live"]
+        self.max_running = DEFAULT_REGISTRY["max_running"]
+        self.max_age_seconds = DEFAULT_REGISTRY["max_age_seconds"]
+        self.flush_batch = DEFAULT_REGISTRY["flush_batch"]
+        self.flush_interval = DEFAULT_REGISTRY["flush_interval"]
+        self._live: OrderedDict[str, AgentStatus] = OrderedDict()
+        self._running: OrderedDict[str, None] = OrderedDict()
+        self._finished: deque[tuple[float, str]] = deque()
+        self._pending: list[AgentStatus] = []
+        self._archived = 0
+        self._evicted_running = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.configure(settings or {})
+
+    def configure(self, settings: dict[str, Any]) -> None:
+        merged = dict(DEFAULT_REGISTRY, **settings)
+        self.max_live = max(1, int(merged["max_live"]))
+        self.max_running = max(1, int(merged["max_running"]))
+        self.max_age_seconds = float(merged["max_age_seconds"])
+        self.flush_batch = max(1, int(merged["flush_batch"]))
+        self.flush_interval = max(0.1, float(merged["flush_interval"]))
+
+    def add(self, agent: AgentStatus) -> None:
+        with self._lock:
+            self._live[agent.agent_id] = agent
+            if agent.status == "running":
+                self._running[agent.agent_id] = None
+            evicted = self._evict(time.time())
+            due = evicted or len(self._pending) >= self.flush_batch
+        if due:
+            self._flush_due()
+
+    def get(self, agent_id: str) -> AgentStatus | None:
+        with self._lock:
+            return self._live.get(agent_id)
+
+    def finished(self, agent: AgentStatus) -> None:
+        with self._lock:
+            self._running.pop(agent.agent_id, None)
+            self._finished.append((time.time(), agent.agent_id))
+            self._pending.append(agent)
+            due = len(self._pending) >= self.flush_batch
+        if due:
+            self._flush_due()
+
+    def _flush_due(self) -> None:
+        # With the flusher running, callers (often on the event loop) never wait for the archive write.
+        if self._thread is not None:
+            self._wake.set()
+        else:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+            self.store.archive_agents([asdict(a) for a in batch])
+            with self._lock:
+                # Pending agents stay visible to snapshots until their archive rows are committed.
+                del self._pending[: len(batch)]
+                self._archived += len(batch)
+            return len(batch)
+
+    def _evict(self, now: float) -> int:
+        live = len(self._live)
+        while self._finished and (
+            len(self._live) > self.max_live or now - self._finished[0][0] > self.max_age_seconds
+        ):
+            _, agent_id = self._finished.popleft()
+            self._live.pop(agent_id, None)
+        while len(self._running) > self.max_running:
+            # Running agents are bounded separately; the oldest is archived as evicted rather than grow the map.
+            agent_id, _ = self._running.popitem(last=False)
+            agent = self._live.pop(agent_id, None)
+            if agent is not None:
+                agent.status = "evicted"
+                agent.ended_at = utc_now().isoformat()
+                self._pending.append(agent)
+                self._evicted_running += 1
+        return live - len(self._live)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="agent-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout=5)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # noqa: BLE001
+                continue
+
+    def snapshot(
+        self,
+        task_id: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int = 200,
+        offset: int = 0,
+    ) -> dict[str, Any]:
+        with self._lock:
+            self._evict(time.time())
+            visible = {a.agent_id: a for a in self._pending}
+            visible.update(self._live)
+            live = [
+                asdict(a)
+                for a in visible.values()
+                if (task_id is None or a.task_id == task_id)
+                and (since is None or a.started_at >= since)
+                and (until is None or a.started_at < until)
+            ]
+            live_count = len(self._live)
+        live_ids = {a["agent_id"] for a in live}
+        rows = self.store.archived_agents(task_id=task_id, since=since, until=until, limit=limit + offset + len(live_ids))
+        archived = [a for a in rows if a["agent_id"] not in live_ids]
+        merged = sorted(live + archived, key=lambda a: (a["started_at"], a["agent_id"]), reverse=True)
+        return {
+            "agents": merged[offset : offset + limit],
+            "limit": limit,
+            "offset": offset,
+            "has_more": len(merged) > offset + limit,
+            "live": live_count,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            running = len(self._running)
+            return {
+                "live": len(self._live),
+                "running": running,
+                "evicted_running": self._evicted_running,
+                "pending_archive": len(self._pending),
+                "archived": self._archived,
+                "max_live": self.max_live,
+                "max_running": self.max_running,
+                "max_age_seconds": self.max_age_seconds,
+            }
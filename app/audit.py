@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from .store import MemoryStore, utc_now
+
+
+DEFAULT_AUDIT = {
+    "verify_interval": 30.0,
+    "full_verify_interval": 86400.0,
+    "chunk_size": 1000,
+    "chunk_pause": 0.01,
+    "checkpoint_every": 1000,
+}
+
+
+class AuditMonitor:
+    def __init__(self, store: MemoryStore, settings: dict[str, Any] | None = None):
+        self.store = store
+        self.verify_interval = DEFAULT_AUDIT["verify_interval"]
+        self.full_verify_interval = DEFAULT_AUDIT["full_verify_interval"]
+        self.chunk_size = DEFAULT_AUDIT["chunk_size"]
+        self.chunk_pause = DEFAULT_AUDIT["chunk_pause"]
+        self.checkpoint_every = DEFAULT_AUDIT["checkpoint_every"]
+        self._state: dict[str, Any] = {"ok": None, "mode": None, "checked_at": None}
+        self._last_full: dict[str, Any] | None = None
+        self._next_full = 0.0
+        self._lock = threading.Lock()
+        self._verify_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.configure(settings or {})
+
+    def configure(self, settings: dict[str, Any]) -> None:
+        merged = dict(DEFAULT_AUDIT, **settings)
+        self.verify_interval = max(0.1, float(merged["verify_interval"]))
+        self.full_verify_interval = max(0.0, float(merged["full_verify_interval"]))
+        self.chunk_size = max(1, int(merged["chunk_size"]))
+        self.chunk_pause = max(0.0, float(merged["chunk_pause"]))
+        self.checkpoint_every = max(1, int(merged["checkpoint_every"]))
+
+    def verify(self, full: bool = False) -> dict[str, Any]:
+        with self._verify_lock:
+            started = time.perf_counter()
+            result = self.store.verify_audit_chain(
+                full=full,
+                chunk_size=self.chunk_size,
+                pause=self.chunk_pause if full else 0.0,
+                checkpoint_every=self.checkpoint_every,
+            )
+            result["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            result["checked_at"] = utc_now().isoformat()
+        with self._lock:
+            # A passing incremental run must not hide a broken full run until the next full pass.
+            if full or self._last_full is None or self._last_full["ok"]:
+                self._state = result
+            if full:
+                self._last_full = result
+        return result
+
+    def state(self) -> dict[str, Any]:
+        with self._lock:
+            state = dict(self._state)
+            if self._last_full is not None:
+                state["last_full"] = {k: self._last_full.get(k) for k in ("ok", "count", "broken_at", "checked_at")}
+        if state["ok"] is None:
+            return self.verify()
+        return state
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._next_full = time.monotonic() + self.full_verify_interval if self.full_verify_interval else 0.0
+        self._thread = threading.Thread(target=self._run, name="audit-verify", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            full = bool(self.full_verify_interval) and time.monotonic() >= self._next_full
+            try:
+                self.verify(full=full)
+            except Exception:  # noqa: BLE001
+                pass
+            if full:
+                self._next_full = time.monotonic() + self.full_verify_interval
+            self._wake.wait(self.verify_interval)
+            self._wake.clear()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+from typing import Any, Callable
+
+from .orchestrator import Orchestrator, new_task_id
+from .store import MemoryStore, utc_now
+
+
+DEFAULT_CHAT_JOBS = {
+    "workers": 4,
+    "retention_seconds": 86400,
+    "max_wait": 60.0,
+}
+
+TERMINAL = {"done", "failed"}
+
+
+class ChatJobQueue:
+    def __init__(
+        self,
+        store: MemoryStore,
+        orchestrator: Callable[[], Orchestrator],
+        settings: dict[str, Any] | None = None,
+    ):
+        self.store = store
+        self.orchestrator = orchestrator
+        self.workers = DEFAULT_CHAT_JOBS["workers"]
+        self.retention_seconds = float(DEFAULT_CHAT_JOBS["retention_seconds"])
+        self.max_wait = float(DEFAULT_CHAT_JOBS["max_wait"])
+        self._queue: asyncio.Queue[str] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+        self._busy: set[int] = set()
+        self._waiters: dict[str, asyncio.Event] = {}
+        self.configure(settings or {})
+
+    def configure(self, settings: dict[str, Any]) -> None:
+        merged = dict(DEFAULT_CHAT_JOBS, **settings)
+        self.workers = max(1, int(merged["workers"]))
+        self.retention_seconds = float(merged["retention_seconds"])
+        self.max_wait = float(merged["max_wait"])
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            # PUT /config runs in the threadpool; worker tasks may only be touched from their loop.
+            loop.call_soon_threadsafe(self._resize)
+
+    def _resize(self) -> None:
+        if self._queue is None:
+            return
+        for index in range(self.workers):
+            if index not in self._tasks:
+                self._tasks[index] = asyncio.create_task(self._worker(index))
+        for index in [i for i in self._tasks if i >= self.workers and i not in self._busy]:
+            self._tasks.pop(index).cancel()
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        await asyncio.to_thread(self.store.purge_chat_jobs)
+        for job in await asyncio.to_thread(self.store.pending_chat_jobs):
+            await asyncio.to_thread(self.store.update_chat_job, job["task_id"], status="queued")
+            self._queue.put_nowait(job["task_id"])
+        self._resize()
+
+    async def stop(self) -> None:
+        tasks, self._tasks = list(self._tasks.values()), {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._busy.clear()
+        self._queue = None
+        self._loop = None
+
+    def submit(self, session_id: str, text: str, use_cache: bool = True) -> dict[str, Any]:
+        queue, loop = self._queue, self._loop
+        if queue is None or loop is None:
+            raise RuntimeError("chat job workers are not running")
+        task_id = new_task_id()
+        job = self.store.create_chat_job(task_id, session_id, text, use_cache, self.retention_seconds)
+        # The HTTP handler runs in the threadpool; asyncio.Queue may only be touched from its own loop.
+        loop.call_soon_threadsafe(queue.put_nowait, task_id)
+        return job
+
+    def get(self, task_id: str) -> dict[str, Any] | None:
+        return self.store.get_chat_job(task_id)
+
+    async def wait(self, task_id: str, timeout: float) -> dict[str, Any] | None:
+        job = await asyncio.to_thread(self.get, task_id)
+        if job is None or job["status"] in TERMINAL:
+            return job
+        event = self._waiters.setdefault(task_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=max(0.0, min(timeout, self.max_wait)))
+        except asyncio.TimeoutError:
+            pass
+        return await asyncio.to_thread(self.get, task_id)
+
+    async def _worker(self, index: int) -> None:
+        queue = self._queue
+        assert queue is not None
+        while index < self.workers:
+            task_id = await queue.get()
+            self._busy.add(index)
+            try:
+                await self._run(task_id)
+            finally:
+                self._busy.discard(index)
+                queue.task_done()
+        if self._tasks.get(index) is asyncio.current_task():
+            del self._tasks[index]
+
+    async def _run(self, task_id: str) -> None:
+        job = await asyncio.to_thread(self.get, task_id)
+        if job is None or job["status"] in TERMINAL:
+            return
+        stages: list[dict[str, Any]] = []
+        writer: asyncio.Task[None] | None = None
+
+        async def write_stages() -> None:
+            written = 0
+            while written < len(stages):
+                snapshot = list(stages)
+                await asyncio.to_thread(self.store.update_chat_job, task_id, stages=snapshot)
+                written = len(snapshot)
+                self._notify(task_id)
+
+        def on_stage(stage: dict[str, Any]) -> None:
+            nonlocal writer
+            stages.append(stage)
+            # Called on the loop by the pipeline; one writer task drains stage updates in order.
+            if writer is None or writer.done():
+                writer = asyncio.create_task(write_stages())
+
+        await asyncio.to_thread(self.store.update_chat_job, task_id, status="running")
+        try:
+            result = await self.orchestrator().aprocess_user_message(
+                job["session_id"], job["text"], use_cache=job["use_cache"], task_id=task_id, on_stage=on_stage
+            )
+        except Exception as exc:  # noqa: BLE001
+            update = {"status": "failed", "error": str(exc)}
+        else:
+            update = {"status": "done", "result": result}
+        if writer is not None:
+            await asyncio.gather(writer, return_exceptions=True)
+        await asyncio.to_thread(self.store.update_chat_job, task_id, expires_at=self._expires_at(), **update)
+        self._notify(task_id)
+        await asyncio.to_thread(self.store.purge_chat_jobs)
+
+    def _expires_at(self) -> str:
+        return (utc_now() + timedelta(seconds=self.retention_seconds)).isoformat()
+
+    def _notify(self, task_id: str) -> None:
+        event = self._waiters.pop(task_id, None)
+        if event is not None:
+            event.set()
@@ -1,19 +1,103 @@
 from __future__ import annotations
 
+import copy
 import json
+import os
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 
+def _readonly(self: Any, *args: Any, **kwargs: Any) -> None:
+    raise TypeError("config snapshots are read-only; use ConfigManager.load() for a mutable copy")
+
+
+class FrozenDict(dict):
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self) -> dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> dict[str, Any]:
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+
+class FrozenList(list):
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __copy__(self) -> list[Any]:
+        return list(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> list[Any]:
+        return [copy.deepcopy(value, memo) for value in self]
+
+
+def freeze(value: Any) -> Any:
+    # Subclasses keep isinstance checks and JSON encoding working while shared readers cannot mutate the snapshot.
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    version: int
+    data: dict[str, Any]
+    signature: tuple[int, int]
+
+
 class ConfigManager:
-    def __init__(self, path: Path):
+    def __init__(self, path: Path, check_interval: float = 1.0):
         self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot: ConfigSnapshot | None = None
+        self._checked_at = 0.0
+
+    def _signature(self) -> tuple[int, int]:
+        st = self.path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    def snapshot(self) -> ConfigSnapshot:
+        snap = self._snapshot
+        now = time.monotonic()
+        if snap is not None and now - self._checked_at < self.check_interval:
+            return snap
+
+        with self._lock:
+            signature = self._signature()
+            if self._snapshot is None or self._snapshot.signature != signature:
+                data = freeze(json.loads(self.path.read_text(encoding="utf-8")))
+                version = self._snapshot.version + 1 if self._snapshot else 1
+                self._snapshot = ConfigSnapshot(version=version, data=data, signature=signature)
+            self._checked_at = now
+            return self._snapshot
+
+    def current(self) -> dict[str, Any]:
+        return self.snapshot().data
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
 
     def load(self) -> dict[str, Any]:
-        return json.loads(self.path.read_text(encoding="utf-8"))
+        return copy.deepcopy(self.current())
 
     def save(self, data: dict[str, Any]) -> None:
-        self.path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        frozen = freeze(copy.deepcopy(data))
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with self._lock:
+            tmp.write_text(json.dumps(frozen, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            self._snapshot = ConfigSnapshot(version=version, data=frozen, signature=self._signature())
+            self._checked_at = time.monotonic()
 
     def validate(self, data: dict[str, Any]) -> tuple[bool, str]:
         if not isinstance(data, dict):
@@ -26,9 +110,69 @@ class ConfigManager:
             return False, "provider.active and provider.options are required"
         if provider["active"] not in provider["options"]:
             return False, "provider.active must exist in provider.options"
+        http = provider.get("http", {})
+        if http and not isinstance(http, dict):
+            return False, "provider.http must be an object"
+        for key in ("timeout", "connect_timeout", "keepalive_expiry", "max_connections", "max_keepalive_connections"):
+            if key in http and (not isinstance(http[key], (int, float)) or http[key] <= 0):
+                return False, f"provider.http.{key} must be a positive number"
+        if "http2" in http and not isinstance(http["http2"], bool):
+            return False, "provider.http.http2 must be bool"
+        failover = provider.get("failover", [])
+        if not isinstance(failover, list) or not all(isinstance(n, str) for n in failover):
+            return False, "provider.failover must be a list of provider names"
+        unknown = [n for n in failover if n not in provider["options"]]
+        if unknown:
+            return False, f"provider.failover references unknown providers: {', '.join(unknown)}"
+        if "single_flight" in provider and not isinstance(provider["single_flight"], bool):
+            return False, "provider.single_flight must be bool"
+        hedging = provider.get("hedging", {})
+        if hedging and not isinstance(hedging, dict):
+            return False, "provider.hedging must be an object"
+        if "enabled" in hedging and not isinstance(hedging["enabled"], bool):
+            return False, "provider.hedging.enabled must be bool"
+        if "quantile" in hedging and not (isinstance(hedging["quantile"], (int, float)) and 0 < hedging["quantile"] < 1):
+            return False, "provider.hedging.quantile must be between 0 and 1"
+        for key in ("min_samples", "min_delay_ms", "max_delay_ms"):
+            if key in hedging and (not isinstance(hedging[key], (int, float)) or hedging[key] < 0):
+                return False, f"provider.hedging.{key} must be a non-negative number"
+        for scope, section in [("provider", provider)] + [
+            (f"provider.options.{name}", opts) for name, opts in provider["options"].items() if isinstance(opts, dict)
+        ]:
+            limits = section.get("limits", {})
+            if limits and not isinstance(limits, dict):
+                return False, f"{scope}.limits must be an object"
+            for key in ("max_in_flight", "requests_per_minute", "tokens_per_minute", "retry_after_attempts"):
+                if key in limits and (not isinstance(limits[key], int) or limits[key] < 0):
+                    return False, f"{scope}.limits.{key} must be a non-negative int"
+            for key in ("queue_timeout", "max_retry_after"):
+                if key in limits and (not isinstance(limits[key], (int, float)) or limits[key] < 0):
+                    return False, f"{scope}.limits.{key} must be a non-negative number"
+        cache = provider.get("cache", {})
+        if cache and not isinstance(cache, dict):
+            return False, "provider.cache must be an object"
+        if "enabled" in cache and not isinstance(cache["enabled"], bool):
+            return False, "provider.cache.enabled must be bool"
+        for key in ("ttl_seconds", "max_entries"):
+            if key in cache and (not isinstance(cache[key], int) or cache[key] < 0):
+                return False, f"provider.cache.{key} must be a non-negative int"
 
         if "agents" in data and not isinstance(data["agents"].get("max_active", 1), int):
             return False, "agents.max_active must be int"
+        registry = data.get("agents", {}).get("registry", {})
+        if registry and not isinstance(registry, dict):
+            return False, "agents.registry must be an object"
+        for key in ("max_live", "max_running", "flush_batch"):
+            if key in registry and (not isinstance(registry[key], int) or registry[key] < 1):
+                return False, f"agents.registry.{key} must be a positive int"
+        if "max_age_seconds" in registry and (
+            not isinstance(registry["max_age_seconds"], (int, float)) or registry["max_age_seconds"] < 0
+        ):
+            return False, "agents.registry.max_age_seconds must be a non-negative number"
+        if "flush_interval" in registry and (
+            not isinstance(registry["flush_interval"], (int, float)) or registry["flush_interval"] <= 0
+        ):
+            return False, "agents.registry.flush_interval must be a positive number"
 
         security = data.get("security", {})
         if security and not isinstance(security, dict):
@@ -41,6 +185,64 @@ class ConfigManager:
         if "tailscale_node_allowlist" in security and not isinstance(security["tailscale_node_allowlist"], list):
             return False, "security.tailscale_node_allowlist must be a list"
 
+        chat_jobs = data.get("chat_jobs", {})
+        if chat_jobs and not isinstance(chat_jobs, dict):
+            return False, "chat_jobs must be an object"
+        if "workers" in chat_jobs and (not isinstance(chat_jobs["workers"], int) or chat_jobs["workers"] < 1):
+            return False, "chat_jobs.workers must be a positive int"
+        for key in ("retention_seconds", "max_wait"):
+            if key in chat_jobs and (not isinstance(chat_jobs[key], (int, float)) or chat_jobs[key] <= 0):
+                return False, f"chat_jobs.{key} must be a positive number"
+
+        webhooks = data.get("webhooks", {})
+        if webhooks and not isinstance(webhooks, dict):
+            return False, "webhooks must be an object"
+        webhook_scopes = [("webhooks", webhooks)]
+        sources = webhooks.get("sources", {})
+        if not isinstance(sources, dict):
+            return False, "webhooks.sources must be an object"
+        for name, settings in sources.items():
+            if not isinstance(settings, dict):
+                return False, f"webhooks.sources.{name} must be an object"
+            webhook_scopes.append((f"webhooks.sources.{name}", settings))
+        for scope, settings in webhook_scopes:
+            for key in ("workers", "max_per_source", "coalesce_max", "max_attempts"):
+                if key in settings and (not isinstance(settings[key], int) or settings[key] < 1):
+                    return False, f"{scope}.{key} must be a positive int"
+            for key in ("coalesce_window", "retry_delay"):
+                if key in settings and (not isinstance(settings[key], (int, float)) or settings[key] < 0):
+                    return False, f"{scope}.{key} must be a non-negative number"
+
+        dispatcher = data.get("dispatcher", {})
+        if dispatcher and not isinstance(dispatcher, dict):
+            return False, "dispatcher must be an object"
+        if "max_concurrent" in dispatcher and (
+            not isinstance(dispatcher["max_concurrent"], int) or dispatcher["max_concurrent"] < 1
+        ):
+            return False, "dispatcher.max_concurrent must be a positive int"
+        if "max_queue_per_session" in dispatcher and (
+            not isinstance(dispatcher["max_queue_per_session"], int) or dispatcher["max_queue_per_session"] < 0
+        ):
+            return False, "dispatcher.max_queue_per_session must be a non-negative int"
+        if "queue_timeout" in dispatcher and (
+            not isinstance(dispatcher["queue_timeout"], (int, float)) or dispatcher["queue_timeout"] <= 0
+        ):
+            return False, "dispatcher.queue_timeout must be a positive number"
+        if "max_tracked_sessions" in dispatcher and (
+            not isinstance(dispatcher["max_tracked_sessions"], int) or dispatcher["max_tracked_sessions"] < 0
+        ):
+            return False, "dispatcher.max_tracked_sessions must be a non-negative int"
+
+        style = data.get("style", {})
+        if style and not isinstance(style, dict):
+            return False, "style must be an object"
+        if "flush_interval" in style and (
+            not isinstance(style["flush_interval"], (int, float)) or style["flush_interval"] <= 0
+        ):
+            return False, "style.flush_interval must be a positive number"
+        if "flush_every" in style and (not isinstance(style["flush_every"], int) or style["flush_every"] < 1):
+            return False, "style.flush_every must be a positive int"
+
         pipelines = data.get("pipelines", {})
         if pipelines and not isinstance(pipelines, dict):
             return False, "pipelines must be an object"
@@ -48,6 +250,89 @@ class ConfigManager:
             return False, "pipelines.mode must be sequential or parallel"
         if "max_retries" in pipelines and not isinstance(pipelines["max_retries"], int):
             return False, "pipelines.max_retries must be int"
+        if "stage_timeout" in pipelines and (
+            not isinstance(pipelines["stage_timeout"], (int, float)) or pipelines["stage_timeout"] <= 0
+        ):
+            return False, "pipelines.stage_timeout must be a positive number"
+        if "fail_fast" in pipelines and not isinstance(pipelines["fail_fast"], bool):
+            return False, "pipelines.fail_fast must be bool"
+        stage_cache = pipelines.get("stage_cache", {})
+        if stage_cache and not isinstance(stage_cache, dict):
+            return False, "pipelines.stage_cache must be an object"
+        if "enabled" in stage_cache and not isinstance(stage_cache["enabled"], bool):
+            return False, "pipelines.stage_cache.enabled must be bool"
+        for key in ("ttl_seconds", "max_entries"):
+            if key in stage_cache and (not isinstance(stage_cache[key], int) or stage_cache[key] < 0):
+                return False, f"pipelines.stage_cache.{key} must be a non-negative int"
+
+        store = data.get("store", {})
+        if store and not isinstance(store, dict):
+            return False, "store must be an object"
+        pragmas = store.get("pragmas", {})
+        if not isinstance(pragmas, dict):
+            return False, "store.pragmas must be an object"
+        for key in ("cache_size", "mmap_size", "busy_timeout"):
+            if key in pragmas and not isinstance(pragmas[key], int):
+                return False, f"store.pragmas.{key} must be int"
+        if "journal_mode" in pragmas and pragmas["journal_mode"] not in {"wal", "delete", "truncate"}:
+            return False, "store.pragmas.journal_mode must be wal, delete or truncate"
+        if "synchronous" in pragmas and pragmas["synchronous"] not in {"off", "normal", "full"}:
+            return False, "store.pragmas.synchronous must be off, normal or full"
+        if "auto_vacuum" in pragmas and pragmas["auto_vacuum"] not in {"none", "full", "incremental"}:
+            return False, "store.pragmas.auto_vacuum must be none, full or incremental"
+        group_commit = store.get("group_commit", {})
+        if not isinstance(group_commit, dict):
+            return False, "store.group_commit must be an object"
+        if "enabled" in group_commit and not isinstance(group_commit["enabled"], bool):
+            return False, "store.group_commit.enabled must be bool"
+        for key in ("interval_ms", "max_batch"):
+            if key in group_commit and (not isinstance(group_commit[key], int) or group_commit[key] < 1):
+                return False, f"store.group_commit.{key} must be a positive int"
+
+        tracing = data.get("tracing", {})
+        if tracing and not isinstance(tracing, dict):
+            return False, "tracing must be an object"
+        if "enabled" in tracing and not isinstance(tracing["enabled"], bool):
+            return False, "tracing.enabled must be bool"
+        if "max_traces" in tracing and (not isinstance(tracing["max_traces"], int) or tracing["max_traces"] < 1):
+            return False, "tracing.max_traces must be a positive int"
+        if "export_dir" in tracing and not isinstance(tracing["export_dir"], str):
+            return False, "tracing.export_dir must be a string"
+        if "span_ttl_days" in tracing and (
+            not isinstance(tracing["span_ttl_days"], (int, float)) or tracing["span_ttl_days"] < 0
+        ):
+            return False, "tracing.span_ttl_days must be a non-negative number"
+
+        audit = data.get("audit", {})
+        if audit and not isinstance(audit, dict):
+            return False, "audit must be an object"
+        for key in ("verify_interval", "full_verify_interval", "chunk_pause"):
+            if key in audit and (not isinstance(audit[key], (int, float)) or audit[key] < 0):
+                return False, f"audit.{key} must be a non-negative number"
+        for key in ("chunk_size", "checkpoint_every"):
+            if key in audit and (not isinstance(audit[key], int) or audit[key] < 1):
+                return False, f"audit.{key} must be a positive int"
+
+        retention = data.get("retention", {})
+        if retention and not isinstance(retention, dict):
+            return False, "retention must be an object"
+        if "enabled" in retention and not isinstance(retention["enabled"], bool):
+            return False, "retention.enabled must be bool"
+        if "interval" in retention and (not isinstance(retention["interval"], (int, float)) or retention["interval"] < 1):
+            return False, "retention.interval must be a number >= 1"
+        if "archive_dir" in retention and not isinstance(retention["archive_dir"], str):
+            return False, "retention.archive_dir must be a string"
+        for key in ("batch_size", "vacuum_pages"):
+            if key in retention and (not isinstance(retention[key], int) or retention[key] < 1):
+                return False, f"retention.{key} must be a positive int"
+        tables = retention.get("tables", {})
+        if not isinstance(tables, dict):
+            return False, "retention.tables must be an object"
+        for name, policy in tables.items():
+            if name not in {"interaction_signals", "webhook_events", "audit_events"}:
+                return False, f"retention.tables.{name} is not supported"
+            if not isinstance(policy, dict) or not isinstance(policy.get("days", 0), (int, float)) or policy.get("days", 0) < 0:
+                return False, f"retention.tables.{name}.days must be a non-negative number"
 
         bus = data.get("bus", {})
         if bus and not isinstance(bus, dict):
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+from . import persona as persona_mod
+from . import skills as skills_mod
+from . import style as style_mod
+from .store import MemoryStore, StorePaths
+
+
+EMPTY_PREFERENCES_TTL = 30.0
+
+
+def file_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ContextCache:
+    def __init__(self, paths: StorePaths, store: MemoryStore, prompt_builder: Callable[[dict[str, Any]], str]):
+        self.store = store
+        self.prompt_builder = prompt_builder
+        self._sources: dict[str, tuple[Path, Callable[[Path], dict[str, Any]]]] = {
+            "persona": (paths.persona, persona_mod.load_or_create),
+            "style": (paths.style, style_mod.load_or_create),
+            "skills": (paths.skill_registry, skills_mod.load_or_create),
+        }
+        self._values: dict[str, tuple[tuple[int, int] | None, dict[str, Any]]] = {}
+        self._preferences: tuple[int, float, list[dict[str, Any]]] | None = None
+        self._generation = 0
+        self._snapshot: tuple[int, dict[str, Any], str] | None = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str) -> dict[str, Any]:
+        path, loader = self._sources[name]
+        signature = file_signature(path)
+        with self._lock:
+            cached = self._values.get(name)
+            if cached is not None and signature is not None and cached[0] == signature:
+                return cached[1]
+            value = loader(path)
+            self._values[name] = (file_signature(path), value)
+            self._generation += 1
+            return value
+
+    def update(self, name: str, value: dict[str, Any]) -> None:
+        path, _ = self._sources[name]
+        with self._lock:
+            self._values[name] = (file_signature(path), value)
+            self._generation += 1
+
+    def invalidate(self, *names: str) -> None:
+        with self._lock:
+            for name in names or tuple(self._sources):
+                self._values.pop(name, None)
+            if not names:
+                self._preferences = None
+            self._generation += 1
+
+    def preferences(self) -> list[dict[str, Any]]:
+        version = self.store.preferences_version
+        now = time.time()
+        with self._lock:
+            cached = self._preferences
+            if cached is not None and cached[0] == version and now < cached[1]:
+                return cached[2]
+            rows = self.store.relevant_preferences()
+            expires = min(
+                (
+                    (datetime.fromisoformat(r["last_seen"]) + timedelta(days=r["ttl_days"])).timestamp()
+                    for r in rows
+                ),
+                default=now + EMPTY_PREFERENCES_TTL,
+            )
+            self._preferences = (version, expires, rows)
+            self._generation += 1
+            return rows
+
+    def snapshot(self) -> tuple[dict[str, Any], str]:
+        with self._lock:
+            persona = self.get("persona")
+            style = self.get("style")
+            registry = self.get("skills")
+            preferences = self.preferences()
+            if self._snapshot is not None and self._snapshot[0] == self._generation:
+                self.hits += 1
+                return self._snapshot[1], self._snapshot[2]
+            self.misses += 1
+            snapshot = {
+                "persona": persona,
+                "style_profile": style,
+                "preferences": preferences,
+                "active_skills": [s for s in registry.get("skills", []) if s.get("status") == "active"],
+            }
+            self._snapshot = (self._generation, snapshot, self.prompt_builder(snapshot))
+            return snapshot, self._snapshot[2]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "generation": self._generation}
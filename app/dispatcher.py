@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator
+
+from .limits import LimitTimeout, ProviderLimiter
+from .metrics import CounterSet
+
+
+DEFAULT_DISPATCH = {
+    "max_concurrent": 8,
+    "max_queue_per_session": 16,
+    "queue_timeout": 120.0,
+    "max_tracked_sessions": 256,
+}
+
+COUNTER_NAMES = ("admitted", "completed", "rejected", "timeouts", "wait_ms")
+
+
+class SessionQueueFull(RuntimeError):
+    pass
+
+
+class _Lane:
+    __slots__ = ("limiter", "users")
+
+    def __init__(self) -> None:
+        self.limiter = ProviderLimiter({"max_in_flight": 1})
+        self.users = 0
+
+
+class SessionDispatcher:
+    def __init__(self, settings: dict[str, Any] | None = None):
+        self.max_queue_per_session = DEFAULT_DISPATCH["max_queue_per_session"]
+        self.queue_timeout = DEFAULT_DISPATCH["queue_timeout"]
+        self.max_tracked_sessions = DEFAULT_DISPATCH["max_tracked_sessions"]
+        self.workers = ProviderLimiter({"max_in_flight": DEFAULT_DISPATCH["max_concurrent"]})
+        self.counters = CounterSet()
+        self._lanes: dict[str, _Lane] = {}
+        self._idle: OrderedDict[str, None] = OrderedDict()
+        self._retired = {"sessions": 0, **{name: 0 for name in COUNTER_NAMES}}
+        self._lock = threading.Lock()
+        self.configure(settings or {})
+
+    def configure(self, settings: dict[str, Any]) -> None:
+        merged = dict(DEFAULT_DISPATCH, **settings)
+        self.max_queue_per_session = max(0, int(merged["max_queue_per_session"]))
+        self.queue_timeout = float(merged["queue_timeout"])
+        self.max_tracked_sessions = max(0, int(merged["max_tracked_sessions"]))
+        self.workers.configure({"max_in_flight": max(1, int(merged["max_concurrent"]))})
+
+    def check(self, session_id: str) -> None:
+        with self._lock:
+            lane = self._lanes.get(session_id)
+            if lane is not None and lane.users > self.max_queue_per_session:
+                self.counters.incr(session_id, "rejected")
+                raise SessionQueueFull(f"too many queued requests for session {session_id}")
+
+    def _enter(self, session_id: str) -> ProviderLimiter:
+        with self._lock:
+            lane = self._lanes.get(session_id)
+            if lane is None:
+                lane = self._lanes[session_id] = _Lane()
+                self._idle.pop(session_id, None)
+            # One running request plus max_queue_per_session waiting behind it.
+            if lane.users > self.max_queue_per_session:
+                self.counters.incr(session_id, "rejected")
+                raise SessionQueueFull(f"too many queued requests for session {session_id}")
+            lane.users += 1
+            return lane.limiter
+
+    def _leave(self, session_id: str) -> None:
+        with self._lock:
+            lane = self._lanes[session_id]
+            lane.users -= 1
+            if lane.users <= 0:
+                del self._lanes[session_id]
+                self._idle[session_id] = None
+                while len(self._idle) > self.max_tracked_sessions:
+                    # Idle sessions beyond the cap are folded into totals so counters stay bounded.
+                    retired, _ = self._idle.popitem(last=False)
+                    values = self.counters.pop(retired)
+                    self._retired["sessions"] += 1
+                    for name in COUNTER_NAMES:
+                        self._retired[name] += values.get(name, 0)
+
+    def _admitted(self, session_id: str, started: float) -> None:
+        self.counters.incr(session_id, "admitted")
+        self.counters.incr(session_id, "wait_ms", int((time.monotonic() - started) * 1000))
+
+    def _timed_out(self, session_id: str) -> None:
+        self.counters.incr(session_id, "timeouts")
+
+    @contextmanager
+    def slot(self, session_id: str) -> Iterator[None]:
+        lane = self._enter(session_id)
+        started = time.monotonic()
+        try:
+            acquired = False
+            try:
+                lane.acquire(timeout=self.queue_timeout)
+                acquired = True
+                self.workers.acquire(timeout=max(0.0, self.queue_timeout - (time.monotonic() - started)))
+            except BaseException as exc:
+                if isinstance(exc, LimitTimeout):
+                    self._timed_out(session_id)
+                if acquired:
+                    lane.release()
+                raise
+            self._admitted(session_id, started)
+            try:
+                yield
+            finally:
+                self.workers.release()
+                lane.release()
+                self.counters.incr(session_id, "completed")
+        finally:
+            self._leave(session_id)
+
+    @asynccontextmanager
+    async def aslot(self, session_id: str) -> AsyncIterator[None]:
+        lane = self._enter(session_id)
+        started = time.monotonic()
+        try:
+            acquired = False
+            try:
+                await lane.aacquire(timeout=self.queue_timeout)
+                acquired = True
+                await self.workers.aacquire(timeout=max(0.0, self.queue_timeout - (time.monotonic() - started)))
+            except BaseException as exc:
+                if isinstance(exc, LimitTimeout):
+                    self._timed_out(session_id)
+                if acquired:
+                    lane.release()
+                raise
+            self._admitted(session_id, started)
+            try:
+                yield
+            finally:
+                self.workers.release()
+                lane.release()
+                self.counters.incr(session_id, "completed")
+        finally:
+            self._leave(session_id)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            depths = {sid: lane.users for sid, lane in self._lanes.items()}
+            retired = dict(self._retired)
+        workers = self.workers.stats()
+        counters = self.counters.snapshot()
+        sessions = {}
+        for sid in sorted(set(counters) | set(depths)):
+            values = counters.get(sid, {})
+            admitted = values.get("admitted", 0)
+            sessions[sid] = {
+                "queue_depth": max(0, depths.get(sid, 0) - 1),
+                "active": depths.get(sid, 0) > 0,
+                "admitted": admitted,
+                "completed": values.get("completed", 0),
+                "rejected": values.get("rejected", 0),
+                "timeouts": values.get("timeouts", 0),
+                "mean_wait_ms": round(values.get("wait_ms", 0) / admitted, 1) if admitted else None,
+            }
+        return {
+            "max_concurrent": workers["max_in_flight"],
+            "max_queue_per_session": self.max_queue_per_session,
+            "in_flight": workers["in_flight"],
+            "waiting_for_worker": workers["queue_depth"],
+            "wait": workers["wait"],
+            "sessions": sessions,
+            "retired_sessions": retired,
+        }
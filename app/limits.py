@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Mapping
+
+from .metrics import LatencyHistogram
+
+
+DEFAULT_LIMITS = {
+    "max_in_flight": 8,
+    "requests_per_minute": 0,
+    "tokens_per_minute": 0,
+    "queue_timeout": 30.0,
+    "retry_after_attempts": 2,
+    "max_retry_after": 60.0,
+}
+
+
+class LimitTimeout(TimeoutError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    def configure(self, per_minute: float) -> None:
+        if per_minute != self.per_minute:
+            was_enabled = self.enabled
+            self.per_minute = per_minute
+            if per_minute <= 0:
+                self.tokens = 0.0
+            elif not was_enabled:
+                # A bucket that was switched off starts full, like a freshly built one.
+                self.tokens = float(per_minute)
+                self.updated = time.monotonic()
+            else:
+                self.tokens = min(self.tokens, float(per_minute))
+
+    def refill(self, now: float) -> None:
+        if self.enabled:
+            self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        if not self.enabled:
+            return 0.0
+        amount = min(amount, self.per_minute)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.per_minute
+
+    def take(self, amount: float) -> None:
+        if self.enabled:
+            self.tokens -= min(amount, self.per_minute)
+
+    def give_back(self, amount: float) -> None:
+        if self.enabled:
+            self.tokens = min(self.per_minute, self.tokens + amount)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "notify")
+
+    def __init__(self, tokens: float, notify: Callable[[], None]):
+        self.tokens = tokens
+        self.notify = notify
+
+
+class ProviderLimiter:
+    def __init__(self, settings: Mapping[str, Any] | None = None):
+        merged = dict(DEFAULT_LIMITS, **(settings or {}))
+        self.max_in_flight = int(merged["max_in_flight"])
+        self.requests = TokenBucket(float(merged["requests_per_minute"]))
+        self.tokens = TokenBucket(float(merged["tokens_per_minute"]))
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.wait_ms = LatencyHistogram()
+        self.admitted = 0
+        self.timeouts = 0
+        self.retry_after_pauses = 0
+        self._queue: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    def configure(self, settings: Mapping[str, Any]) -> None:
+        merged = dict(DEFAULT_LIMITS, **settings)
+        with self._lock:
+            self.max_in_flight = int(merged["max_in_flight"])
+            self.requests.configure(float(merged["requests_per_minute"]))
+            self.tokens.configure(float(merged["tokens_per_minute"]))
+            self._wake_head()
+
+    def _admit(self, waiter: _Waiter, now: float) -> float | None:
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        # Only the head may be admitted, so sync and async callers share one FIFO order.
+        if not self._queue or self._queue[0] is not waiter:
+            return math.inf
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.max_in_flight > 0 and self.in_flight >= self.max_in_flight:
+            return math.inf
+        wait = max(self.requests.wait_for(1), self.tokens.wait_for(waiter.tokens))
+        if wait > 0:
+            return wait
+        self._queue.popleft()
+        self.in_flight += 1
+        self.admitted += 1
+        self.requests.take(1)
+        self.tokens.take(waiter.tokens)
+        self._wake_head()
+        return None
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0].notify()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            was_head = bool(self._queue) and self._queue[0] is waiter
+            try:
+                self._queue.remove(waiter)
+            except ValueError:
+                return
+            if was_head:
+                self._wake_head()
+
+    def acquire(self, tokens: float = 0, timeout: float | None = None) -> None:
+        timeout = DEFAULT_LIMITS["queue_timeout"] if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        event = threading.Event()
+        waiter = _Waiter(tokens, event.set)
+        with self._lock:
+            self._queue.append(waiter)
+        while True:
+            with self._lock:
+                event.clear()
+                now = time.monotonic()
+                wait = self._admit(waiter, now)
+                if wait is None:
+                    self.wait_ms.observe((now - started) * 1000)
+                    return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._abandon(waiter)
+                with self._lock:
+                    self.timeouts += 1
+                raise LimitTimeout(f"provider queue wait exceeded {timeout:.1f}s")
+            event.wait(min(wait, remaining))
+
+    async def aacquire(self, tokens: float = 0, timeout: float | None = None) -> None:
+        timeout = DEFAULT_LIMITS["queue_timeout"] if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        deadline = started + timeout
+        event = asyncio.Event()
+        waiter = _Waiter(tokens, lambda: loop.call_soon_threadsafe(event.set))
+        with self._lock:
+            self._queue.append(waiter)
+        try:
+            while True:
+                with self._lock:
+                    event.clear()
+                    now = time.monotonic()
+                    wait = self._admit(waiter, now)
+                    if wait is None:
+                        self.wait_ms.observe((now - started) * 1000)
+                        return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise LimitTimeout(f"provider queue wait exceeded {timeout:.1f}s")
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(wait, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._wake_head()
+
+    def refund(self, reserved_tokens: float, used_tokens: float) -> None:
+        if reserved_tokens <= used_tokens:
+            return
+        with self._lock:
+            self.tokens.refill(time.monotonic())
+            self.tokens.give_back(reserved_tokens - used_tokens)
+            self._wake_head()
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.retry_after_pauses += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._queue),
+                "admitted": self.admitted,
+                "timeouts": self.timeouts,
+                "retry_after_pauses": self.retry_after_pauses,
+                "paused_for_s": round(max(0.0, self.blocked_until - now), 2),
+                "wait": self.wait_ms.snapshot(),
+            }
+
+
+def retry_after_seconds(status_code: int, headers: Mapping[str, str]) -> float | None:
+    if status_code not in {429, 503}:
+        return None
+    raw_ms = headers.get("retry-after-ms")
+    if raw_ms:
+        try:
+            return max(0.0, float(raw_ms) / 1000)
+        except ValueError:
+            pass
+    raw = headers.get("retry-after")
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
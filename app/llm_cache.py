@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+
+DEFAULT_CACHE = {
+    "enabled": True,
+    "ttl_seconds": 3600,
+    "max_entries": 5000,
+}
+
+
+DEFAULT_STAGE_CACHE = {
+    "enabled": False,
+    "ttl_seconds": 86400,
+    "max_entries": 2000,
+}
+
+HIT_FLUSH_BATCH = 256
+HIT_FLUSH_INTERVAL = 5.0
+
+
+def stage_cache_key(provider: str, model: str, system_prompt: str, task: str, dependencies: list[str]) -> str:
+    raw = json.dumps([provider, model, system_prompt, task, dependencies], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cache_key(provider: str, model: str, system_prompt: str, user_prompt: str, temperature: float | None) -> str:
+    raw = json.dumps([provider, model, system_prompt, user_prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, db_path: Path, table: str = "llm_cache"):
+        self.db_path = db_path
+        self.table = table
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, int]] = {}
+        self._hits: dict[str, list[float]] = {}
+        self._entries: int | None = None
+        self._flushed_at = time.monotonic()
+        self._migrate()
+
+    def _migrate(self) -> None:
+        with self._lock:
+            self.conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_used ON {self.table}(last_used)")
+            self.conn.commit()
+
+    def _count(self, provider: str, name: str) -> None:
+        counters = self._counters.setdefault(provider, {"hits": 0, "misses": 0, "stores": 0, "evictions": 0})
+        counters[name] += 1
+
+    def _flush_hits(self) -> None:
+        if not self._hits:
+            return
+        pending, self._hits = self._hits, {}
+        self.conn.executemany(
+            f"UPDATE {self.table} SET last_used=MAX(last_used, ?), hits=hits+? WHERE key=?",
+            [(last_used, int(count), key) for key, (last_used, count) in pending.items()],
+        )
+        self.conn.commit()
+        self._flushed_at = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_hits()
+
+    def get(self, key: str, provider: str, ttl_seconds: float) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT response, created_at FROM {self.table} WHERE key=?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self._count(provider, "misses")
+                return None
+            if ttl_seconds > 0 and now - row["created_at"] > ttl_seconds:
+                self._hits.pop(key, None)
+                deleted = self.conn.execute(f"DELETE FROM {self.table} WHERE key=?", (key,)).rowcount
+                self.conn.commit()
+                if self._entries is not None:
+                    self._entries -= deleted
+                self._count(provider, "misses")
+                self._count(provider, "evictions")
+                return None
+            # Hit bookkeeping is batched so a cache hit stays a read instead of a commit.
+            hit = self._hits.setdefault(key, [now, 0])
+            hit[0], hit[1] = now, hit[1] + 1
+            if len(self._hits) >= HIT_FLUSH_BATCH or time.monotonic() - self._flushed_at >= HIT_FLUSH_INTERVAL:
+                self._flush_hits()
+            self._count(provider, "hits")
+            return row["response"]
+
+    def put(self, key: str, provider: str, model: str, response: str, max_entries: int) -> None:
+        now = time.time()
+        with self._lock:
+            if self._entries is None:
+                # Counted once, then maintained on insert/delete so a store never scans the table.
+                self._entries = self.conn.execute(f"SELECT COUNT(*) AS n FROM {self.table}").fetchone()["n"]
+            exists = self.conn.execute(f"SELECT 1 FROM {self.table} WHERE key=?", (key,)).fetchone() is not None
+            self.conn.execute(
+                f"""
+                INSERT INTO {self.table}(key, provider, model, response, created_at, last_used, hits)
+                VALUES(?,?,?,?,?,?,0)
+                ON CONFLICT(key) DO UPDATE SET
+                    response=excluded.response,
+                    created_at=excluded.created_at,
+                    last_used=excluded.last_used
+                """,
+                (key, provider, model, response, now, now),
+            )
+            self._count(provider, "stores")
+            if not exists:
+                self._entries += 1
+            overflow = self._entries - max_entries
+            if max_entries > 0 and overflow > 0:
+                self._flush_hits()
+                evicted = self.conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,),
+                ).rowcount
+                self._entries -= evicted
+                self._counters[provider]["evictions"] += evicted
+            self.conn.commit()
+
+    def clear(self, provider: str | None = None) -> int:
+        with self._lock:
+            self._flush_hits()
+            if provider:
+                cur = self.conn.execute(f"DELETE FROM {self.table} WHERE provider=?", (provider,))
+            else:
+                cur = self.conn.execute(f"DELETE FROM {self.table}")
+            self.conn.commit()
+            self._entries = None
+            return cur.rowcount
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT provider, COUNT(*) AS entries FROM {self.table} GROUP BY provider"
+            ).fetchall()
+            entries = {r["provider"]: r["entries"] for r in rows}
+            providers = {
+                name: dict(counters, entries=entries.get(name, 0)) for name, counters in self._counters.items()
+            }
+            for name, count in entries.items():
+                providers.setdefault(name, {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "entries": count})
+
+        hits = sum(p["hits"] for p in providers.values())
+        misses = sum(p["misses"] for p in providers.values())
+        return {
+            "entries": sum(entries.values()),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "providers": providers,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_hits()
+            self.conn.close()
@@ -1,35 +1,79 @@
 from __future__ import annotations
 
+import json
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
 from . import persona as persona_mod
+from .audit import AuditMonitor
+from .chat_jobs import ChatJobQueue
 from .config_manager import ConfigManager
+from .export import EXPORT_FORMATS, encode_rows, gzip_stream
+from .dispatcher import SessionQueueFull
+from .limits import LimitTimeout
+from .llm_cache import ResponseCache
 from .message_bus import create_message_bus
 from .orchestrator import Orchestrator
 from .policy import check_file_access, check_shell_command, policy_status
 from .provider import ProviderRouter
+from .retention import RETENTION_TABLES, RetentionCompactor
 from .scheduler import SchedulerManager, default_heartbeat_message
 from .secrets_store import SecretsStore
 from .security import is_client_allowed
-from .store import MemoryStore, default_paths
+from .store import EXPORT_COLUMNS, SEARCH_INDEXES, MemoryStore, default_paths
+from .tracing import to_otlp
+from .webhooks import WebhookIngest, create_webhook_queue
 
 
 app = FastAPI(title="OnToti", version="0.9.0")
 paths = default_paths("data")
 config_path = Path("config.json")
 config_manager = ConfigManager(config_path)
-store = MemoryStore(paths.db)
+store_cfg = config_manager.current().get("store", {})
+store = MemoryStore(paths.db, store_cfg.get("pragmas"), store_cfg.get("group_commit"))
 secrets = SecretsStore(paths.root / "secrets.json")
-provider = ProviderRouter(config_path, secrets=secrets)
-bus = create_message_bus(config_manager.load())
-orchestrator = Orchestrator(store=store, paths=paths, provider=provider, config_path=config_path, bus=bus)
+response_cache = ResponseCache(paths.llm_cache)
+provider = ProviderRouter(config_path, secrets=secrets, cache=response_cache, config_manager=config_manager)
+bus = create_message_bus(config_manager.current())
+orchestrator = Orchestrator(
+    store=store, paths=paths, provider=provider, config_path=config_path, bus=bus, config_manager=config_manager
+)
+
+
+chat_jobs = ChatJobQueue(store, lambda: orchestrator, config_manager.current().get("chat_jobs", {}))
+webhooks = WebhookIngest(
+    create_webhook_queue(store, config_manager.current()),
+    lambda: orchestrator,
+    config_manager.current().get("webhooks", {}),
+)
+audit_monitor = AuditMonitor(store, config_manager.current().get("audit", {}))
+retention = RetentionCompactor(store, config_manager.current().get("retention", {}))
+
+
+def _page(events: list[dict[str, Any]], total: dict[str, Any]) -> dict[str, Any]:
+    ids = [event["id"] for event in events]
+    return {
+        "events": events,
+        "total_estimate": total,
+        "cursor": {"before_id": min(ids) if ids else None, "after_id": max(ids) if ids else None},
+    }
+
+
+def _export(table: str, fmt: str, compress: bool, **filters: Any) -> StreamingResponse:
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format muss jsonl oder csv sein")
+    chunks = encode_rows(store.iter_export(table, **filters), fmt, EXPORT_COLUMNS[table])
+    filename = f"{table}.{fmt}" + (".gz" if compress else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if compress:
+        return StreamingResponse(gzip_stream(chunks), media_type="application/gzip", headers=headers)
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[fmt], headers=headers)
 
 
 def _run_chat(session_id: str, text: str) -> dict[str, Any]:
@@ -52,15 +96,39 @@ scheduler = SchedulerManager(
 )
 
 
+def _reconfigure(cfg: dict[str, Any]) -> None:
+    scheduler.reload()
+    chat_jobs.configure(cfg.get("chat_jobs", {}))
+    webhooks.configure(cfg.get("webhooks", {}))
+    audit_monitor.configure(cfg.get("audit", {}))
+    retention.configure(cfg.get("retention", {}))
+
+
 @app.on_event("startup")
-def startup() -> None:
+async def startup() -> None:
     scheduler.start()
+    orchestrator.styles.start()
+    orchestrator.agents.start()
+    await chat_jobs.start()
+    await webhooks.start()
+    audit_monitor.start()
+    retention.start()
     store.create_session("default", "Default")
 
 
 @app.on_event("shutdown")
-def shutdown() -> None:
+async def shutdown() -> None:
     scheduler.shutdown()
+    audit_monitor.stop()
+    retention.stop()
+    await chat_jobs.stop()
+    await webhooks.stop()
+    orchestrator.styles.stop()
+    orchestrator.agents.stop()
+    await provider.aclose()
+    response_cache.close()
+    orchestrator.stage_cache.close()
+    store.close()
 
 
 static_dir = Path(__file__).parent / "static"
@@ -71,6 +139,7 @@ if static_dir.exists():
 class ChatIn(BaseModel):
     session_id: str = Field(default="default")
     text: str
+    use_cache: bool = Field(default=True)
 
 
 class SkillDraftIn(BaseModel):
@@ -116,6 +185,7 @@ class SetupApplyIn(BaseModel):
 
 class ProviderTestIn(BaseModel):
     prompt: str = "Antworte kurz mit: setup ok"
+    use_cache: bool = Field(default=False)
 
 
 class SessionIn(BaseModel):
@@ -148,7 +218,7 @@ async def tailnet_guard(request: Request, call_next):
     if request.url.path in {"/health", "/diagnostics", "/ready"}:
         return await call_next(request)
 
-    cfg = config_manager.load()
+    cfg = config_manager.current()
     security_cfg = cfg.get("security", {})
     client_ip = request.client.host if request.client else ""
     node_id = request.headers.get("x-tailscale-node")
@@ -183,7 +253,7 @@ def health() -> dict[str, str]:
 
 @app.get("/ready")
 def ready() -> dict[str, Any]:
-    audit = store.verify_audit_chain()
+    audit = audit_monitor.state()
     provider_info = provider.describe_active()
     return {
         "status": "ok" if audit.get("ok") else "degraded",
@@ -200,12 +270,13 @@ def diagnostics() -> dict[str, Any]:
         "static_exists": static_dir.exists(),
         "index_exists": (static_dir / "index.html").exists(),
         "config_exists": config_path.exists(),
+        "store": store.stats(),
     }
 
 
 @app.get("/security/status")
 def security_status() -> dict[str, Any]:
-    cfg = config_manager.load()
+    cfg = config_manager.current()
     security_cfg = cfg.get("security", {})
     return {
         "tailnet_only": bool(security_cfg.get("tailnet_only", False)),
@@ -216,12 +287,12 @@ def security_status() -> dict[str, Any]:
 
 @app.get("/policy/status")
 def get_policy_status() -> dict[str, Any]:
-    return policy_status(config_manager.load())
+    return policy_status(config_manager.current())
 
 
 @app.post("/policy/file-check")
 def policy_file_check(payload: PolicyFileCheckIn) -> dict[str, Any]:
-    cfg = config_manager.load()
+    cfg = config_manager.current()
     allowed_paths = cfg.get("security", {}).get("allowed_paths", [])
     ok, reason = check_file_access(payload.path, allowed_paths)
     return {"ok": ok, "reason": reason}
@@ -229,7 +300,7 @@ def policy_file_check(payload: PolicyFileCheckIn) -> dict[str, Any]:
 
 @app.post("/policy/shell-check")
 def policy_shell_check(payload: PolicyShellCheckIn) -> dict[str, Any]:
-    cfg = config_manager.load()
+    cfg = config_manager.current()
     sandbox_mode = bool(cfg.get("security", {}).get("sandbox_mode", True))
     ok, reason = check_shell_command(payload.command, sandbox_mode=sandbox_mode)
     return {"ok": ok, "reason": reason}
@@ -241,17 +312,64 @@ def provider_info() -> dict[str, Any]:
 
 
 @app.post("/provider/test")
-def provider_test(payload: ProviderTestIn) -> dict[str, Any]:
-    text = provider.generate(system_prompt="You are a setup test.", user_prompt=payload.prompt)
+async def provider_test(payload: ProviderTestIn) -> dict[str, Any]:
+    text = await provider.agenerate(
+        system_prompt="You are a setup test.", user_prompt=payload.prompt, use_cache=payload.use_cache
+    )
     return {"result": text}
 
 
+@app.get("/provider/metrics")
+def provider_metrics() -> dict[str, Any]:
+    return provider.provider_metrics()
+
+
+@app.get("/provider/cache")
+def provider_cache_stats() -> dict[str, Any]:
+    return provider.cache_stats()
+
+
+@app.delete("/provider/cache")
+def provider_cache_clear(provider_name: str | None = None) -> dict[str, Any]:
+    removed = response_cache.clear(provider_name)
+    store.log_audit("provider", "cache_clear", {"provider": provider_name, "removed": removed}, "ok")
+    return {"status": "ok", "removed": removed}
+
+
+@app.get("/pipelines/cache")
+def pipeline_cache_stats() -> dict[str, Any]:
+    enabled = orchestrator.stage_cache_settings()["enabled"]
+    return {"enabled": bool(enabled), **orchestrator.stage_cache.stats()}
+
+
+@app.delete("/pipelines/cache")
+def pipeline_cache_clear() -> dict[str, Any]:
+    removed = orchestrator.stage_cache.clear()
+    store.log_audit("pipeline", "cache_clear", {"removed": removed}, "ok")
+    return {"status": "ok", "removed": removed}
+
+
+@app.get("/traces")
+def list_traces(limit: int = 50) -> dict[str, Any]:
+    return {"traces": orchestrator.tracer.recent(limit=max(1, min(limit, 500)))}
+
+
+@app.get("/traces/{task_id}")
+def get_trace(task_id: str, format: str = "json") -> dict[str, Any]:
+    trace = orchestrator.tracer.get(task_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="trace not found")
+    if format == "otlp":
+        return to_otlp(trace)
+    return trace
+
+
 @app.get("/setup/state")
 def setup_state() -> dict[str, Any]:
-    cfg = config_manager.load()
+    cfg = config_manager.current()
     return {
         "config": cfg,
-        "persona": persona_mod.load_or_create(paths.persona),
+        "persona": orchestrator.context.get("persona"),
         "provider": provider.describe_active(),
         "secrets": secrets.public_summary(),
         "bus": {
@@ -351,8 +469,20 @@ def setup_apply(payload: SetupApplyIn) -> dict[str, Any]:
     config_manager.save(cfg)
 
     bus = create_message_bus(cfg)
-    orchestrator = Orchestrator(store=store, paths=paths, provider=provider, config_path=config_path, bus=bus)
-    scheduler.reload()
+    orchestrator = Orchestrator(
+        store=store,
+        paths=paths,
+        provider=provider,
+        config_path=config_path,
+        bus=bus,
+        config_manager=config_manager,
+        agents=orchestrator.agents,
+        styles=orchestrator.styles,
+        dispatcher=orchestrator.dispatcher,
+        stage_cache=orchestrator.stage_cache,
+        tracer=orchestrator.tracer,
+    )
+    _reconfigure(cfg)
 
     store.log_audit(
         actor="setup",
@@ -373,9 +503,17 @@ def setup_apply(payload: SetupApplyIn) -> dict[str, Any]:
     }
 
 
+@app.get("/sessions/queues")
+def session_queues() -> dict[str, Any]:
+    return orchestrator.dispatcher.stats()
+
+
 @app.get("/sessions")
-def list_sessions() -> dict[str, Any]:
-    return {"sessions": store.list_sessions()}
+def list_sessions(limit: int = 200, before: str | None = None) -> dict[str, Any]:
+    limit = max(1, min(limit, 1000))
+    sessions = store.list_sessions(limit=limit, before=before)
+    last = sessions[-1] if len(sessions) == limit else None
+    return {"sessions": sessions, "next_cursor": f"{last['last_active']}|{last['session_id']}" if last else None}
 
 
 @app.post("/sessions")
@@ -432,23 +570,39 @@ def resume_job(job_id: str) -> dict[str, str]:
     return {"status": "ok"}
 
 
-@app.post("/webhooks/{source}")
-def webhook(source: str, payload: WebhookIn) -> dict[str, str]:
-    store.record_webhook(source=source, payload=payload.payload)
-    text = payload.payload.get("text") or f"Webhook {source}: {payload.payload}"
-    orchestrator.process_user_message(session_id=f"webhook:{source}", text=str(text))
-    store.log_audit("webhook", "ingest", {"source": source}, "ok")
-    return {"status": "accepted"}
+def _queue_error(exc: Exception) -> HTTPException:
+    if isinstance(exc, SessionQueueFull):
+        return HTTPException(status_code=429, detail=str(exc))
+    return HTTPException(status_code=503, detail=str(exc))
+
+
+@app.post("/webhooks/{source}", status_code=202)
+async def webhook(source: str, payload: WebhookIn) -> dict[str, Any]:
+    event = await webhooks.asubmit(source, payload.payload)
+    return {"status": "accepted", "event_id": event["id"], "queue": event["queue"]}
 
 
 @app.get("/webhooks")
-def list_webhooks(limit: int = 100) -> dict[str, Any]:
-    return {"events": store.recent_webhooks(limit=limit)}
+def list_webhooks(
+    limit: int = 100,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    source: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+) -> dict[str, Any]:
+    events = store.recent_webhooks(limit, before_id, after_id, source, since, until)
+    return _page(events, store.estimate_count("webhook_events", since, until, source=source))
+
+
+@app.get("/webhooks/queue")
+def webhook_queue() -> dict[str, Any]:
+    return webhooks.stats()
 
 
 @app.get("/config")
 def config_get() -> dict[str, Any]:
-    return config_manager.load()
+    return config_manager.current()
 
 
 @app.put("/config")
@@ -457,7 +611,7 @@ def config_put(payload: ConfigUpdateIn) -> dict[str, Any]:
     if not ok:
         raise HTTPException(status_code=400, detail=msg)
     config_manager.save(payload.config)
-    scheduler.reload()
+    _reconfigure(payload.config)
     store.log_audit(actor="config", action="update", payload={"keys": list(payload.config.keys())}, result="ok")
     return {"status": "ok"}
 
@@ -509,13 +663,38 @@ def context() -> dict[str, Any]:
 
 
 @app.get("/agents")
-def agents() -> dict[str, Any]:
-    return {"agents": orchestrator.agents_snapshot()}
+def agents(
+    task_id: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    limit: int = 200,
+    offset: int = 0,
+) -> dict[str, Any]:
+    page = orchestrator.agents_page(
+        task_id=task_id, since=since, until=until, limit=max(1, min(limit, 1000)), offset=max(0, offset)
+    )
+    return {**page, "registry": orchestrator.agents.stats()}
 
 
 @app.get("/topology")
-def topology() -> dict[str, Any]:
-    return orchestrator.topology_snapshot()
+def topology(
+    task_id: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    limit: int = 200,
+    offset: int = 0,
+) -> dict[str, Any]:
+    return orchestrator.topology_snapshot(
+        task_id=task_id, since=since, until=until, limit=max(1, min(limit, 1000)), offset=max(0, offset)
+    )
+
+
+@app.get("/usage")
+def usage(hours: int = 24, session_id: str | None = None, task_id: str | None = None) -> dict[str, Any]:
+    summary = store.usage_summary(hours=max(1, min(hours, 24 * 90)), session_id=session_id)
+    if task_id:
+        summary["task"] = store.task_usage(task_id)
+    return summary
 
 
 @app.get("/bus/messages")
@@ -524,13 +703,98 @@ def bus_messages(limit: int = 200) -> dict[str, Any]:
 
 
 @app.get("/interactions")
-def interactions(session_id: str | None = None, limit: int = 50) -> dict[str, Any]:
-    return {"events": store.recent_interactions(session_id=session_id, limit=limit)}
+def interactions(
+    session_id: str | None = None,
+    limit: int = 50,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    since: str | None = None,
+    until: str | None = None,
+) -> dict[str, Any]:
+    events = store.recent_interactions(session_id, limit, before_id, after_id, since, until)
+    return _page(events, store.estimate_count("interaction_signals", since, until, session_id=session_id or None))
+
+
+@app.get("/interactions/export")
+def interactions_export(
+    format: str = "jsonl",
+    gzip: bool = False,
+    session_id: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    after_id: int | None = None,
+    before_id: int | None = None,
+) -> StreamingResponse:
+    return _export(
+        "interaction_signals",
+        format,
+        gzip,
+        since=since,
+        until=until,
+        after_id=after_id,
+        before_id=before_id,
+        session_id=session_id or None,
+    )
 
 
 @app.post("/chat")
-def chat(payload: ChatIn) -> dict[str, Any]:
-    return orchestrator.process_user_message(payload.session_id, payload.text)
+async def chat(payload: ChatIn) -> dict[str, Any]:
+    try:
+        return await orchestrator.aprocess_user_message(payload.session_id, payload.text, use_cache=payload.use_cache)
+    except (SessionQueueFull, LimitTimeout) as exc:
+        raise _queue_error(exc) from exc
+
+
+@app.post("/chat/jobs", status_code=202)
+def submit_chat_job(payload: ChatIn) -> dict[str, Any]:
+    try:
+        orchestrator.dispatcher.check(payload.session_id)
+    except SessionQueueFull as exc:
+        raise _queue_error(exc) from exc
+    try:
+        job = chat_jobs.submit(payload.session_id, payload.text, use_cache=payload.use_cache)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    return {"task_id": job["task_id"], "status": job["status"]}
+
+
+@app.get("/chat/jobs/{task_id}")
+def get_chat_job(task_id: str) -> dict[str, Any]:
+    job = chat_jobs.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
+@app.get("/chat/jobs/{task_id}/wait")
+async def wait_chat_job(task_id: str, timeout: float = 30.0) -> dict[str, Any]:
+    job = await chat_jobs.wait(task_id, timeout)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
+@app.post("/chat/stream")
+async def chat_stream(payload: ChatIn) -> StreamingResponse:
+    try:
+        orchestrator.dispatcher.check(payload.session_id)
+    except SessionQueueFull as exc:
+        raise _queue_error(exc) from exc
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in orchestrator.astream_user_message(
+                payload.session_id, payload.text, use_cache=payload.use_cache
+            ):
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        except (SessionQueueFull, LimitTimeout) as exc:
+            yield f"event: error\ndata: {json.dumps({'event': 'error', 'detail': str(exc)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/reflect")
@@ -548,11 +812,102 @@ def approve(payload: SkillApproveIn) -> dict[str, Any]:
     return orchestrator.approve_skill(payload.skill_id)
 
 
+@app.get("/search")
+def search(
+    q: str,
+    kind: str | None = None,
+    session_id: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> dict[str, Any]:
+    kinds = [k.strip() for k in kind.split(",") if k.strip()] if kind else None
+    unknown = sorted(set(kinds or ()) - set(SEARCH_INDEXES))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unbekannte Suchbereiche: {', '.join(unknown)}")
+    try:
+        return store.search(q, kinds, session_id, since, until, max(1, min(limit, 200)), cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor") from exc
+
+
+@app.post("/search/rebuild")
+def search_rebuild() -> dict[str, Any]:
+    indexed = store.rebuild_search()
+    store.log_audit("search", "rebuild", indexed, "ok")
+    return {"status": "ok", "indexed": indexed}
+
+
+@app.get("/retention")
+def retention_status() -> dict[str, Any]:
+    return retention.status()
+
+
+@app.post("/retention/run")
+def retention_run() -> dict[str, Any]:
+    if not retention.enabled:
+        raise HTTPException(status_code=409, detail="retention ist deaktiviert (retention.enabled=false)")
+    return retention.run_once()
+
+
+@app.post("/retention/convert")
+def retention_convert() -> dict[str, Any]:
+    return retention.convert()
+
+
+@app.get("/archive/{table}")
+def archive_read(
+    table: str,
+    since: str | None = None,
+    until: str | None = None,
+    after_id: int | None = None,
+    limit: int = 500,
+) -> dict[str, Any]:
+    if table not in RETENTION_TABLES:
+        raise HTTPException(status_code=404, detail="Unbekannte Tabelle")
+    rows = retention.read(table, since=since, until=until, after_id=after_id, limit=max(1, min(limit, 5000)))
+    return {"table": table, "rows": rows, "next_after_id": rows[-1]["id"] if rows else None}
+
+
 @app.get("/audit")
-def audit(limit: int = 50) -> dict[str, Any]:
-    return {"events": store.recent_audit(limit=limit)}
+def audit(
+    limit: int = 50,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    actor: str | None = None,
+    action: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+) -> dict[str, Any]:
+    events = store.recent_audit(limit, before_id, after_id, actor, action, since, until)
+    return _page(events, store.estimate_count("audit_events", since, until, actor=actor, action=action))
+
+
+@app.get("/audit/export")
+def audit_export(
+    format: str = "jsonl",
+    gzip: bool = False,
+    actor: str | None = None,
+    action: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    after_id: int | None = None,
+    before_id: int | None = None,
+) -> StreamingResponse:
+    return _export(
+        "audit_events",
+        format,
+        gzip,
+        since=since,
+        until=until,
+        after_id=after_id,
+        before_id=before_id,
+        actor=actor,
+        action=action,
+    )
 
 
 @app.get("/audit/verify")
-def audit_verify() -> dict[str, Any]:
-    return store.verify_audit_chain()
+def audit_verify(full: bool = False) -> dict[str, Any]:
+    return audit_monitor.verify(full=full)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any
+
+
+LATENCY_BUCKETS_MS = (
+    25, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 4000, 5000, 7500, 10000, 15000, 20000, 30000, 60000,
+)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS_MS, max_samples: int = 2000):
+        self.buckets = buckets
+        self.max_samples = max_samples
+        self._counts = [0.0] * (len(buckets) + 1)
+        self._total = 0.0
+        self._sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, latency_ms: float) -> None:
+        idx = bisect.bisect_left(self.buckets, latency_ms)
+        with self._lock:
+            self._counts[idx] += 1
+            self._total += 1
+            self._sum_ms += latency_ms
+            if self._total > self.max_samples:
+                # Halve everything so old samples fade and quantiles follow the current latency profile.
+                self._counts = [c / 2 for c in self._counts]
+                self._total /= 2
+                self._sum_ms /= 2
+
+    @property
+    def count(self) -> int:
+        return int(self._total)
+
+    def quantile(self, q: float) -> float | None:
+        with self._lock:
+            if self._total <= 0:
+                return None
+            target = q * self._total
+            seen = 0.0
+            for idx, count in enumerate(self._counts):
+                if count <= 0:
+                    continue
+                if seen + count >= target:
+                    lower = self.buckets[idx - 1] if idx > 0 else 0.0
+                    upper = self.buckets[idx] if idx < len(self.buckets) else self.buckets[-1] * 2
+                    return lower + (upper - lower) * ((target - seen) / count)
+                seen += count
+            return float(self.buckets[-1])
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._total
+            mean = self._sum_ms / total if total else None
+        labels = [f"le_{b}" for b in self.buckets] + ["le_inf"]
+        return {
+            "count": int(total),
+            "mean_ms": round(mean, 1) if mean is not None else None,
+            "p50_ms": _round(self.quantile(0.5)),
+            "p95_ms": _round(self.quantile(0.95)),
+            "p99_ms": _round(self.quantile(0.99)),
+            "buckets": {label: int(c) for label, c in zip(labels, counts) if c >= 1},
+        }
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 1) if value is not None else None
+
+
+class CounterSet:
+    def __init__(self) -> None:
+        self._values: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, group: str, name: str, amount: int = 1) -> None:
+        with self._lock:
+            bucket = self._values.setdefault(group, {})
+            bucket[name] = bucket.get(name, 0) + amount
+
+    def pop(self, group: str) -> dict[str, int]:
+        with self._lock:
+            return self._values.pop(group, {})
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {group: dict(values) for group, values in self._values.items()}
@@ -1,27 +1,45 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import contextvars
+import copy
+import threading
+import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import aclosing
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Callable, Iterator
 
 from . import persona as persona_mod
 from . import skills as skills_mod
 from . import style as style_mod
+from .agent_registry import AgentRegistry, AgentStatus
+from .config_manager import ConfigManager
+from .context_cache import ContextCache
+from .dispatcher import SessionDispatcher
+from .llm_cache import DEFAULT_STAGE_CACHE, ResponseCache, stage_cache_key
 from .message_bus import LocalMessageBus
-from .provider import ProviderRouter
+from .provider import Completion, ProviderRouter
 from .store import MemoryStore, StorePaths
+from .tracing import Tracer, annotate, span
 
 
 UTC = timezone.utc
 
+StageCallback = Callable[[dict[str, Any]], None]
+
 
 def now_iso() -> str:
     return datetime.now(tz=UTC).isoformat()
 
 
+def new_task_id() -> str:
+    return f"t-{uuid.uuid4().hex[:10]}"
+
+
 def estimate_tokens(text: str | None) -> int:
     if not text:
         return 0
@@ -29,17 +47,54 @@ def estimate_tokens(text: str | None) -> int:
 
 
 @dataclass
-class AgentStatus:
-    agent_id: str
-    parent_id: str | None
-    role: str
+class PipelineStage:
+    stage_id: str
+    index: int
     task: str
-    status: str
-    task_id: str
-    output: str | None = None
+    depends_on: list[str]
+
+    @property
+    def role(self) -> str:
+        return f"worker-{self.index + 1}"
+
+
+@dataclass
+class PipelineOptions:
+    max_retries: int = 1
+    stage_timeout: float = 120.0
+    fail_fast: bool = False
+    workers: int = 1
+
+
+@dataclass
+class StageOutcome:
+    output: str = ""
     token_usage: int = 0
-    started_at: str = field(default_factory=now_iso)
-    ended_at: str | None = None
+    ok: bool = True
+    cache_hit: bool = False
+
+
+def _is_set(cancelled: threading.Event | None) -> bool:
+    return cancelled is not None and cancelled.is_set()
+
+
+def _abandoned(outcome: StageOutcome) -> StageOutcome:
+    return StageOutcome(output="Abgebrochen: Zeitlimit überschritten", token_usage=outcome.token_usage, ok=False)
+
+
+@dataclass
+class MessageRun:
+    session_id: str
+    text: str
+    task_id: str
+    signal: dict[str, Any]
+    snapshot: dict[str, Any]
+    system_prompt: str
+    root: AgentStatus
+    delegated: bool
+    use_cache: bool = True
+    on_stage: StageCallback | None = None
+    sub_results: list[dict[str, Any]] = field(default_factory=list)
 
 
 @dataclass
@@ -49,78 +104,243 @@ class Orchestrator:
     provider: ProviderRouter
     config_path: Path
     bus: LocalMessageBus
-    _agents: dict[str, AgentStatus] = field(default_factory=dict)
+    config_manager: ConfigManager | None = None
+    agents: AgentRegistry | None = None
+    context: ContextCache | None = None
+    styles: style_mod.StyleBuffer | None = None
+    dispatcher: SessionDispatcher | None = None
+    stage_cache: ResponseCache | None = None
+    tracer: Tracer | None = None
+
+    def __post_init__(self) -> None:
+        if self.config_manager is None:
+            self.config_manager = ConfigManager(self.config_path)
+        if self.agents is None:
+            self.agents = AgentRegistry(self.store, self._registry_config())
+        if self.context is None:
+            self.context = ContextCache(self.paths, self.store, self._system_prompt)
+        if self.styles is None:
+            self.styles = style_mod.StyleBuffer(self.paths.style, self._style_config())
+        self.styles.on_flush = lambda style: self.context.update("style", style)
+        if self.dispatcher is None:
+            self.dispatcher = SessionDispatcher(self._section_config("dispatcher"))
+        if self.stage_cache is None:
+            self.stage_cache = ResponseCache(self.paths.llm_cache, table="stage_cache")
+        if self.tracer is None:
+            self.tracer = Tracer(self.store, self._section_config("tracing"))
 
     def context_snapshot(self) -> dict[str, Any]:
-        persona = persona_mod.load_or_create(self.paths.persona)
-        style = style_mod.load_or_create(self.paths.style)
-        memory = self.store.relevant_preferences()
-        registry = skills_mod.load_or_create(self.paths.skill_registry)
-        active_skills = [s for s in registry.get("skills", []) if s.get("status") == "active"]
-        return {
-            "persona": persona,
-            "style_profile": style,
-            "preferences": memory,
-            "active_skills": active_skills,
-            "agents": self.agents_snapshot(),
-        }
-
-    def process_user_message(self, session_id: str, text: str) -> dict[str, Any]:
-        task_id = f"t-{uuid.uuid4().hex[:10]}"
-        signal = style_mod.analyze_text(text)
-        style = style_mod.load_or_create(self.paths.style)
-        updated_style = style_mod.blend_style(style, signal)
-        style_mod.save(self.paths.style, updated_style)
-
-        if "du" in text.lower() and "bitte" in text.lower():
-            self.store.upsert_preference("preferred_tone", "freundlich-direkt", confidence=0.74)
-
-        snapshot = self.context_snapshot()
-        system_prompt = self._system_prompt(snapshot)
+        snapshot, _ = self.context.snapshot()
+        return {**snapshot, "agents": self.agents_snapshot(limit=50)}
+
+    def process_user_message(
+        self,
+        session_id: str,
+        text: str,
+        use_cache: bool = True,
+        task_id: str | None = None,
+        on_stage: StageCallback | None = None,
+    ) -> dict[str, Any]:
+        task_id = task_id or new_task_id()
+        self.dispatcher.configure(self._section_config("dispatcher"))
+        self.tracer.configure(self._section_config("tracing"))
+        with self.tracer.trace(task_id, "process_user_message", session_id=session_id):
+            queued = time.perf_counter()
+            with self.dispatcher.slot(session_id):
+                annotate(queue_wait_ms=round((time.perf_counter() - queued) * 1000, 3))
+                return self._process_user_message(
+                    self._begin_message(session_id, text, use_cache, task_id, on_stage)
+                )
+
+    async def aprocess_user_message(
+        self,
+        session_id: str,
+        text: str,
+        use_cache: bool = True,
+        task_id: str | None = None,
+        on_stage: StageCallback | None = None,
+    ) -> dict[str, Any]:
+        task_id = task_id or new_task_id()
+        self.dispatcher.configure(self._section_config("dispatcher"))
+        self.tracer.configure(self._section_config("tracing"))
+        async with self.tracer.atrace(task_id, "process_user_message", session_id=session_id):
+            queued = time.perf_counter()
+            async with self.dispatcher.aslot(session_id):
+                annotate(queue_wait_ms=round((time.perf_counter() - queued) * 1000, 3))
+                run = await asyncio.to_thread(self._begin_message, session_id, text, use_cache, task_id, on_stage)
+                return await self._aprocess_user_message(run)
+
+    async def astream_user_message(
+        self, session_id: str, text: str, use_cache: bool = True
+    ) -> AsyncIterator[dict[str, Any]]:
+        task_id = new_task_id()
+        self.dispatcher.configure(self._section_config("dispatcher"))
+        self.tracer.configure(self._section_config("tracing"))
+        async with self.tracer.atrace(task_id, "stream_user_message", session_id=session_id):
+            queued = time.perf_counter()
+            async with self.dispatcher.aslot(session_id):
+                annotate(queue_wait_ms=round((time.perf_counter() - queued) * 1000, 3))
+                async with aclosing(self._astream_user_message(session_id, text, use_cache, task_id)) as events:
+                    async for event in events:
+                        yield event
+
+    def _process_user_message(self, run: MessageRun) -> dict[str, Any]:
+        if run.delegated:
+            run.sub_results = self._run_pipeline(run)
+        final_prompt = self._final_prompt(run)
+        with span("provider.call", phase="final") as call:
+            result = self.provider.generate_result(
+                system_prompt=run.system_prompt, user_prompt=final_prompt, use_cache=run.use_cache
+            )
+            call.set(**self._trace_completion(result))
+        return self._finish_message(run, result.text, final_prompt, [result])
+
+    async def _aprocess_user_message(self, run: MessageRun) -> dict[str, Any]:
+        if run.delegated:
+            run.sub_results = await self._arun_pipeline(run)
+        final_prompt = self._final_prompt(run)
+        with span("provider.call", phase="final") as call:
+            result = await self.provider.agenerate_result(
+                system_prompt=run.system_prompt, user_prompt=final_prompt, use_cache=run.use_cache
+            )
+            call.set(**self._trace_completion(result))
+        return await asyncio.to_thread(self._finish_message, run, result.text, final_prompt, [result])
+
+    async def _astream_user_message(
+        self, session_id: str, text: str, use_cache: bool = True, task_id: str | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        run = await asyncio.to_thread(self._begin_message, session_id, text, use_cache, task_id)
+        chunks: list[str] = []
+        status: str | None = "cancelled"
+        try:
+            yield {"event": "start", "task_id": run.task_id, "delegated": run.delegated}
+            if run.delegated:
+                async with aclosing(self._aiter_pipeline(run)) as stages:
+                    async for stage in stages:
+                        run.sub_results.append(stage)
+                        yield {"event": "stage", "task_id": run.task_id, **stage}
+
+            completions: list[Completion] = []
+            final_prompt = self._final_prompt(run)
+            with span("provider.stream", phase="final") as call:
+                async for chunk in self.provider.astream(
+                    system_prompt=run.system_prompt,
+                    user_prompt=final_prompt,
+                    use_cache=run.use_cache,
+                    on_complete=completions.append,
+                ):
+                    chunks.append(chunk)
+                    yield {"event": "token", "task_id": run.task_id, "text": chunk}
+                if completions:
+                    call.set(chunks=len(chunks), **self._trace_completion(completions[-1]))
+            if completions and not completions[-1].ok:
+                status = "failed"
+                yield {"event": "error", "task_id": run.task_id, "detail": completions[-1].text}
+                return
+            done = await asyncio.to_thread(self._finish_message, run, "".join(chunks), final_prompt, completions)
+            status = None
+            yield {"event": "done", **done}
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            if status is not None:
+                # A disconnected client closes the stream early; never leave the root agent running.
+                await asyncio.shield(asyncio.to_thread(self._abort_message, run, "".join(chunks), status))
+
+    def _begin_message(
+        self,
+        session_id: str,
+        text: str,
+        use_cache: bool = True,
+        task_id: str | None = None,
+        on_stage: StageCallback | None = None,
+    ) -> MessageRun:
+        task_id = task_id or new_task_id()
+        with span("context.build"):
+            signal = style_mod.analyze_text(text)
+            self.styles.configure(self._style_config())
+            self.styles.record(signal)
+
+            if "du" in text.lower() and "bitte" in text.lower():
+                self.store.upsert_preference("preferred_tone", "freundlich-direkt", confidence=0.74)
+
+            self.agents.configure(self._registry_config())
+            snapshot, system_prompt = self.context.snapshot()
 
         root = self._start_agent(parent_id=None, role="orchestrator", task=text, task_id=task_id)
         self.bus.publish(sender_id="user", receiver_id=root.agent_id, task_id=task_id, payload={"text": text}, priority=7)
+        return MessageRun(
+            session_id=session_id,
+            text=text,
+            task_id=task_id,
+            signal=signal,
+            snapshot=snapshot,
+            system_prompt=system_prompt,
+            root=root,
+            delegated=self._should_delegate(text),
+            use_cache=use_cache,
+            on_stage=on_stage,
+        )
 
-        sub_results: list[dict[str, Any]] = []
-        if self._should_delegate(text):
-            sub_results = self._run_pipeline(root.agent_id, text, system_prompt, task_id)
-            combined = "\n".join(s["output"] for s in sub_results if s.get("output"))
-            final_prompt = f"Konsolidiere die folgenden Teilantworten:\n{combined}\n\nNutzerfrage:\n{text}"
-            reply = self.provider.generate(system_prompt=system_prompt, user_prompt=final_prompt)
-        else:
-            reply = self.provider.generate(system_prompt=system_prompt, user_prompt=text)
+    def _final_prompt(self, run: MessageRun) -> str:
+        if not run.delegated:
+            return run.text
+        combined = "\n".join(s["output"] for s in run.sub_results if s.get("output"))
+        return f"Konsolidiere die folgenden Teilantworten:\n{combined}\n\nNutzerfrage:\n{run.text}"
+
+    def _finish_message(
+        self, run: MessageRun, reply: str, final_prompt: str, completions: list[Completion]
+    ) -> dict[str, Any]:
+        tokens = sum(self._account(run, run.root, final_prompt, c) for c in completions)
+        return self._complete_message(run, reply, tokens)
+
+    def _abort_message(self, run: MessageRun, partial: str, status: str) -> None:
+        self._finish_agent(run.root.agent_id, partial, 0, status=status)
+        with span("store.write", ops="record_interaction,log_audit"):
+            if partial:
+                self.store.record_interaction(session_id=run.session_id, user_text=run.text, bot_text=partial)
+            self.store.log_audit(
+                actor="orchestrator",
+                action="stream_aborted",
+                payload={"session_id": run.session_id, "task_id": run.task_id, "chars": len(partial)},
+                result=status,
+            )
 
-        self._finish_agent(root.agent_id, reply)
+    def _complete_message(self, run: MessageRun, reply: str, token_usage: int) -> dict[str, Any]:
+        self._finish_agent(run.root.agent_id, reply, token_usage)
         self.bus.publish(
-            sender_id=root.agent_id,
+            sender_id=run.root.agent_id,
             receiver_id="user",
-            task_id=task_id,
+            task_id=run.task_id,
             payload={"reply": reply[:300]},
             priority=7,
         )
 
-        self.store.record_interaction(session_id=session_id, user_text=text, bot_text=reply)
-        self.store.log_audit(
-            actor="orchestrator",
-            action="process_message",
-            payload={
-                "session_id": session_id,
-                "task_id": task_id,
-                "text": text[:400],
-                "delegated": bool(sub_results),
-                "sub_agents": len(sub_results),
-            },
-            result="ok",
-        )
+        with span("store.write", ops="record_interaction,log_audit"):
+            self.store.record_interaction(session_id=run.session_id, user_text=run.text, bot_text=reply)
+            self.store.log_audit(
+                actor="orchestrator",
+                action="process_message",
+                payload={
+                    "session_id": run.session_id,
+                    "task_id": run.task_id,
+                    "text": run.text[:400],
+                    "delegated": bool(run.sub_results),
+                    "sub_agents": len(run.sub_results),
+                },
+                result="ok",
+            )
 
         return {
             "reply": reply,
-            "task_id": task_id,
-            "signal": signal,
-            "sub_agents": sub_results,
+            "task_id": run.task_id,
+            "signal": run.signal,
+            "sub_agents": run.sub_results,
+            "token_usage": token_usage + sum(s.get("token_usage", 0) for s in run.sub_results),
             "context_used": {
-                "preferences_count": len(snapshot["preferences"]),
-                "active_skills_count": len(snapshot["active_skills"]),
+                "preferences_count": len(run.snapshot["preferences"]),
+                "active_skills_count": len(run.snapshot["active_skills"]),
             },
         }
 
@@ -137,17 +357,337 @@ class Orchestrator:
     def _should_delegate(self, text: str) -> bool:
         return len(text) > 180 or " und " in text.lower() or ";" in text
 
-    def _run_pipeline(self, root_id: str, text: str, system_prompt: str, task_id: str) -> list[dict[str, Any]]:
+    def _run_pipeline(self, run: MessageRun) -> list[dict[str, Any]]:
+        results = []
+        for stage in self._iter_pipeline(run):
+            results.append(stage)
+            if run.on_stage:
+                run.on_stage(stage)
+        return results
+
+    async def _arun_pipeline(self, run: MessageRun) -> list[dict[str, Any]]:
+        results = []
+        async for stage in self._aiter_pipeline(run):
+            results.append(stage)
+            if run.on_stage:
+                run.on_stage(stage)
+        return results
+
+    def _iter_pipeline(self, run: MessageRun) -> Iterator[dict[str, Any]]:
+        plan = self._plan_pipeline(run.text)
+        if plan is None:
+            return
+        stages, options = plan
+
+        results: dict[str, dict[str, Any]] = {}
+        abort_reason: str | None = None
+        pool = ThreadPoolExecutor(max_workers=options.workers, thread_name_prefix="pipeline")
+        try:
+            for wave in self._pipeline_waves(stages):
+                agents = {s.stage_id: self._start_stage_agent(run, s) for s in wave}
+                cancels = {s.stage_id: threading.Event() for s in wave}
+                outcomes: dict[str, StageOutcome] = {}
+                if abort_reason is None:
+                    futures = {
+                        pool.submit(
+                            contextvars.copy_context().run,
+                            self._run_stage,
+                            run,
+                            agents[s.stage_id],
+                            self._stage_prompt(s, results),
+                            options,
+                            self._stage_key(run, s, results),
+                            cancels[s.stage_id],
+                        ): s.stage_id
+                        for s in wave
+                    }
+                    pending = set(futures)
+                    deadline = time.monotonic() + options.stage_timeout
+                    while pending:
+                        done, pending = wait(
+                            pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED
+                        )
+                        if not done:
+                            break
+                        for future in done:
+                            outcomes[futures[future]] = future.result()
+                        if options.fail_fast and any(not o.ok for o in outcomes.values()):
+                            break
+                    for future in pending:
+                        # A running stage thread cannot be interrupted; the flag stops its billing and cache write.
+                        cancels[futures[future]].set()
+                        future.cancel()
+                settled, abort_reason = self._settle_wave(run, wave, agents, results, outcomes, options, abort_reason)
+                yield from settled
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _aiter_pipeline(self, run: MessageRun) -> AsyncIterator[dict[str, Any]]:
+        plan = await asyncio.to_thread(self._plan_pipeline, run.text)
+        if plan is None:
+            return
+        stages, options = plan
+
+        results: dict[str, dict[str, Any]] = {}
+        abort_reason: str | None = None
+        limit = asyncio.Semaphore(options.workers)
+
+        async def bounded(
+            agent: AgentStatus, user_prompt: str, key: str | None, cancelled: threading.Event
+        ) -> StageOutcome:
+            async with limit:
+                return await self._arun_stage(run, agent, user_prompt, options, key, cancelled)
+
+        for wave in self._pipeline_waves(stages):
+            agents = {s.stage_id: self._start_stage_agent(run, s) for s in wave}
+            cancels = {s.stage_id: threading.Event() for s in wave}
+            outcomes: dict[str, StageOutcome] = {}
+            if abort_reason is None:
+                tasks = {
+                    asyncio.create_task(
+                        bounded(
+                            agents[s.stage_id],
+                            self._stage_prompt(s, results),
+                            self._stage_key(run, s, results),
+                            cancels[s.stage_id],
+                        )
+                    ): s.stage_id
+                    for s in wave
+                }
+                pending = set(tasks)
+                deadline = time.monotonic() + options.stage_timeout
+                try:
+                    while pending:
+                        done, pending = await asyncio.wait(
+                            pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                        )
+                        if not done:
+                            break
+                        for task in done:
+                            outcomes[tasks[task]] = task.result()
+                        if options.fail_fast and any(not o.ok for o in outcomes.values()):
+                            break
+                finally:
+                    for task in pending:
+                        cancels[tasks[task]].set()
+                        task.cancel()
+                    if pending:
+                        await asyncio.gather(*pending, return_exceptions=True)
+            settled, abort_reason = await asyncio.to_thread(
+                self._settle_wave, run, wave, agents, results, outcomes, options, abort_reason
+            )
+            for stage in settled:
+                yield stage
+
+    def _pipeline_waves(self, stages: list[PipelineStage]) -> list[list[PipelineStage]]:
+        done: set[str] = set()
+        remaining = list(stages)
+        waves: list[list[PipelineStage]] = []
+        while remaining:
+            wave = [s for s in remaining if all(d in done for d in s.depends_on)] or remaining
+            waves.append(sorted(wave, key=lambda s: s.index))
+            done.update(s.stage_id for s in wave)
+            remaining = [s for s in remaining if s.stage_id not in done]
+        return waves
+
+    def _start_stage_agent(self, run: MessageRun, stage: PipelineStage) -> AgentStatus:
+        return self._start_agent(parent_id=run.root.agent_id, role=stage.role, task=stage.task, task_id=run.task_id)
+
+    def _run_stage(
+        self,
+        run: MessageRun,
+        agent: AgentStatus,
+        user_prompt: str,
+        options: PipelineOptions,
+        key: str | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> StageOutcome:
+        with span("stage", agent_id=agent.agent_id, role=agent.role) as stage_span:
+            cached = self._stage_cache_get(key)
+            if cached is not None:
+                stage_span.set(cache_hit=True)
+                return cached
+            outcome = StageOutcome()
+            try:
+                for attempt in range(options.max_retries + 1):
+                    if _is_set(cancelled):
+                        return _abandoned(outcome)
+                    with span("stage.attempt", attempt=attempt), span("provider.call", phase="stage") as call:
+                        result = self.provider.generate_result(
+                            system_prompt=run.system_prompt, user_prompt=user_prompt, use_cache=run.use_cache
+                        )
+                        call.set(**self._trace_completion(result))
+                    if _is_set(cancelled):
+                        return _abandoned(outcome)
+                    if self._stage_attempt(run, agent, user_prompt, result, outcome, attempt, options):
+                        break
+            except Exception as exc:  # noqa: BLE001
+                stage_span.set(error=str(exc)[:200])
+                return StageOutcome(output=f"Fehler: {exc}", token_usage=outcome.token_usage, ok=False)
+            stage_span.set(ok=outcome.ok, token_usage=outcome.token_usage)
+            if _is_set(cancelled):
+                return _abandoned(outcome)
+            self._stage_cache_put(key, outcome)
+            return outcome
+
+    async def _arun_stage(
+        self,
+        run: MessageRun,
+        agent: AgentStatus,
+        user_prompt: str,
+        options: PipelineOptions,
+        key: str | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> StageOutcome:
+        with span("stage", agent_id=agent.agent_id, role=agent.role) as stage_span:
+            cached = await asyncio.to_thread(self._stage_cache_get, key) if key is not None else None
+            if cached is not None:
+                stage_span.set(cache_hit=True)
+                return cached
+            outcome = StageOutcome()
+            try:
+                for attempt in range(options.max_retries + 1):
+                    with span("stage.attempt", attempt=attempt), span("provider.call", phase="stage") as call:
+                        result = await self.provider.agenerate_result(
+                            system_prompt=run.system_prompt, user_prompt=user_prompt, use_cache=run.use_cache
+                        )
+                        call.set(**self._trace_completion(result))
+                    if _is_set(cancelled):
+                        return _abandoned(outcome)
+                    if await asyncio.to_thread(
+                        self._stage_attempt, run, agent, user_prompt, result, outcome, attempt, options
+                    ):
+                        break
+            except Exception as exc:  # noqa: BLE001
+                stage_span.set(error=str(exc)[:200])
+                return StageOutcome(output=f"Fehler: {exc}", token_usage=outcome.token_usage, ok=False)
+            stage_span.set(ok=outcome.ok, token_usage=outcome.token_usage)
+            if key is not None and not _is_set(cancelled):
+                await asyncio.to_thread(self._stage_cache_put, key, outcome)
+            return outcome
+
+    def stage_cache_settings(self) -> dict[str, Any]:
+        settings = self._pipeline_config().get("stage_cache", {})
+        return dict(DEFAULT_STAGE_CACHE, **(settings if isinstance(settings, dict) else {}))
+
+    def _stage_key(self, run: MessageRun, stage: PipelineStage, results: dict[str, dict[str, Any]]) -> str | None:
+        if not run.use_cache or not self.stage_cache_settings()["enabled"]:
+            return None
+        provider, model = self._active_model()
+        dependencies = [results[d].get("output", "") for d in stage.depends_on if d in results]
+        return stage_cache_key(provider, model, run.system_prompt, stage.task, dependencies)
+
+    def _stage_cache_get(self, key: str | None) -> StageOutcome | None:
+        if key is None:
+            return None
+        output = self.stage_cache.get(key, "pipeline", float(self.stage_cache_settings()["ttl_seconds"]))
+        if output is None:
+            return None
+        return StageOutcome(output=output, cache_hit=True)
+
+    def _stage_cache_put(self, key: str | None, outcome: StageOutcome) -> None:
+        if key is None or not outcome.ok or not outcome.output:
+            return
+        _, model = self._active_model()
+        self.stage_cache.put(key, "pipeline", model, outcome.output, int(self.stage_cache_settings()["max_entries"]))
+
+    def _active_model(self) -> tuple[str, str]:
+        try:
+            cfg = self.provider.load_config()
+            return cfg.active, str(cfg.options.get(cfg.active, {}).get("model", ""))
+        except Exception:
+            return "unknown", ""
+
+    def _trace_completion(self, result: Completion) -> dict[str, Any]:
+        return {
+            "provider": result.provider,
+            "model": result.model,
+            "ok": result.ok,
+            "latency_ms": round(result.latency_ms, 3),
+            "cached": result.cached,
+            "coalesced": result.coalesced,
+            "hedged": result.hedged,
+            "prompt_tokens": int(result.usage.get("prompt_tokens", 0)),
+            "completion_tokens": int(result.usage.get("completion_tokens", 0)),
+            "response_chars": len(result.text),
+        }
+
+    def _stage_attempt(
+        self,
+        run: MessageRun,
+        agent: AgentStatus,
+        user_prompt: str,
+        result: Completion,
+        outcome: StageOutcome,
+        attempt: int,
+        options: PipelineOptions,
+    ) -> bool:
+        outcome.token_usage += self._account(run, agent, user_prompt, result)
+        outcome.output = result.text
+        outcome.ok = result.ok
+        if result.text:
+            return True
+        if attempt == options.max_retries:
+            outcome.output = "Fehler: keine Ausgabe"
+            outcome.ok = False
+        return False
+
+    def _settle_wave(
+        self,
+        run: MessageRun,
+        wave: list[PipelineStage],
+        agents: dict[str, AgentStatus],
+        results: dict[str, dict[str, Any]],
+        outcomes: dict[str, StageOutcome],
+        options: PipelineOptions,
+        abort_reason: str | None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        cancelled = options.fail_fast and any(not o.ok for o in outcomes.values())
+        settled: list[dict[str, Any]] = []
+        for stage in wave:
+            outcome = outcomes.get(stage.stage_id)
+            cache_hit = outcome is not None and outcome.cache_hit
+            if outcome is not None:
+                status = "done" if outcome.ok else "failed"
+                output, tokens = outcome.output, outcome.token_usage
+            elif abort_reason is not None:
+                status, output, tokens = "skipped", f"Übersprungen: {abort_reason}", 0
+            elif cancelled:
+                status, output, tokens = "cancelled", "Abgebrochen: eine parallele Stufe ist fehlgeschlagen", 0
+            else:
+                status, output, tokens = "timeout", f"Fehler: Zeitlimit von {options.stage_timeout:g}s überschritten", 0
+            results[stage.stage_id] = self._finish_stage(
+                run, stage, agents[stage.stage_id], output, tokens, status, cache_hit
+            )
+            settled.append(results[stage.stage_id])
+
+        failed = [r["stage"] for r in settled if r["status"] in {"failed", "timeout"}]
+        if abort_reason is None and options.fail_fast and failed:
+            abort_reason = f"Stufe {', '.join(failed)} fehlgeschlagen"
+            self.store.log_audit(
+                actor="orchestrator",
+                action="pipeline_aborted",
+                payload={"task_id": run.task_id, "stages": failed},
+                result="failed",
+            )
+        return settled, abort_reason
+
+    def _plan_pipeline(self, text: str) -> tuple[list[PipelineStage], PipelineOptions] | None:
         parts = self._split_task(text)
         max_agents = self._max_active_agents()
         parts = parts[: max(1, max_agents - 1)]
 
         pipeline_cfg = self._pipeline_config()
         mode = str(pipeline_cfg.get("mode", "sequential")).lower()
-        max_retries = int(pipeline_cfg.get("max_retries", 1))
+        options = PipelineOptions(
+            max_retries=int(pipeline_cfg.get("max_retries", 1)),
+            stage_timeout=float(pipeline_cfg.get("stage_timeout", 120)),
+            fail_fast=bool(pipeline_cfg.get("fail_fast", False)),
+            workers=max(1, min(len(parts), max_agents - 1)),
+        )
 
         stage_ids = [f"s{i + 1}" for i in range(len(parts))]
-        graph = {sid: [] for sid in stage_ids}
+        graph: dict[str, list[str]] = {sid: [] for sid in stage_ids}
 
         if mode == "sequential":
             for idx in range(1, len(stage_ids)):
@@ -155,41 +695,55 @@ class Orchestrator:
 
         if self._has_cycle(graph):
             self.store.log_audit(actor="orchestrator", action="pipeline_cycle_detected", payload={"graph": graph}, result="blocked")
-            return []
+            return None
 
-        order = self._topological_order(graph)
         order_index = {sid: i for i, sid in enumerate(stage_ids)}
+        stages = [
+            PipelineStage(stage_id=sid, index=order_index[sid], task=parts[order_index[sid]], depends_on=graph.get(sid, []))
+            for sid in self._topological_order(graph)
+        ]
+        return stages, options
 
-        results: dict[str, dict[str, Any]] = {}
-        for sid in order:
-            idx = order_index[sid]
-            part = parts[idx]
-            role = f"worker-{idx + 1}"
-            agent = self._start_agent(parent_id=root_id, role=role, task=part, task_id=task_id)
-
-            deps = graph.get(sid, [])
-            dep_text = "\n".join(results[d]["output"] for d in deps if d in results and results[d].get("output"))
-            user_prompt = part if not dep_text else f"Kontext aus vorherigen Stufen:\n{dep_text}\n\nAufgabe:\n{part}"
-
-            output = ""
-            for attempt in range(max_retries + 1):
-                output = self.provider.generate(system_prompt=system_prompt, user_prompt=user_prompt)
-                if output:
-                    break
-                if attempt == max_retries:
-                    output = "Fehler: keine Ausgabe"
-
-            self._finish_agent(agent.agent_id, output)
-            self.bus.publish(
-                sender_id=agent.agent_id,
-                receiver_id=root_id,
-                task_id=task_id,
-                payload={"stage": sid, "role": role, "output": output[:300]},
-                priority=5,
-            )
-            results[sid] = {"agent_id": agent.agent_id, "task": part, "output": output, "stage": sid, "depends_on": deps}
-
-        return [results[sid] for sid in order if sid in results]
+    def _stage_prompt(self, stage: PipelineStage, results: dict[str, dict[str, Any]]) -> str:
+        dep_text = "\n".join(
+            results[d]["output"] for d in stage.depends_on if d in results and results[d].get("output")
+        )
+        return stage.task if not dep_text else f"Kontext aus vorherigen Stufen:\n{dep_text}\n\nAufgabe:\n{stage.task}"
+
+    def _finish_stage(
+        self,
+        run: MessageRun,
+        stage: PipelineStage,
+        agent: AgentStatus,
+        output: str,
+        token_usage: int,
+        status: str = "done",
+        cache_hit: bool = False,
+    ) -> dict[str, Any]:
+        self._finish_agent(agent.agent_id, output, token_usage, status)
+        self.bus.publish(
+            sender_id=agent.agent_id,
+            receiver_id=run.root.agent_id,
+            task_id=run.task_id,
+            payload={
+                "stage": stage.stage_id,
+                "role": stage.role,
+                "status": status,
+                "cache_hit": cache_hit,
+                "output": output[:300],
+            },
+            priority=5,
+        )
+        return {
+            "agent_id": agent.agent_id,
+            "task": stage.task,
+            "output": output,
+            "stage": stage.stage_id,
+            "depends_on": stage.depends_on,
+            "status": status,
+            "cache_hit": cache_hit,
+            "token_usage": token_usage,
+        }
 
     def _split_task(self, text: str) -> list[str]:
         chunks = [c.strip() for c in text.replace(";", ".").split(".") if c.strip()]
@@ -199,7 +753,7 @@ class Orchestrator:
 
     def _pipeline_config(self) -> dict[str, Any]:
         try:
-            cfg = json.loads(self.config_path.read_text(encoding="utf-8"))
+            cfg = self.config_manager.current()
             pipelines = cfg.get("pipelines", {})
             if isinstance(pipelines, dict):
                 return pipelines
@@ -248,9 +802,26 @@ class Orchestrator:
 
         return ordered if len(ordered) == len(graph) else list(graph.keys())
 
+    def _style_config(self) -> dict[str, Any]:
+        return self._section_config("style")
+
+    def _section_config(self, name: str) -> dict[str, Any]:
+        try:
+            section = self.config_manager.current().get(name, {})
+            return section if isinstance(section, dict) else {}
+        except Exception:
+            return {}
+
+    def _registry_config(self) -> dict[str, Any]:
+        try:
+            registry = self.config_manager.current().get("agents", {}).get("registry", {})
+            return registry if isinstance(registry, dict) else {}
+        except Exception:
+            return {}
+
     def _max_active_agents(self) -> int:
         try:
-            cfg = json.loads(self.config_path.read_text(encoding="utf-8"))
+            cfg = self.config_manager.current()
             return int(cfg.get("agents", {}).get("max_active", 4))
         except Exception:
             return 4
@@ -264,43 +835,74 @@ class Orchestrator:
             status="running",
             task_id=task_id,
         )
-        self._agents[agent.agent_id] = agent
+        self.agents.add(agent)
         return agent
 
-    def _finish_agent(self, agent_id: str, output: str) -> None:
-        agent = self._agents[agent_id]
-        agent.status = "done"
-        agent.output = output[:500]
-        agent.token_usage = estimate_tokens(agent.task) + estimate_tokens(output)
-        agent.ended_at = now_iso()
-
-    def agents_snapshot(self) -> list[dict[str, Any]]:
-        return [
-            {
-                "agent_id": a.agent_id,
-                "task_id": a.task_id,
-                "parent_id": a.parent_id,
-                "role": a.role,
-                "task": a.task,
-                "status": a.status,
-                "token_usage": a.token_usage,
-                "started_at": a.started_at,
-                "ended_at": a.ended_at,
+    def _account(self, run: MessageRun, agent: AgentStatus, user_prompt: str, result: Completion) -> int:
+        if not result.ok or result.cached or result.coalesced:
+            return 0
+        usage = result.usage
+        estimated = not usage
+        if estimated:
+            usage = {
+                "prompt_tokens": estimate_tokens(run.system_prompt) + estimate_tokens(user_prompt),
+                "completion_tokens": estimate_tokens(result.text),
             }
-            for a in self._agents.values()
-        ]
+        prompt_tokens = int(usage.get("prompt_tokens", 0))
+        completion_tokens = int(usage.get("completion_tokens", 0))
+        with span("store.write", ops="record_usage"):
+            self.store.record_usage(
+                session_id=run.session_id,
+                task_id=run.task_id,
+                agent_id=agent.agent_id,
+                provider=result.provider,
+                model=result.model,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cached_tokens=int(usage.get("cached_tokens", 0)),
+                estimated=estimated,
+            )
+        return prompt_tokens + completion_tokens
 
-    def topology_snapshot(self) -> dict[str, Any]:
-        agents = self.agents_snapshot()
+    def _finish_agent(self, agent_id: str, output: str, token_usage: int, status: str = "done") -> None:
+        agent = self.agents.get(agent_id)
+        if agent is None:
+            return
+        agent.status = status
+        agent.output = output[:500]
+        agent.token_usage = token_usage
+        agent.ended_at = now_iso()
+        self.agents.finished(agent)
+
+    def agents_page(
+        self,
+        task_id: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int = 200,
+        offset: int = 0,
+    ) -> dict[str, Any]:
+        page = self.agents.snapshot(task_id=task_id, since=since, until=until, limit=limit, offset=offset)
+        for a in page["agents"]:
+            a.pop("output", None)
+        return page
+
+    def agents_snapshot(self, **filters: Any) -> list[dict[str, Any]]:
+        return self.agents_page(**filters)["agents"]
+
+    def topology_snapshot(self, **filters: Any) -> dict[str, Any]:
+        page = self.agents_page(**filters)
+        agents = page.pop("agents")
         edges = []
         for a in agents:
             if a["parent_id"]:
                 edges.append({"from": a["parent_id"], "to": a["agent_id"], "task_id": a["task_id"]})
-        return {"nodes": agents, "edges": edges}
+        return {"nodes": agents, "edges": edges, **page, "usage": self.store.usage_by_provider()}
 
     def reflect(self) -> dict[str, Any]:
-        persona = persona_mod.load_or_create(self.paths.persona)
-        style = style_mod.load_or_create(self.paths.style)
+        self.styles.flush()
+        persona = copy.deepcopy(self.context.get("persona"))
+        style = self.context.get("style")
 
         if style.get("directness", 0.5) > 0.7:
             persona["tone"] = "sehr direkt und fokussiert"
@@ -311,21 +913,22 @@ class Orchestrator:
 
         persona["self_reflection"]["last_update"] = now_iso()
         persona_mod.save(self.paths.persona, persona)
+        self.context.update("persona", persona)
         self.store.log_audit(actor="orchestrator", action="reflect", payload={"tone": persona["tone"]}, result="ok")
         return {"updated_persona": persona}
 
     def propose_skill(self, name: str, description: str) -> dict[str, Any]:
-        registry = skills_mod.load_or_create(self.paths.skill_registry)
-        registry, draft = skills_mod.propose_skill(registry, name, description)
+        registry, draft = skills_mod.propose_skill(self.context.get("skills"), name, description)
         skills_mod.save(self.paths.skill_registry, registry)
+        self.context.update("skills", registry)
         md_path = skills_mod.write_skill_markdown(self.paths.root.parent / "skills", draft)
         self.store.log_audit(actor="orchestrator", action="propose_skill", payload=draft, result="ok")
         return {"draft": draft, "skill_markdown": str(md_path)}
 
     def approve_skill(self, skill_id: str) -> dict[str, Any]:
-        registry = skills_mod.load_or_create(self.paths.skill_registry)
-        registry = skills_mod.approve_skill(registry, skill_id)
+        registry = skills_mod.approve_skill(self.context.get("skills"), skill_id)
         skills_mod.save(self.paths.skill_registry, registry)
+        self.context.update("skills", registry)
 
         active = [s for s in registry.get("skills", []) if s.get("id") == skill_id and s.get("status") == "active"]
         if active:
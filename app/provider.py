@@ -1,34 +1,313 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import json
 import os
-import urllib.error
-import urllib.request
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator
 
+import httpx
+
+from .config_manager import ConfigManager
+from .limits import DEFAULT_LIMITS, ProviderLimiter, retry_after_seconds
+from .llm_cache import DEFAULT_CACHE, ResponseCache, cache_key
+from .metrics import CounterSet, LatencyHistogram
 from .secrets_store import SecretsStore
+from .tracing import span
+
+
+OPENAI_COMPATIBLE = {"openai", "github_models", "ollama", "lmstudio", "gemini"}
+STREAM_USAGE = {"openai"}
+DEFAULT_TEMPERATURE = 0.4
+
+DEFAULT_HEDGING = {
+    "enabled": False,
+    "quantile": 0.95,
+    "min_samples": 20,
+    "min_delay_ms": 250,
+    "max_delay_ms": 10000,
+}
+
+DEFAULT_HTTP = {
+    "timeout": 30.0,
+    "connect_timeout": 5.0,
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 30.0,
+    "http2": True,
+}
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # type: ignore  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class SSEParser:
+    def __init__(self) -> None:
+        self.event = "message"
+        self.data: list[str] = []
+
+    def feed(self, line: str) -> tuple[str, str] | None:
+        if not line:
+            return self.flush()
+        if line.startswith(":"):
+            return None
+        name, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if name == "event":
+            self.event = value
+        elif name == "data":
+            self.data.append(value)
+        return None
+
+    def flush(self) -> tuple[str, str] | None:
+        out = (self.event, "\n".join(self.data)) if self.data else None
+        self.event, self.data = "message", []
+        return out
+
+
+def iter_sse(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    parser = SSEParser()
+    for line in lines:
+        item = parser.feed(line)
+        if item:
+            yield item
+    item = parser.flush()
+    if item:
+        yield item
+
+
+async def aiter_sse(lines: AsyncIterable[str]) -> AsyncIterator[tuple[str, str]]:
+    parser = SSEParser()
+    async for line in lines:
+        item = parser.feed(line)
+        if item:
+            yield item
+    item = parser.flush()
+    if item:
+        yield item
+
+
+@dataclass
+class Completion:
+    text: str
+    provider: str
+    model: str
+    ok: bool = True
+    latency_ms: float = 0.0
+    cached: bool = False
+    hedged: bool = False
+    coalesced: bool = False
+    errors: list[str] = field(default_factory=list)
+    usage: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total_tokens(self) -> int:
+        return int(self.usage.get("prompt_tokens", 0)) + int(self.usage.get("completion_tokens", 0))
+
+
+def _coalesced(result: Completion) -> Completion:
+    return replace(result, coalesced=True, errors=list(result.errors), usage=dict(result.usage))
+
+
+def _http_attributes(resp: httpx.Response) -> dict[str, Any]:
+    return {
+        "status_code": resp.status_code,
+        "request_bytes": len(resp.request.content),
+        "response_bytes": len(resp.content),
+    }
+
+
+def parse_usage(active: str, payload: dict[str, Any] | None) -> dict[str, int]:
+    raw = (payload or {}).get("usage") or {}
+    if not isinstance(raw, dict) or not raw:
+        return {}
+    if active == "anthropic":
+        cache_read = int(raw.get("cache_read_input_tokens") or 0)
+        cache_write = int(raw.get("cache_creation_input_tokens") or 0)
+        usage = {}
+        if "input_tokens" in raw:
+            usage["prompt_tokens"] = int(raw.get("input_tokens") or 0) + cache_read + cache_write
+            usage["cached_tokens"] = cache_read
+        if "output_tokens" in raw:
+            usage["completion_tokens"] = int(raw.get("output_tokens") or 0)
+        return usage
+    details = raw.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": int(raw.get("prompt_tokens") or 0),
+        "completion_tokens": int(raw.get("completion_tokens") or 0),
+        "cached_tokens": int(details.get("cached_tokens") or 0),
+    }
 
 
 @dataclass
 class ProviderConfig:
     active: str
     options: dict[str, dict[str, Any]]
+    http: dict[str, Any] = field(default_factory=dict)
+    cache: dict[str, Any] = field(default_factory=dict)
+    failover: list[str] = field(default_factory=list)
+    hedging: dict[str, Any] = field(default_factory=dict)
+    single_flight: bool = True
+    limits: dict[str, Any] = field(default_factory=dict)
+
+    def chain(self) -> list[str]:
+        names = [self.active]
+        for name in self.failover:
+            if name in self.options and name not in names:
+                names.append(name)
+        return names
+
+    def hedge_settings(self) -> dict[str, Any]:
+        merged = dict(DEFAULT_HEDGING)
+        merged.update(self.hedging)
+        return merged
+
+    def http_settings(self, name: str) -> dict[str, Any]:
+        merged = dict(DEFAULT_HTTP)
+        merged.update(self.http)
+        merged.update(self.options.get(name, {}).get("http", {}) or {})
+        return merged
+
+    def limit_settings(self, name: str) -> dict[str, Any]:
+        merged = dict(DEFAULT_LIMITS)
+        merged.update(self.limits)
+        merged.update(self.options.get(name, {}).get("limits", {}) or {})
+        return merged
+
+    def cache_settings(self, name: str) -> dict[str, Any]:
+        merged = dict(DEFAULT_CACHE)
+        merged.update(self.cache)
+        if self.options.get(name, {}).get("cache") is False:
+            merged["enabled"] = False
+        return merged
+
+
+def _client_kwargs(http: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "http2": bool(http.get("http2")) and http2_available(),
+        "timeout": httpx.Timeout(float(http["timeout"]), connect=float(http["connect_timeout"])),
+        "limits": httpx.Limits(
+            max_connections=int(http["max_connections"]),
+            max_keepalive_connections=int(http["max_keepalive_connections"]),
+            keepalive_expiry=float(http["keepalive_expiry"]),
+        ),
+        "headers": {"User-Agent": "ontoti"},
+    }
 
 
 class ProviderRouter:
-    def __init__(self, config_path: Path, secrets: SecretsStore):
+    def __init__(
+        self,
+        config_path: Path,
+        secrets: SecretsStore,
+        cache: ResponseCache | None = None,
+        config_manager: ConfigManager | None = None,
+    ):
         self.config_path = config_path
+        self.config = config_manager or ConfigManager(config_path)
         self.secrets = secrets
+        self.cache = cache
+        self._parsed: tuple[int, ProviderConfig] | None = None
+        self._hedge_pool: ThreadPoolExecutor | None = None
+        self.latency: dict[str, LatencyHistogram] = {}
+        self.counters = CounterSet()
+        self.flights = CounterSet()
+        self._limiters: dict[str, ProviderLimiter] = {}
+        self._inflight: dict[str, Future[Completion]] = {}
+        self._inflight_lock = threading.Lock()
+        self._clients: dict[str, tuple[tuple[Any, ...], httpx.Client]] = {}
+        self._aclients: dict[tuple[str, asyncio.AbstractEventLoop], tuple[tuple[Any, ...], httpx.AsyncClient]] = {}
+        self._clients_lock = threading.Lock()
 
     def load_config(self) -> ProviderConfig:
-        data = json.loads(self.config_path.read_text(encoding="utf-8"))
-        provider = data.get("provider", {})
-        return ProviderConfig(
+        snapshot = self.config.snapshot()
+        parsed = self._parsed
+        if parsed is not None and parsed[0] == snapshot.version:
+            return parsed[1]
+        provider = snapshot.data.get("provider", {})
+        cfg = ProviderConfig(
             active=provider.get("active", "openai"),
             options=provider.get("options", {}),
+            http=provider.get("http", {}) or {},
+            cache=provider.get("cache", {}) or {},
+            failover=list(provider.get("failover", []) or []),
+            hedging=provider.get("hedging", {}) or {},
+            single_flight=bool(provider.get("single_flight", True)),
+            limits=provider.get("limits", {}) or {},
         )
+        self._parsed = (snapshot.version, cfg)
+        return cfg
+
+    def _client(self, name: str, http: dict[str, Any]) -> httpx.Client:
+        key = tuple(sorted((k, http.get(k)) for k in DEFAULT_HTTP))
+        stale: httpx.Client | None = None
+        with self._clients_lock:
+            entry = self._clients.get(name)
+            if entry and entry[0] == key:
+                return entry[1]
+            if entry:
+                stale = entry[1]
+            client = httpx.Client(**_client_kwargs(http))
+            self._clients[name] = (key, client)
+        if stale is not None:
+            stale.close()
+        return client
+
+    async def _aclient(self, name: str, http: dict[str, Any]) -> httpx.AsyncClient:
+        key = tuple(sorted((k, http.get(k)) for k in DEFAULT_HTTP))
+        loop = asyncio.get_running_loop()
+        stale: httpx.AsyncClient | None = None
+        with self._clients_lock:
+            entry = self._aclients.get((name, loop))
+            if entry and entry[0] == key:
+                return entry[1]
+            if entry:
+                stale = entry[1]
+            # Clients of closed loops can no longer be awaited; drop them so their pools are collected.
+            for owner in [k for k in self._aclients if k[1].is_closed()]:
+                del self._aclients[owner]
+            client = httpx.AsyncClient(**_client_kwargs(http))
+            self._aclients[(name, loop)] = (key, client)
+        if stale is not None:
+            await stale.aclose()
+        return client
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._clients_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ontoti-hedge")
+            return self._hedge_pool
+
+    def close(self) -> None:
+        with self._clients_lock:
+            clients = [client for _, client in self._clients.values()]
+            self._clients.clear()
+            pool, self._hedge_pool = self._hedge_pool, None
+        for client in clients:
+            client.close()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            aclients, self._aclients = self._aclients, {}
+        for (_, owner), (_, client) in aclients.items():
+            if owner is loop:
+                await client.aclose()
+            elif owner.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+        self.close()
 
     def describe_active(self) -> dict[str, Any]:
         cfg = self.load_config()
@@ -39,43 +318,518 @@ class ProviderRouter:
         return {
             "active": cfg.active,
             "settings": settings,
+            "http": cfg.http_settings(cfg.active),
         }
 
-    def generate(self, system_prompt: str, user_prompt: str) -> str:
+    def generate(self, system_prompt: str, user_prompt: str, use_cache: bool = True) -> str:
+        return self.generate_result(system_prompt, user_prompt, use_cache=use_cache).text
+
+    async def agenerate(self, system_prompt: str, user_prompt: str, use_cache: bool = True) -> str:
+        return (await self.agenerate_result(system_prompt, user_prompt, use_cache=use_cache)).text
+
+    def generate_result(self, system_prompt: str, user_prompt: str, use_cache: bool = True) -> Completion:
         cfg = self.load_config()
-        active = cfg.active
-        settings = cfg.options.get(active, {})
-        model = settings.get("model", "unknown-model")
+        cached = self._cache_lookup(cfg, cfg.active, system_prompt, user_prompt, use_cache)
+        if cached is not None:
+            return cached
+        result = self._single_flight(
+            self._flight_key(cfg, system_prompt, user_prompt),
+            lambda: self._run_chain(cfg, system_prompt, user_prompt),
+        )
+        if result.ok and use_cache and not result.coalesced:
+            self._cache_store(cfg, cfg.active, system_prompt, user_prompt, result.text)
+        return result
 
+    async def agenerate_result(self, system_prompt: str, user_prompt: str, use_cache: bool = True) -> Completion:
+        cfg = self.load_config()
+        cached = await self._acache_lookup(cfg, cfg.active, system_prompt, user_prompt, use_cache)
+        if cached is not None:
+            return cached
+        result = await self._asingle_flight(
+            self._flight_key(cfg, system_prompt, user_prompt),
+            lambda: self._arun_chain(cfg, system_prompt, user_prompt),
+        )
+        if result.ok and use_cache and not result.coalesced:
+            await self._acache_store(cfg, cfg.active, system_prompt, user_prompt, result.text)
+        return result
+
+    async def astream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        use_cache: bool = True,
+        on_complete: Callable[[Completion], None] | None = None,
+    ) -> AsyncIterator[str]:
+        cfg = self.load_config()
+        cached = await self._acache_lookup(cfg, cfg.active, system_prompt, user_prompt, use_cache)
+        if cached is not None:
+            if on_complete:
+                on_complete(cached)
+            yield cached.text
+            return
+
+        errors: list[tuple[str, str]] = []
+        for name in cfg.chain():
+            settings = cfg.options.get(name, {})
+            chunks: list[str] = []
+            usage: dict[str, int] = {}
+            started = time.perf_counter()
+            try:
+                request = self._require_request(name, settings, system_prompt, user_prompt)
+                client = await self._aclient(name, cfg.http_settings(name))
+                limits = cfg.limit_settings(name)
+                limiter = self._limiter(name, limits)
+                reserved = self._reserve_tokens(settings, system_prompt, user_prompt)
+                await limiter.aacquire(reserved, timeout=float(limits["queue_timeout"]))
+                try:
+                    async for chunk in self._astream_with(client, name, request, usage):
+                        chunks.append(chunk)
+                        yield chunk
+                finally:
+                    limiter.release()
+            except Exception as exc:  # noqa: BLE001
+                errors.append(self._failure(name, exc))
+                if chunks:
+                    # Tokens already reached the caller; a fallback would splice two replies together.
+                    break
+                continue
+            text = "".join(chunks)
+            result = self._settle(limiter, reserved, self._completed(name, settings, text, started, usage))
+            if use_cache:
+                await self._acache_store(cfg, cfg.active, system_prompt, user_prompt, text)
+            if on_complete:
+                on_complete(result)
+            return
+        if on_complete:
+            on_complete(self._failed(cfg, errors))
+
+    def _flight_key(self, cfg: ProviderConfig, system_prompt: str, user_prompt: str) -> str | None:
+        if not cfg.single_flight:
+            return None
+        settings = cfg.options.get(cfg.active, {})
+        return cache_key(
+            cfg.active,
+            settings.get("model", "unknown-model"),
+            system_prompt,
+            user_prompt,
+            self._temperature(cfg.active, settings),
+        )
+
+    def _join_flight(self, key: str) -> tuple[Future[Completion], bool]:
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.flights.incr("single_flight", "coalesced")
+                return flight, False
+            flight = Future()
+            self._inflight[key] = flight
+            self.flights.incr("single_flight", "leaders")
+            return flight, True
+
+    def _leave_flight(self, key: str, flight: Future[Completion]) -> None:
+        with self._inflight_lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+
+    def _single_flight(self, key: str | None, call: Callable[[], Completion]) -> Completion:
+        if key is None:
+            return call()
+        while True:
+            flight, leader = self._join_flight(key)
+            if leader:
+                break
+            try:
+                return _coalesced(flight.result())
+            except CancelledError:
+                # The leader was cancelled by its own caller; rejoin so a remaining caller runs the request.
+                continue
         try:
-            if active in {"openai", "github_models", "ollama", "lmstudio", "gemini"}:
-                return self._openai_compatible_chat(settings, system_prompt, user_prompt)
-            if active == "anthropic":
-                return self._anthropic_chat(settings, system_prompt, user_prompt)
-            return f"[{active}:{model}] Provider not implemented yet. Prompt: {user_prompt[:200]}"
-        except Exception as exc:  # noqa: BLE001
-            return f"[{active}:{model}] Provider call failed: {exc}"
+            result = call()
+            flight.set_result(result)
+            return result
+        except BaseException as exc:
+            flight.set_exception(exc)
+            raise
+        finally:
+            self._leave_flight(key, flight)
 
-    def verify_github_token(self, token: str) -> dict[str, Any]:
-        req = urllib.request.Request(
-            "https://api.github.com/user",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/vnd.github+json",
-                "User-Agent": "ontoti",
+    async def _asingle_flight(self, key: str | None, call: Callable[[], Awaitable[Completion]]) -> Completion:
+        if key is None:
+            return await call()
+        while True:
+            flight, leader = self._join_flight(key)
+            if leader:
+                break
+            try:
+                # Shielded so a follower's own cancellation never cancels the shared flight.
+                return _coalesced(await asyncio.shield(asyncio.wrap_future(flight)))
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+        try:
+            result = await call()
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # Followers still have connected clients: hand the request over instead of failing them.
+            self._leave_flight(key, flight)
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            raise
+        finally:
+            self._leave_flight(key, flight)
+
+    def _run_chain(self, cfg: ProviderConfig, system_prompt: str, user_prompt: str) -> Completion:
+        chain = cfg.chain()
+        errors: list[tuple[str, str]] = []
+        idx = 0
+        while idx < len(chain):
+            name = chain[idx]
+            backup = chain[idx + 1] if idx + 1 < len(chain) else None
+            delay = self._hedge_delay(cfg, name) if backup else None
+            if delay is None or backup is None:
+                try:
+                    return self._call(cfg, name, system_prompt, user_prompt)
+                except Exception as exc:  # noqa: BLE001
+                    errors.append(self._failure(name, exc))
+                    idx += 1
+                    continue
+            result, consumed = self._hedged_call(cfg, name, backup, delay, system_prompt, user_prompt, errors)
+            if result is not None:
+                return result
+            idx += consumed
+        return self._failed(cfg, errors)
+
+    async def _arun_chain(self, cfg: ProviderConfig, system_prompt: str, user_prompt: str) -> Completion:
+        chain = cfg.chain()
+        errors: list[tuple[str, str]] = []
+        idx = 0
+        while idx < len(chain):
+            name = chain[idx]
+            backup = chain[idx + 1] if idx + 1 < len(chain) else None
+            delay = self._hedge_delay(cfg, name) if backup else None
+            if delay is None or backup is None:
+                try:
+                    return await self._acall(cfg, name, system_prompt, user_prompt)
+                except Exception as exc:  # noqa: BLE001
+                    errors.append(self._failure(name, exc))
+                    idx += 1
+                    continue
+            result, consumed = await self._ahedged_call(cfg, name, backup, delay, system_prompt, user_prompt, errors)
+            if result is not None:
+                return result
+            idx += consumed
+        return self._failed(cfg, errors)
+
+    def _hedged_call(
+        self,
+        cfg: ProviderConfig,
+        primary: str,
+        backup: str,
+        delay: float,
+        system_prompt: str,
+        user_prompt: str,
+        errors: list[tuple[str, str]],
+    ) -> tuple[Completion | None, int]:
+        pool = self._pool()
+        # Each submit gets its own context copy so provider spans land in the caller's trace.
+        first = pool.submit(contextvars.copy_context().run, self._call, cfg, primary, system_prompt, user_prompt)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            try:
+                return first.result(), 1
+            except Exception as exc:  # noqa: BLE001
+                errors.append(self._failure(primary, exc))
+                return None, 1
+
+        self.counters.incr(primary, "hedged")
+        second = pool.submit(contextvars.copy_context().run, self._call, cfg, backup, system_prompt, user_prompt)
+        names = {first: primary, second: backup}
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    result = fut.result()
+                except Exception as exc:  # noqa: BLE001
+                    errors.append(self._failure(names[fut], exc))
+                    continue
+                # A running sync request cannot be interrupted; the loser finishes in the pool and is dropped.
+                for loser in pending:
+                    loser.cancel()
+                result.hedged = True
+                if fut is second:
+                    self.counters.incr(backup, "hedge_wins")
+                return result, 2
+        return None, 2
+
+    async def _ahedged_call(
+        self,
+        cfg: ProviderConfig,
+        primary: str,
+        backup: str,
+        delay: float,
+        system_prompt: str,
+        user_prompt: str,
+        errors: list[tuple[str, str]],
+    ) -> tuple[Completion | None, int]:
+        first = asyncio.create_task(self._acall(cfg, primary, system_prompt, user_prompt))
+        pending: set[asyncio.Task[Completion]] = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                try:
+                    return first.result(), 1
+                except Exception as exc:  # noqa: BLE001
+                    errors.append(self._failure(primary, exc))
+                    return None, 1
+
+            self.counters.incr(primary, "hedged")
+            second = asyncio.create_task(self._acall(cfg, backup, system_prompt, user_prompt))
+            names = {first: primary, second: backup}
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        result = task.result()
+                    except Exception as exc:  # noqa: BLE001
+                        errors.append(self._failure(names[task], exc))
+                        continue
+                    result.hedged = True
+                    if task is second:
+                        self.counters.incr(backup, "hedge_wins")
+                    return result, 2
+            return None, 2
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _hedge_delay(self, cfg: ProviderConfig, name: str) -> float | None:
+        hedging = cfg.hedge_settings()
+        if not hedging["enabled"]:
+            return None
+        histogram = self.latency.get(name)
+        if histogram is None or histogram.count < int(hedging["min_samples"]):
+            return None
+        estimate = histogram.quantile(float(hedging["quantile"]))
+        if estimate is None:
+            return None
+        delay_ms = min(max(estimate, float(hedging["min_delay_ms"])), float(hedging["max_delay_ms"]))
+        return delay_ms / 1000
+
+    def _require_request(
+        self, name: str, settings: dict[str, Any], system_prompt: str, user_prompt: str
+    ) -> tuple[str, dict[str, Any], dict[str, str]]:
+        request = self._build_request(name, settings, system_prompt, user_prompt)
+        if request is None:
+            raise ValueError("provider not implemented yet")
+        return request
+
+    def _call(self, cfg: ProviderConfig, name: str, system_prompt: str, user_prompt: str) -> Completion:
+        settings = cfg.options.get(name, {})
+        url, body, headers = self._require_request(name, settings, system_prompt, user_prompt)
+        client = self._client(name, cfg.http_settings(name))
+        limits = cfg.limit_settings(name)
+        limiter = self._limiter(name, limits)
+        reserved = self._reserve_tokens(settings, system_prompt, user_prompt)
+
+        for attempt in range(int(limits["retry_after_attempts"]) + 1):
+            with span("limiter.wait", provider=name):
+                limiter.acquire(reserved, timeout=float(limits["queue_timeout"]))
+            try:
+                with span("http.request", provider=name, attempt=attempt) as request_span:
+                    started = time.perf_counter()
+                    resp = client.post(url, json=body, headers=headers)
+                    request_span.set(**_http_attributes(resp))
+            finally:
+                limiter.release()
+            pause = self._retry_after(resp, limits)
+            if pause is None or attempt == int(limits["retry_after_attempts"]):
+                break
+            limiter.pause(pause)
+        resp.raise_for_status()
+        return self._settle(limiter, reserved, self._completion(name, settings, resp.json(), started))
+
+    async def _acall(self, cfg: ProviderConfig, name: str, system_prompt: str, user_prompt: str) -> Completion:
+        settings = cfg.options.get(name, {})
+        url, body, headers = self._require_request(name, settings, system_prompt, user_prompt)
+        client = await self._aclient(name, cfg.http_settings(name))
+        limits = cfg.limit_settings(name)
+        limiter = self._limiter(name, limits)
+        reserved = self._reserve_tokens(settings, system_prompt, user_prompt)
+
+        for attempt in range(int(limits["retry_after_attempts"]) + 1):
+            with span("limiter.wait", provider=name):
+                await limiter.aacquire(reserved, timeout=float(limits["queue_timeout"]))
+            try:
+                with span("http.request", provider=name, attempt=attempt) as request_span:
+                    started = time.perf_counter()
+                    resp = await client.post(url, json=body, headers=headers)
+                    request_span.set(**_http_attributes(resp))
+            finally:
+                limiter.release()
+            pause = self._retry_after(resp, limits)
+            if pause is None or attempt == int(limits["retry_after_attempts"]):
+                break
+            limiter.pause(pause)
+        resp.raise_for_status()
+        return self._settle(limiter, reserved, self._completion(name, settings, resp.json(), started))
+
+    def _limiter(self, name: str, limits: dict[str, Any]) -> ProviderLimiter:
+        with self._clients_lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                limiter = self._limiters[name] = ProviderLimiter(limits)
+                return limiter
+        limiter.configure(limits)
+        return limiter
+
+    def _completion(self, name: str, settings: dict[str, Any], payload: dict[str, Any], started: float) -> Completion:
+        text = self._parse_completion(name, payload)
+        return self._completed(name, settings, text, started, parse_usage(name, payload))
+
+    def _settle(self, limiter: ProviderLimiter, reserved: int, result: Completion) -> Completion:
+        if result.usage:
+            limiter.refund(reserved, result.total_tokens)
+        return result
+
+    def _reserve_tokens(self, settings: dict[str, Any], system_prompt: str, user_prompt: str) -> int:
+        return (len(system_prompt) + len(user_prompt)) // 4 + int(settings.get("max_tokens", 512))
+
+    def _retry_after(self, resp: httpx.Response, limits: dict[str, Any]) -> float | None:
+        pause = retry_after_seconds(resp.status_code, resp.headers)
+        if pause is None or pause > float(limits["max_retry_after"]):
+            return None
+        return pause
+
+    def _completed(
+        self, name: str, settings: dict[str, Any], text: str, started: float, usage: dict[str, int] | None = None
+    ) -> Completion:
+        latency_ms = (time.perf_counter() - started) * 1000
+        with self._clients_lock:
+            histogram = self.latency.setdefault(name, LatencyHistogram())
+        histogram.observe(latency_ms)
+        self.counters.incr(name, "ok")
+        return Completion(
+            text=text,
+            provider=name,
+            model=settings.get("model", "unknown-model"),
+            latency_ms=latency_ms,
+            usage=usage or {},
+        )
+
+    def _failure(self, name: str, exc: Exception) -> tuple[str, str]:
+        self.counters.incr(name, "errors")
+        return name, str(exc)
+
+    def _failed(self, cfg: ProviderConfig, errors: list[tuple[str, str]]) -> Completion:
+        model = cfg.options.get(cfg.active, {}).get("model", "unknown-model")
+        if len(errors) == 1:
+            detail = errors[0][1]
+        else:
+            detail = "; ".join(f"{name}: {error}" for name, error in errors)
+        return Completion(
+            text=f"[{cfg.active}:{model}] Provider call failed: {detail}",
+            provider=cfg.active,
+            model=model,
+            ok=False,
+            errors=[f"{name}: {error}" for name, error in errors],
+        )
+
+    def provider_metrics(self) -> dict[str, Any]:
+        counters = self.counters.snapshot()
+        with self._clients_lock:
+            histograms = dict(self.latency)
+            limiters = dict(self._limiters)
+        names = sorted(set(counters) | set(histograms) | set(limiters))
+        flights = self.flights.snapshot().get("single_flight", {})
+        return {
+            "providers": {
+                name: {
+                    **counters.get(name, {}),
+                    "latency": histograms[name].snapshot() if name in histograms else None,
+                    "limits": limiters[name].stats() if name in limiters else None,
+                }
+                for name in names
             },
-            method="GET",
+            "single_flight": {
+                "leaders": flights.get("leaders", 0),
+                "coalesced": flights.get("coalesced", 0),
+                "in_flight": len(self._inflight),
+            },
+        }
+
+    def cache_stats(self) -> dict[str, Any]:
+        if self.cache is None:
+            return {"enabled": False}
+        cfg = self.load_config()
+        return {"enabled": bool(cfg.cache_settings(cfg.active)["enabled"]), **self.cache.stats()}
+
+    def _cache_key(self, cfg: ProviderConfig, name: str, system_prompt: str, user_prompt: str) -> str | None:
+        if self.cache is None or not cfg.cache_settings(name)["enabled"]:
+            return None
+        settings = cfg.options.get(name, {})
+        return cache_key(
+            name,
+            settings.get("model", "unknown-model"),
+            system_prompt,
+            user_prompt,
+            self._temperature(name, settings),
         )
+
+    def _cache_lookup(
+        self, cfg: ProviderConfig, name: str, system_prompt: str, user_prompt: str, use_cache: bool
+    ) -> Completion | None:
+        key = self._cache_key(cfg, name, system_prompt, user_prompt) if use_cache else None
+        if key is None or self.cache is None:
+            return None
+        text = self.cache.get(key, name, float(cfg.cache_settings(name)["ttl_seconds"]))
+        if text is None:
+            return None
+        return Completion(text=text, provider=name, model=cfg.options.get(name, {}).get("model", "unknown-model"), cached=True)
+
+    def _cache_store(self, cfg: ProviderConfig, name: str, system_prompt: str, user_prompt: str, text: str) -> None:
+        key = self._cache_key(cfg, name, system_prompt, user_prompt)
+        if key is None or self.cache is None or not text:
+            return
+        model = cfg.options.get(name, {}).get("model", "unknown-model")
+        self.cache.put(key, name, model, text, int(cfg.cache_settings(name)["max_entries"]))
+
+    async def _acache_lookup(
+        self, cfg: ProviderConfig, name: str, system_prompt: str, user_prompt: str, use_cache: bool
+    ) -> Completion | None:
+        if self.cache is None or not use_cache or not cfg.cache_settings(name)["enabled"]:
+            return None
+        # The cache shares one connection and lock across requests; keep its I/O off the event loop.
+        return await asyncio.to_thread(self._cache_lookup, cfg, name, system_prompt, user_prompt, use_cache)
+
+    async def _acache_store(self, cfg: ProviderConfig, name: str, system_prompt: str, user_prompt: str, text: str) -> None:
+        if self.cache is None or not text or not cfg.cache_settings(name)["enabled"]:
+            return
+        await asyncio.to_thread(self._cache_store, cfg, name, system_prompt, user_prompt, text)
+
+    def verify_github_token(self, token: str) -> dict[str, Any]:
+        client = self._client("github_api", dict(DEFAULT_HTTP, timeout=8.0))
         try:
-            with urllib.request.urlopen(req, timeout=8) as resp:
-                payload = json.loads(resp.read().decode("utf-8"))
-                return {
-                    "ok": True,
-                    "login": payload.get("login"),
-                    "id": payload.get("id"),
-                }
-        except urllib.error.HTTPError as exc:
-            return {"ok": False, "error": f"GitHub HTTP {exc.code}"}
+            resp = client.get(
+                "https://api.github.com/user",
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Accept": "application/vnd.github+json",
+                },
+            )
+            resp.raise_for_status()
+            payload = resp.json()
+            return {
+                "ok": True,
+                "login": payload.get("login"),
+                "id": payload.get("id"),
+            }
+        except httpx.HTTPStatusError as exc:
+            return {"ok": False, "error": f"GitHub HTTP {exc.response.status_code}"}
         except Exception as exc:  # noqa: BLE001
             return {"ok": False, "error": str(exc)}
 
@@ -86,7 +840,25 @@ class ProviderRouter:
             token = os.getenv(token_env) or self.secrets.get_secret(token_env)
         return token_env, token
 
-    def _openai_compatible_chat(self, settings: dict[str, Any], system_prompt: str, user_prompt: str) -> str:
+    def _temperature(self, active: str, settings: dict[str, Any]) -> float | None:
+        if active in OPENAI_COMPATIBLE:
+            return float(settings.get("temperature", DEFAULT_TEMPERATURE))
+        if "temperature" in settings:
+            return float(settings["temperature"])
+        return None
+
+    def _build_request(
+        self, active: str, settings: dict[str, Any], system_prompt: str, user_prompt: str
+    ) -> tuple[str, dict[str, Any], dict[str, str]] | None:
+        if active in OPENAI_COMPATIBLE:
+            return self._openai_compatible_request(settings, system_prompt, user_prompt)
+        if active == "anthropic":
+            return self._anthropic_request(settings, system_prompt, user_prompt)
+        return None
+
+    def _openai_compatible_request(
+        self, settings: dict[str, Any], system_prompt: str, user_prompt: str
+    ) -> tuple[str, dict[str, Any], dict[str, str]]:
         base_url = settings.get("base_url", "").rstrip("/")
         model = settings.get("model", "unknown-model")
         token_env, token = self._get_token(settings)
@@ -103,31 +875,17 @@ class ProviderRouter:
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
-            "temperature": 0.4,
+            "temperature": self._temperature("openai", settings),
         }
 
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "ontoti",
-        }
+        headers = {"Content-Type": "application/json"}
         if token:
             headers["Authorization"] = f"Bearer {token}"
+        return url, body, headers
 
-        req = urllib.request.Request(
-            url,
-            data=json.dumps(body).encode("utf-8"),
-            headers=headers,
-            method="POST",
-        )
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            payload = json.loads(resp.read().decode("utf-8"))
-
-        try:
-            return payload["choices"][0]["message"]["content"]
-        except Exception as exc:  # noqa: BLE001
-            raise ValueError(f"invalid provider response: {payload}") from exc
-
-    def _anthropic_chat(self, settings: dict[str, Any], system_prompt: str, user_prompt: str) -> str:
+    def _anthropic_request(
+        self, settings: dict[str, Any], system_prompt: str, user_prompt: str
+    ) -> tuple[str, dict[str, Any], dict[str, str]]:
         base_url = settings.get("base_url", "https://api.anthropic.com/v1").rstrip("/")
         model = settings.get("model", "claude-3-5-sonnet-20241022")
         token_env, token = self._get_token(settings)
@@ -139,21 +897,72 @@ class ProviderRouter:
         url = f"{base_url}/messages"
         body = {
             "model": model,
-            "max_tokens": 512,
+            "max_tokens": int(settings.get("max_tokens", 512)),
             "system": system_prompt,
             "messages": [{"role": "user", "content": user_prompt}],
         }
+        temperature = self._temperature("anthropic", settings)
+        if temperature is not None:
+            body["temperature"] = temperature
         headers = {
             "Content-Type": "application/json",
             "x-api-key": token,
             "anthropic-version": "2023-06-01",
-            "User-Agent": "ontoti",
         }
-        req = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), headers=headers, method="POST")
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            payload = json.loads(resp.read().decode("utf-8"))
+        return url, body, headers
 
+    def _parse_completion(self, active: str, payload: dict[str, Any]) -> str:
+        if active == "anthropic":
+            try:
+                return payload["content"][0]["text"]
+            except Exception as exc:  # noqa: BLE001
+                raise ValueError(f"invalid anthropic response: {payload}") from exc
         try:
-            return payload["content"][0]["text"]
+            return payload["choices"][0]["message"]["content"]
         except Exception as exc:  # noqa: BLE001
-            raise ValueError(f"invalid anthropic response: {payload}") from exc
+            raise ValueError(f"invalid provider response: {payload}") from exc
+
+    def _parse_stream_event(
+        self, active: str, event: str, data: str, usage: dict[str, int] | None = None
+    ) -> tuple[bool, str]:
+        if active == "anthropic":
+            if event == "message_stop":
+                return True, ""
+            payload = json.loads(data)
+            if event == "error":
+                raise ValueError(f"anthropic stream error: {payload.get('error', payload)}")
+            if event == "content_block_delta":
+                return False, (payload.get("delta") or {}).get("text") or ""
+            if usage is not None and event in {"message_start", "message_delta"}:
+                usage.update(parse_usage(active, payload.get("message") or payload))
+            return False, ""
+
+        if data == "[DONE]":
+            return True, ""
+        chunk = json.loads(data)
+        if usage is not None and chunk.get("usage"):
+            usage.update(parse_usage(active, chunk))
+        text = "".join((choice.get("delta") or {}).get("content") or "" for choice in chunk.get("choices") or [])
+        return False, text
+
+    def _stream_body(self, active: str, body: dict[str, Any]) -> dict[str, Any]:
+        if active in STREAM_USAGE:
+            return dict(body, stream=True, stream_options={"include_usage": True})
+        return dict(body, stream=True)
+
+    async def _astream_with(
+        self,
+        client: httpx.AsyncClient,
+        active: str,
+        request: tuple[str, dict[str, Any], dict[str, str]],
+        usage: dict[str, int] | None = None,
+    ) -> AsyncIterator[str]:
+        url, body, headers = request
+        async with client.stream("POST", url, json=self._stream_body(active, body), headers=headers) as resp:
+            resp.raise_for_status()
+            async for event, data in aiter_sse(resp.aiter_lines()):
+                done, text = self._parse_stream_event(active, event, data, usage)
+                if text:
+                    yield text
+                if done:
+                    break
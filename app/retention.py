@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+from .store import PAGED_TABLES, MemoryStore, utc_now
+
+
+DEFAULT_RETENTION = {
+    "enabled": False,
+    "interval": 3600.0,
+    "archive_dir": "data/archive",
+    "batch_size": 1000,
+    "vacuum_pages": 2000,
+    "tables": {
+        "interaction_signals": {"days": 90},
+        "webhook_events": {"days": 30},
+        "audit_events": {"days": 0},
+    },
+}
+
+RETENTION_TABLES = tuple(PAGED_TABLES)
+
+
+def write_segment(root: Path, table: str, rows: list[dict[str, Any]]) -> dict[str, Any]:
+    time_column = PAGED_TABLES[table][0]
+    day = str(rows[0][time_column])[:10]
+    folder = root / table / day
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{rows[0]['id']:012d}-{rows[-1]['id']:012d}.jsonl.gz"
+    tmp = path.with_name(f".{path.name}.tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+        for row in rows:
+            fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+    segment = {
+        "file": str(path.relative_to(root)),
+        "day": day,
+        "first_id": rows[0]["id"],
+        "last_id": rows[-1]["id"],
+        "rows": len(rows),
+        "archived_at": utc_now().isoformat(),
+    }
+    if table == "audit_events":
+        segment["prev_hash"] = rows[0]["prev_hash"]
+        segment["event_hash"] = rows[-1]["event_hash"]
+    with (root / table / "manifest.jsonl").open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps(segment) + "\n")
+    return segment
+
+
+def list_segments(root: Path, table: str) -> list[dict[str, Any]]:
+    manifest = root / table / "manifest.jsonl"
+    if not manifest.exists():
+        return []
+    segments: dict[str, dict[str, Any]] = {}
+    for line in manifest.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            segment = json.loads(line)
+            segments[segment["file"]] = segment
+    return sorted(segments.values(), key=lambda s: s["first_id"])
+
+
+def read_archive(
+    root: Path,
+    table: str,
+    since: str | None = None,
+    until: str | None = None,
+    after_id: int | None = None,
+    limit: int = 1000,
+) -> list[dict[str, Any]]:
+    time_column = PAGED_TABLES[table][0]
+    out: list[dict[str, Any]] = []
+    for segment in list_segments(root, table):
+        if since and segment["day"] < since[:10]:
+            continue
+        if until and segment["day"] > until[:10]:
+            continue
+        if after_id is not None and segment["last_id"] <= after_id:
+            continue
+        with gzip.open(root / segment["file"], "rt", encoding="utf-8") as fh:
+            for line in fh:
+                row = json.loads(line)
+                if after_id is not None and row["id"] <= after_id:
+                    continue
+                if since and row[time_column] < since:
+                    continue
+                if until and row[time_column] >= until:
+                    continue
+                out.append(row)
+                if len(out) >= limit:
+                    return out
+    return out
+
+
+def _by_day(table: str, rows: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+    time_column = PAGED_TABLES[table][0]
+    groups: list[list[dict[str, Any]]] = []
+    for row in rows:
+        if groups and str(groups[-1][0][time_column])[:10] == str(row[time_column])[:10]:
+            groups[-1].append(row)
+        else:
+            groups.append([row])
+    return groups
+
+
+class RetentionCompactor:
+    def __init__(self, store: MemoryStore, settings: dict[str, Any] | None = None):
+        self.store = store
+        self.enabled = DEFAULT_RETENTION["enabled"]
+        self.interval = DEFAULT_RETENTION["interval"]
+        self.archive_dir = Path(DEFAULT_RETENTION["archive_dir"])
+        self.batch_size = DEFAULT_RETENTION["batch_size"]
+        self.vacuum_pages = DEFAULT_RETENTION["vacuum_pages"]
+        self.tables: dict[str, dict[str, Any]] = {}
+        self.last_run: dict[str, Any] | None = None
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.configure(settings or {})
+
+    def configure(self, settings: dict[str, Any]) -> None:
+        merged = dict(DEFAULT_RETENTION, **settings)
+        self.enabled = bool(merged["enabled"])
+        self.interval = max(1.0, float(merged["interval"]))
+        self.archive_dir = Path(merged["archive_dir"])
+        self.batch_size = max(1, int(merged["batch_size"]))
+        self.vacuum_pages = max(1, int(merged["vacuum_pages"]))
+        tables = {name: dict(policy) for name, policy in DEFAULT_RETENTION["tables"].items()}
+        for name, policy in (merged.get("tables") or {}).items():
+            tables.setdefault(name, {}).update(policy)
+        self.tables = {name: policy for name, policy in tables.items() if name in RETENTION_TABLES}
+
+    def _cutoff(self, table: str) -> str | None:
+        days = float(self.tables.get(table, {}).get("days", 0) or 0)
+        if days <= 0:
+            return None
+        return (utc_now() - timedelta(days=days)).isoformat()
+
+    def _archive_rows(self, table: str, cutoff: str) -> dict[str, Any]:
+        archived = segments = 0
+        while True:
+            rows = self.store.expired_rows(table, cutoff, self.batch_size)
+            if not rows:
+                break
+            for group in _by_day(table, rows):
+                write_segment(self.archive_dir, table, group)
+                segments += 1
+            archived += self.store.delete_rows(table, [row["id"] for row in rows])
+        return {"archived": archived, "segments": segments}
+
+    def _archive_audit(self, cutoff: str) -> dict[str, Any]:
+        checkpoint = self.store.audit_checkpoint_before(cutoff)
+        if checkpoint is None:
+            return {"archived": 0, "segments": 0}
+        if not checkpoint["valid"]:
+            return {"archived": 0, "segments": 0, "error": f"checkpoint {checkpoint['event_id']} invalid"}
+        anchor = self.store.audit_anchor()
+        first_id = anchor["event_id"] if anchor else 0
+        prev = anchor["event_hash"] if anchor else "GENESIS"
+        last_id, segments = first_id, 0
+        while last_id < checkpoint["event_id"]:
+            rows = self.store.audit_rows(last_id, checkpoint["event_id"], self.batch_size)
+            if not rows:
+                break
+            for row in rows:
+                calc = self.store._compute_hash(
+                    row["timestamp"], row["actor"], row["action"], row["payload"], row["result"], prev
+                )
+                if row["prev_hash"] != prev or row["event_hash"] != calc:
+                    return {"archived": 0, "segments": segments, "error": f"chain broken at {row['id']}"}
+                prev = row["event_hash"]
+            for group in _by_day("audit_events", rows):
+                write_segment(self.archive_dir, "audit_events", group)
+                segments += 1
+            last_id = rows[-1]["id"]
+        if prev != checkpoint["event_hash"]:
+            return {"archived": 0, "segments": segments, "error": "checkpoint hash mismatch"}
+        archived = self.store.archive_audit(checkpoint["id"], first_id, checkpoint["event_id"])
+        return {"archived": archived, "segments": segments, "checkpoint": checkpoint["event_id"]}
+
+    def run_once(self) -> dict[str, Any]:
+        with self._run_lock:
+            started = time.perf_counter()
+            report: dict[str, Any] = {"started_at": utc_now().isoformat(), "tables": {}}
+            for table in self.tables:
+                cutoff = self._cutoff(table)
+                if cutoff is None:
+                    continue
+                try:
+                    if table == "audit_events":
+                        result = self._archive_audit(cutoff)
+                    else:
+                        result = self._archive_rows(table, cutoff)
+                except Exception as exc:  # noqa: BLE001
+                    result = {"archived": 0, "segments": 0, "error": str(exc)}
+                report["tables"][table] = dict(result, cutoff=cutoff)
+            report["vacuum"] = self.store.vacuum(self.vacuum_pages)
+            report["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self.last_run = report
+        if any(r["archived"] for r in report["tables"].values()):
+            archived = {table: r["archived"] for table, r in report["tables"].items()}
+            self.store.log_audit("retention", "compact", archived, "ok")
+        return report
+
+    def convert(self) -> dict[str, Any]:
+        with self._run_lock:
+            started = time.perf_counter()
+            converted = self.store.convert_auto_vacuum()
+            report = {
+                "converted": converted,
+                "vacuum": self.store.vacuum(self.vacuum_pages),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        if converted:
+            self.store.log_audit("retention", "convert_auto_vacuum", {"duration_ms": report["duration_ms"]}, "ok")
+        return report
+
+    def read(self, table: str, **filters: Any) -> list[dict[str, Any]]:
+        return read_archive(self.archive_dir, table, **filters)
+
+    def status(self) -> dict[str, Any]:
+        segments = {table: list_segments(self.archive_dir, table) for table in RETENTION_TABLES}
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None,
+            "interval": self.interval,
+            "archive_dir": str(self.archive_dir),
+            "tables": self.tables,
+            "archive": {
+                table: {"segments": len(items), "rows": sum(s["rows"] for s in items)}
+                for table, items in segments.items()
+            },
+            "last_run": self.last_run,
+        }
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self.enabled and not self._stop.is_set():
+                try:
+                    self.run_once()
+                except Exception:  # noqa: BLE001
+                    pass
@@ -30,6 +30,36 @@ function appendMsg(role, text) {
   node.textContent = `${role.toUpperCase()}: ${text}`;
   $("#chat-log").appendChild(node);
   $("#chat-log").scrollTop = $("#chat-log").scrollHeight;
+  return node;
+}
+
+async function streamChat(body, onEvent) {
+  const resp = await fetch("/chat/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  if (!resp.ok || !resp.body) throw new Error(resp.statusText);
+
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) >= 0) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const data = block
+        .split("\n")
+        .filter((line) => line.startsWith("data:"))
+        .map((line) => line.slice(5).trim())
+        .join("\n");
+      if (data) onEvent(JSON.parse(data));
+    }
+  }
 }
 
 function splitCsv(value) {
@@ -199,9 +229,19 @@ $("#chat-form").addEventListener("submit", async (e) => {
   if (!text) return;
   appendMsg("user", `[${session_id}] ${text}`);
   $("#chat-input").value = "";
+  const node = appendMsg("bot", "");
+  let reply = "";
+  let failure = "";
   try {
-    const out = await api("/chat", { method: "POST", body: JSON.stringify({ session_id, text }) });
-    appendMsg("bot", out.reply || "(leer)");
+    await streamChat({ session_id, text }, (evt) => {
+      if (evt.event === "token") reply += evt.text;
+      if (evt.event === "done") reply = evt.reply || reply;
+      if (evt.event === "error") failure = evt.detail || "unbekannter Fehler";
+      node.textContent = `BOT: ${reply || "..."}`;
+      $("#chat-log").scrollTop = $("#chat-log").scrollHeight;
+    });
+    if (failure) node.textContent = `BOT: ${reply ? reply + "\n" : ""}Fehler: ${failure}`;
+    else if (!reply) node.textContent = "BOT: (leer)";
     await Promise.all([refreshTopology(), refreshBus(), refreshAgents(), refreshSessions()]);
   } catch (err) {
     appendMsg("bot", `Fehler: ${err.message}`);
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
 import hashlib
+import hmac
 import json
+import os
+import re
+import secrets
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 
 UTC = timezone.utc
@@ -16,6 +23,95 @@ def utc_now() -> datetime:
     return datetime.now(tz=UTC)
 
 
+DEFAULT_PRAGMAS = {
+    "auto_vacuum": "incremental",
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -16000,
+    "mmap_size": 134217728,
+    "busy_timeout": 5000,
+}
+
+DEFAULT_GROUP_COMMIT = {
+    "enabled": False,
+    "interval_ms": 5,
+    "max_batch": 200,
+}
+
+SEARCH_INDEXES = {
+    "audit": ("audit_events", "audit_fts", ("payload",), "actor, action, timestamp AS created_at"),
+    "interactions": ("interaction_signals", "interaction_fts", ("user_text", "bot_text"), "session_id, created_at"),
+    "webhooks": ("webhook_events", "webhook_fts", ("payload",), "source, status, created_at"),
+}
+
+
+def _search_schema() -> tuple[str, ...]:
+    statements: list[str] = []
+    for table, fts, columns, _ in SEARCH_INDEXES.values():
+        cols = ", ".join(columns)
+        new = ", ".join(f"new.{c}" for c in columns)
+        old = ", ".join(f"old.{c}" for c in columns)
+        statements += [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+    return tuple(statements)
+
+
+def fts_query(text: str) -> str:
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\w+\*?)', text):
+        term = (phrase or word).rstrip("*").replace('"', "")
+        if term.strip():
+            terms.append(f'"{term}"' + ("*" if word.endswith("*") else ""))
+    return " ".join(terms)
+
+
+SCHEMA_MIGRATIONS: list[tuple[int, tuple[str, ...]]] = [
+    (
+        1,
+        (
+            "CREATE INDEX IF NOT EXISTS idx_interaction_signals_session ON interaction_signals(session_id, id)",
+            "CREATE INDEX IF NOT EXISTS idx_interaction_signals_created ON interaction_signals(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_audit_events_actor ON audit_events(actor, id)",
+            "CREATE INDEX IF NOT EXISTS idx_audit_events_action ON audit_events(action, id)",
+            "CREATE INDEX IF NOT EXISTS idx_audit_events_timestamp ON audit_events(timestamp)",
+            "CREATE INDEX IF NOT EXISTS idx_webhook_events_source ON webhook_events(source, id)",
+            "CREATE INDEX IF NOT EXISTS idx_webhook_events_created ON webhook_events(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions(last_active, session_id)",
+        ),
+    ),
+    (2, _search_schema()),
+]
+
+PAGED_TABLES = {
+    "interaction_signals": ("created_at", ("session_id",)),
+    "audit_events": ("timestamp", ("actor", "action")),
+    "webhook_events": ("created_at", ("source",)),
+}
+
+COUNT_ESTIMATE_CAP = 10000
+
+EXPORT_COLUMNS = {
+    "audit_events": ["id", "timestamp", "actor", "action", "payload", "result", "prev_hash", "event_hash"],
+    "interaction_signals": ["id", "session_id", "user_text", "bot_text", "created_at"],
+}
+
+USAGE_ROLLUPS = {
+    "usage_hourly": ("hour", "provider", "model"),
+    "usage_sessions": ("session_id",),
+    "usage_providers": ("provider", "model"),
+}
+
+
 @dataclass
 class StorePaths:
     root: Path
@@ -23,6 +119,7 @@ class StorePaths:
     persona: Path
     style: Path
     skill_registry: Path
+    llm_cache: Path
 
 
 def default_paths(root: str = "data") -> StorePaths:
@@ -34,18 +131,162 @@ def default_paths(root: str = "data") -> StorePaths:
         persona=root_path / "persona.json",
         style=root_path / "style_profile.json",
         skill_registry=root_path / "skill_registry.json",
+        llm_cache=root_path / "llm_cache.db",
     )
 
 
 class MemoryStore:
-    def __init__(self, db_path: Path):
+    def __init__(
+        self,
+        db_path: Path,
+        pragmas: dict[str, Any] | None = None,
+        group_commit: dict[str, Any] | None = None,
+    ):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        self.group_commit = dict(DEFAULT_GROUP_COMMIT, **(group_commit or {}))
+        self.conn = self._connect()
+        self.preferences_version = 0
+        self._preferences_dirty = False
+        self._write_lock = threading.RLock()
+        self._committed = threading.Condition(self._write_lock)
+        self._depth = 0
+        self._written = 0
+        self._flushed = 0
+        self._commit_counts = {"commits": 0, "grouped_commits": 0, "grouped_writes": 0, "largest_group": 0}
+        self._committer: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._local = threading.local()
+        self._readers: list[tuple[threading.Thread, sqlite3.Connection]] = []
+        self._readers_lock = threading.Lock()
+        self._audit_tail: str | None = None
+        self._audit_key: bytes | None = None
+        self._audit_lock = threading.RLock()
         self._migrate()
 
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.pragmas["busy_timeout"] / 1000)
+        conn.row_factory = sqlite3.Row
+        for name in ("busy_timeout", "cache_size", "mmap_size"):
+            conn.execute(f"PRAGMA {name}={int(self.pragmas[name])}")
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        else:
+            conn.execute(f"PRAGMA auto_vacuum={self.pragmas['auto_vacuum']}")
+            conn.execute(f"PRAGMA journal_mode={self.pragmas['journal_mode']}")
+            conn.execute(f"PRAGMA synchronous={self.pragmas['synchronous']}")
+        return conn
+
+    @contextmanager
+    def _write(self, batched: bool = False, durable: bool = False) -> Iterator[sqlite3.Connection]:
+        grouped = batched and bool(self.group_commit["enabled"])
+        with self._write_lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self.conn
+                finally:
+                    self._depth -= 1
+                return
+            # A savepoint per call keeps a failed write from rolling back other callers' grouped rows.
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN")
+            self.conn.execute("SAVEPOINT store_write")
+            self._depth = 1
+            try:
+                yield self.conn
+            except BaseException:
+                self._audit_tail = None
+                self.conn.execute("ROLLBACK TO store_write")
+                self.conn.execute("RELEASE store_write")
+                raise
+            else:
+                self.conn.execute("RELEASE store_write")
+            finally:
+                self._depth = 0
+            if not grouped:
+                self._commit()
+                return
+            self._written += 1
+            ticket = self._written
+            if self._written - self._flushed >= int(self.group_commit["max_batch"]):
+                self._commit()
+            else:
+                self._start_committer()
+            if durable:
+                while self._flushed < ticket:
+                    self._committed.wait()
+
+    def _commit(self) -> None:
+        if self.conn.in_transaction:
+            self.conn.commit()
+            self._commit_counts["commits"] += 1
+        if self._preferences_dirty:
+            # Bumped only once the rows are committed, so readers never cache a stale read under the new version.
+            self._preferences_dirty = False
+            self.preferences_version += 1
+        grouped = self._written - self._flushed
+        if grouped:
+            self._commit_counts["grouped_commits"] += 1
+            self._commit_counts["grouped_writes"] += grouped
+            self._commit_counts["largest_group"] = max(self._commit_counts["largest_group"], grouped)
+        self._flushed = self._written
+        self._committed.notify_all()
+
+    def _start_committer(self) -> None:
+        if self._committer is None or not self._committer.is_alive():
+            self._stop.clear()
+            self._committer = threading.Thread(target=self._commit_loop, name="store-commit", daemon=True)
+            self._committer.start()
+
+    def _commit_loop(self) -> None:
+        interval = max(0.001, float(self.group_commit["interval_ms"]) / 1000)
+        while not self._stop.wait(interval):
+            with self._write_lock:
+                if self._flushed < self._written:
+                    self._commit()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            self._commit()
+
+    def _read(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        conn = self._local.conn = self._connect(read_only=True)
+        with self._readers_lock:
+            alive = [(t, c) for t, c in self._readers if t.is_alive()]
+            for _, stale in set(self._readers) - set(alive):
+                stale.close()
+            self._readers = alive + [(threading.current_thread(), conn)]
+        return conn
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._committer is not None:
+            self._committer.join(timeout=5)
+        self.flush()
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for _, conn in readers:
+            conn.close()
+        with self._write_lock:
+            self.conn.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._readers_lock:
+            readers = sum(1 for thread, _ in self._readers if thread.is_alive())
+        mode = self._read().execute("PRAGMA journal_mode").fetchone()[0]
+        with self._write_lock:
+            group = dict(self._commit_counts, pending=self._written - self._flushed, **self.group_commit)
+        return {"journal_mode": mode, "readers": readers, "pragmas": self.pragmas, "group_commit": group}
+
     def _migrate(self) -> None:
-        cur = self.conn.cursor()
+        with self._write() as conn:
+            self._create_schema(conn.cursor())
+
+    def _create_schema(self, cur: sqlite3.Cursor) -> None:
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS preferences (
@@ -113,6 +354,105 @@ class MemoryStore:
             )
             """
         )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS token_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                agent_id TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                cached_tokens INTEGER NOT NULL,
+                estimated INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS agent_archive (
+                agent_id TEXT PRIMARY KEY,
+                task_id TEXT NOT NULL,
+                parent_id TEXT,
+                role TEXT NOT NULL,
+                task TEXT NOT NULL,
+                status TEXT NOT NULL,
+                output TEXT,
+                token_usage INTEGER NOT NULL,
+                started_at TEXT NOT NULL,
+                ended_at TEXT
+            )
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_jobs (
+                task_id TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                use_cache INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                expires_at TEXT NOT NULL
+            )
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_chat_jobs_expires ON chat_jobs(expires_at)")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS trace_spans (
+                span_id TEXT PRIMARY KEY,
+                task_id TEXT NOT NULL,
+                trace_id TEXT NOT NULL,
+                parent_id TEXT,
+                name TEXT NOT NULL,
+                start_ns INTEGER NOT NULL,
+                end_ns INTEGER,
+                duration_ms REAL NOT NULL,
+                status TEXT NOT NULL,
+                attributes TEXT NOT NULL
+            )
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audit_checkpoints (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL,
+                event_hash TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                signature TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_trace_spans_task ON trace_spans(task_id, start_ns)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_trace_spans_start ON trace_spans(start_ns)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_agent_archive_task ON agent_archive(task_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_agent_archive_started ON agent_archive(started_at)")
+        for table, keys in USAGE_ROLLUPS.items():
+            key_cols = ",\n".join(f"{k} TEXT NOT NULL" for k in keys)
+            cur.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key_cols},
+                    requests INTEGER NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    cached_tokens INTEGER NOT NULL,
+                    estimated_requests INTEGER NOT NULL,
+                    last_at TEXT NOT NULL,
+                    PRIMARY KEY ({", ".join(keys)})
+                )
+                """
+            )
 
         cols = {r["name"] for r in cur.execute("PRAGMA table_info(audit_events)").fetchall()}
         if "prev_hash" not in cols:
@@ -120,119 +460,514 @@ class MemoryStore:
         if "event_hash" not in cols:
             cur.execute("ALTER TABLE audit_events ADD COLUMN event_hash TEXT")
 
-        self.conn.commit()
+        cols = {r["name"] for r in cur.execute("PRAGMA table_info(audit_checkpoints)").fetchall()}
+        if "archived_at" not in cols:
+            cur.execute("ALTER TABLE audit_checkpoints ADD COLUMN archived_at TEXT")
+
+        cols = {r["name"] for r in cur.execute("PRAGMA table_info(webhook_events)").fetchall()}
+        if "status" not in cols:
+            cur.execute("ALTER TABLE webhook_events ADD COLUMN status TEXT NOT NULL DEFAULT 'done'")
+        if "attempts" not in cols:
+            cur.execute("ALTER TABLE webhook_events ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        if "error" not in cols:
+            cur.execute("ALTER TABLE webhook_events ADD COLUMN error TEXT")
+        if "processed_at" not in cols:
+            cur.execute("ALTER TABLE webhook_events ADD COLUMN processed_at TEXT")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_webhook_events_status ON webhook_events(status)")
+
+        version = cur.execute("PRAGMA user_version").fetchone()[0]
+        for target, statements in SCHEMA_MIGRATIONS:
+            if version < target:
+                for statement in statements:
+                    cur.execute(statement)
+                cur.execute(f"PRAGMA user_version={target}")
 
     def _compute_hash(self, timestamp: str, actor: str, action: str, payload: str, result: str, prev_hash: str) -> str:
         src = "|".join([timestamp, actor, action, payload, result, prev_hash])
         return hashlib.sha256(src.encode("utf-8")).hexdigest()
 
-    def log_audit(self, actor: str, action: str, payload: dict[str, Any], result: str) -> None:
-        timestamp = utc_now().isoformat()
-        payload_raw = json.dumps(payload)
+    def log_audit(self, actor: str, action: str, payload: dict[str, Any], result: str, durable: bool = False) -> None:
+        payload_raw = json.dumps(payload, ensure_ascii=False)
+
+        with self._write(batched=True, durable=durable) as conn:
+            timestamp = utc_now().isoformat()
+            if self._audit_tail is None:
+                row = conn.execute(
+                    "SELECT event_hash FROM audit_events ORDER BY id DESC LIMIT 1"
+                ).fetchone() or conn.execute(
+                    "SELECT event_hash FROM audit_checkpoints WHERE archived_at IS NOT NULL ORDER BY id DESC LIMIT 1"
+                ).fetchone()
+                self._audit_tail = row["event_hash"] if row and row["event_hash"] else "GENESIS"
+            prev_hash = self._audit_tail
+            event_hash = self._compute_hash(timestamp, actor, action, payload_raw, result, prev_hash)
+
+            conn.execute(
+                "INSERT INTO audit_events(timestamp, actor, action, payload, result, prev_hash, event_hash) VALUES(?,?,?,?,?,?,?)",
+                (timestamp, actor, action, payload_raw, result, prev_hash, event_hash),
+            )
+            self._audit_tail = event_hash
+
+    def _checkpoint_key(self) -> bytes:
+        if self._audit_key is None:
+            path = self.db_path.parent / "audit.key"
+            if not path.exists():
+                path.write_text(secrets.token_hex(32), encoding="utf-8")
+                try:
+                    os.chmod(path, 0o600)
+                except Exception:
+                    pass
+            self._audit_key = path.read_text(encoding="utf-8").strip().encode("utf-8")
+        return self._audit_key
+
+    def _sign_checkpoint(self, event_id: int, event_hash: str, row_count: int) -> str:
+        message = f"{event_id}|{event_hash}|{row_count}".encode("utf-8")
+        return hmac.new(self._checkpoint_key(), message, hashlib.sha256).hexdigest()
 
-        row = self.conn.execute(
-            "SELECT event_hash FROM audit_events ORDER BY id DESC LIMIT 1"
-        ).fetchone()
-        prev_hash = row["event_hash"] if row and row["event_hash"] else "GENESIS"
-        event_hash = self._compute_hash(timestamp, actor, action, payload_raw, result, prev_hash)
+    def _checked(self, row: sqlite3.Row | None) -> dict[str, Any] | None:
+        if not row:
+            return None
+        checkpoint = dict(row)
+        signature = self._sign_checkpoint(row["event_id"], row["event_hash"], row["row_count"])
+        event = self._read().execute("SELECT event_hash FROM audit_events WHERE id = ?", (row["event_id"],)).fetchone()
+        # Archived checkpoints anchor the chain after their rows have left the table.
+        matches = event["event_hash"] == row["event_hash"] if event else bool(row["archived_at"])
+        checkpoint["valid"] = hmac.compare_digest(signature, row["signature"]) and matches
+        return checkpoint
 
-        self.conn.execute(
-            "INSERT INTO audit_events(timestamp, actor, action, payload, result, prev_hash, event_hash) VALUES(?,?,?,?,?,?,?)",
-            (timestamp, actor, action, payload_raw, result, prev_hash, event_hash),
+    def audit_checkpoint(self) -> dict[str, Any] | None:
+        return self._checked(
+            self._read().execute(
+                "SELECT id, event_id, event_hash, row_count, signature, created_at, archived_at "
+                "FROM audit_checkpoints ORDER BY id DESC LIMIT 1"
+            ).fetchone()
         )
-        self.conn.commit()
 
-    def verify_audit_chain(self) -> dict[str, Any]:
-        rows = self.conn.execute(
-            "SELECT id, timestamp, actor, action, payload, result, prev_hash, event_hash FROM audit_events ORDER BY id ASC"
-        ).fetchall()
-        prev = "GENESIS"
-        for row in rows:
-            calc = self._compute_hash(
-                row["timestamp"], row["actor"], row["action"], row["payload"], row["result"], prev
-            )
-            if row["prev_hash"] != prev or row["event_hash"] != calc:
-                return {"ok": False, "broken_at": row["id"]}
-            prev = row["event_hash"]
-        return {"ok": True, "count": len(rows)}
-
-    def record_interaction(self, session_id: str, user_text: str, bot_text: str | None = None) -> None:
-        self.conn.execute(
-            "INSERT INTO interaction_signals(session_id, user_text, bot_text, created_at) VALUES(?,?,?,?)",
-            (session_id, user_text, bot_text, utc_now().isoformat()),
+    def audit_anchor(self) -> dict[str, Any] | None:
+        return self._checked(
+            self._read().execute(
+                "SELECT id, event_id, event_hash, row_count, signature, created_at, archived_at "
+                "FROM audit_checkpoints WHERE archived_at IS NOT NULL ORDER BY id DESC LIMIT 1"
+            ).fetchone()
         )
-        self.touch_session(session_id)
-        self.conn.commit()
 
-    def recent_interactions(self, session_id: str | None = None, limit: int = 100) -> list[dict[str, Any]]:
-        if session_id:
-            rows = self.conn.execute(
+    def audit_checkpoint_before(self, cutoff: str) -> dict[str, Any] | None:
+        anchor = self.audit_anchor()
+        return self._checked(
+            self._read().execute(
                 """
-                SELECT id, session_id, user_text, bot_text, created_at
-                FROM interaction_signals
-                WHERE session_id = ?
-                ORDER BY id DESC
-                LIMIT ?
+                SELECT c.id, c.event_id, c.event_hash, c.row_count, c.signature, c.created_at, c.archived_at
+                FROM audit_checkpoints c JOIN audit_events e ON e.id = c.event_id
+                WHERE e.timestamp < ? AND c.archived_at IS NULL AND c.event_id > ?
+                ORDER BY c.event_id DESC, c.id DESC LIMIT 1
                 """,
-                (session_id, limit),
-            ).fetchall()
-        else:
-            rows = self.conn.execute(
+                (cutoff, anchor["event_id"] if anchor else 0),
+            ).fetchone()
+        )
+
+    def audit_rows(self, after_id: int, last_id: int, limit: int = 1000) -> list[dict[str, Any]]:
+        rows = self._read().execute(
+            "SELECT id, timestamp, actor, action, payload, result, prev_hash, event_hash FROM audit_events "
+            "WHERE id > ? AND id <= ? ORDER BY id ASC LIMIT ?",
+            (after_id, last_id, limit),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def archive_audit(self, checkpoint_id: int, after_id: int, last_id: int) -> int:
+        with self._audit_lock, self._write() as conn:
+            deleted = conn.execute("DELETE FROM audit_events WHERE id > ? AND id <= ?", (after_id, last_id)).rowcount
+            conn.execute("UPDATE audit_checkpoints SET archived_at = ? WHERE id = ?", (utc_now().isoformat(), checkpoint_id))
+        return deleted
+
+    def _add_checkpoint(self, event_id: int, event_hash: str, row_count: int) -> dict[str, Any]:
+        checkpoint = {
+            "event_id": event_id,
+            "event_hash": event_hash,
+            "row_count": row_count,
+            "signature": self._sign_checkpoint(event_id, event_hash, row_count),
+            "created_at": utc_now().isoformat(),
+        }
+        with self._write(batched=True) as conn:
+            conn.execute(
+                "INSERT INTO audit_checkpoints(event_id, event_hash, row_count, signature, created_at) VALUES(?,?,?,?,?)",
+                tuple(checkpoint.values()),
+            )
+            # Superseded checkpoints are pruned to one per day so retention still finds an anchor before its cutoff.
+            conn.execute(
                 """
-                SELECT id, session_id, user_text, bot_text, created_at
-                FROM interaction_signals
-                ORDER BY id DESC
-                LIMIT ?
-                """,
-                (limit,),
+                DELETE FROM audit_checkpoints WHERE archived_at IS NULL AND id NOT IN (
+                    SELECT MAX(id) FROM audit_checkpoints WHERE archived_at IS NULL GROUP BY substr(created_at, 1, 10)
+                )
+                """
+            )
+        return checkpoint
+
+    def verify_audit_chain(
+        self, full: bool = False, chunk_size: int = 1000, pause: float = 0.0, checkpoint_every: int = 1
+    ) -> dict[str, Any]:
+        with self._audit_lock:
+            return self._verify_audit_chain(full, chunk_size, pause, checkpoint_every)
+
+    def expired_rows(self, table: str, cutoff: str, limit: int = 1000) -> list[dict[str, Any]]:
+        time_column = PAGED_TABLES[table][0]
+        finished = " AND status IN ('done', 'failed')" if table == "webhook_events" else ""
+        rows = self._read().execute(
+            f"SELECT * FROM {table} WHERE {time_column} < ?{finished} ORDER BY {time_column} ASC, id ASC LIMIT ?",
+            (cutoff, limit),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def delete_rows(self, table: str, ids: list[int]) -> int:
+        deleted = 0
+        with self._write() as conn:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start : start + 500]
+                marks = ",".join("?" * len(chunk))
+                deleted += conn.execute(f"DELETE FROM {table} WHERE id IN ({marks})", chunk).rowcount
+        return deleted
+
+    def convert_auto_vacuum(self) -> bool:
+        with self._write_lock:
+            self._commit()
+            mode = self.conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if mode == 2 or self.pragmas["auto_vacuum"] != "incremental":
+                return False
+            # auto_vacuum only changes for an existing file after one full VACUUM, which blocks all writers.
+            self.conn.execute("VACUUM")
+            return True
+
+    def vacuum(self, pages: int = 1000) -> dict[str, Any]:
+        with self._write_lock:
+            self._commit()
+            mode = self.conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            before = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if mode == 2:
+                # Stepped through executescript: a single execute() frees only one page.
+                self.conn.executescript(f"PRAGMA incremental_vacuum({max(1, int(pages))});")
+            after = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if self.pragmas["journal_mode"] == "wal":
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return {
+            "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(mode, str(mode)),
+            "freed_pages": max(0, before - after),
+            "free_pages": after,
+        }
+
+    def _verify_audit_chain(self, full: bool, chunk_size: int, pause: float, checkpoint_every: int) -> dict[str, Any]:
+        mode = "full" if full else "incremental"
+        latest = self.audit_checkpoint()
+        checkpoint = self.audit_anchor() if full else latest
+        if checkpoint and not checkpoint["valid"]:
+            return {"ok": False, "broken_at": checkpoint["event_id"], "mode": mode, "reason": "checkpoint"}
+        last_id, prev, count = (
+            (checkpoint["event_id"], checkpoint["event_hash"], checkpoint["row_count"]) if checkpoint else (0, "GENESIS", 0)
+        )
+        verified = 0
+        while True:
+            rows = self._read().execute(
+                "SELECT id, timestamp, actor, action, payload, result, prev_hash, event_hash FROM audit_events WHERE id > ? ORDER BY id ASC LIMIT ?",
+                (last_id, max(1, chunk_size)),
+            ).fetchall()
+            for row in rows:
+                calc = self._compute_hash(
+                    row["timestamp"], row["actor"], row["action"], row["payload"], row["result"], prev
+                )
+                if row["prev_hash"] != prev or row["event_hash"] != calc:
+                    return {"ok": False, "broken_at": row["id"], "mode": mode, "verified": verified}
+                last_id, prev = row["id"], row["event_hash"]
+                verified += 1
+            if len(rows) < max(1, chunk_size):
+                break
+            if pause > 0:
+                time.sleep(pause)
+        if verified and count + verified - (latest["row_count"] if latest else 0) >= max(1, checkpoint_every):
+            checkpoint = self._add_checkpoint(last_id, prev, count + verified)
+        return {
+            "ok": True,
+            "count": count + verified,
+            "verified": verified,
+            "mode": mode,
+            "checkpoint": {k: checkpoint[k] for k in ("event_id", "row_count", "created_at")} if checkpoint else None,
+        }
+
+    def record_interaction(
+        self, session_id: str, user_text: str, bot_text: str | None = None, durable: bool = False
+    ) -> None:
+        with self._write(batched=True, durable=durable) as conn:
+            conn.execute(
+                "INSERT INTO interaction_signals(session_id, user_text, bot_text, created_at) VALUES(?,?,?,?)",
+                (session_id, user_text, bot_text, utc_now().isoformat()),
+            )
+            self.touch_session(session_id)
+
+    def schema_version(self) -> int:
+        return int(self._read().execute("PRAGMA user_version").fetchone()[0])
+
+    def _id_bounds(self, table: str, since: str | None, until: str | None) -> tuple[int | None, int | None]:
+        time_column = PAGED_TABLES[table][0]
+        conn = self._read()
+        first = last = None
+        # Paged rows take their timestamp under the write lock, so id order follows time order and a time range
+        # maps onto an id range via one index probe per bound.
+        if since:
+            row = conn.execute(
+                f"SELECT id FROM {table} WHERE {time_column} >= ? ORDER BY {time_column} ASC, id ASC LIMIT 1", (since,)
+            ).fetchone()
+            first = row["id"] if row else -1
+        if until:
+            row = conn.execute(
+                f"SELECT id FROM {table} WHERE {time_column} < ? ORDER BY {time_column} DESC, id DESC LIMIT 1", (until,)
+            ).fetchone()
+            last = row["id"] if row else 0
+        return first, last
+
+    def _where(
+        self,
+        table: str,
+        filters: dict[str, Any],
+        since: str | None = None,
+        until: str | None = None,
+        before_id: int | None = None,
+        after_id: int | None = None,
+    ) -> tuple[str, list[Any]]:
+        clauses: list[str] = []
+        params: list[Any] = []
+        for column in PAGED_TABLES[table][1]:
+            if filters.get(column) is not None:
+                clauses.append(f"{column} = ?")
+                params.append(filters[column])
+        first, last = self._id_bounds(table, since, until)
+        if first is not None:
+            clauses.append("id >= ?")
+            params.append(first if first >= 0 else 2**63 - 1)
+        if last is not None:
+            clauses.append("id <= ?")
+            params.append(last)
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        if after_id is not None:
+            clauses.append("id > ?")
+            params.append(after_id)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _page(
+        self,
+        table: str,
+        columns: str,
+        filters: dict[str, Any],
+        limit: int,
+        before_id: int | None = None,
+        after_id: int | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[sqlite3.Row]:
+        where, params = self._where(table, filters, since, until, before_id, after_id)
+        order = "ASC" if after_id is not None and before_id is None else "DESC"
+        return self._read().execute(
+            f"SELECT {columns} FROM {table}{where} ORDER BY id {order} LIMIT ?", (*params, limit)
+        ).fetchall()
+
+    def estimate_count(
+        self, table: str, since: str | None = None, until: str | None = None, **filters: Any
+    ) -> dict[str, Any]:
+        where, params = self._where(table, filters, since, until)
+        conn = self._read()
+        if not any(filters.get(column) is not None for column in PAGED_TABLES[table][1]):
+            low = conn.execute(f"SELECT id FROM {table}{where} ORDER BY id ASC LIMIT 1", params).fetchone()
+            high = conn.execute(f"SELECT id FROM {table}{where} ORDER BY id DESC LIMIT 1", params).fetchone()
+            return {"value": high["id"] - low["id"] + 1 if low and high else 0, "exact": False}
+        count = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {table}{where} LIMIT ?)", (*params, COUNT_ESTIMATE_CAP)
+        ).fetchone()[0]
+        return {"value": count, "exact": count < COUNT_ESTIMATE_CAP}
+
+    def search(
+        self,
+        query: str,
+        kinds: list[str] | None = None,
+        session_id: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int = 20,
+        cursor: str | None = None,
+    ) -> dict[str, Any]:
+        match = fts_query(query)
+        selected = [k for k in SEARCH_INDEXES if not kinds or k in kinds]
+        if session_id:
+            selected = [k for k in selected if k == "interactions"]
+        if not match or not selected:
+            return {"results": [], "next_cursor": None}
+        after: tuple[float, str, int] | None = None
+        if cursor:
+            rank, kind, last_id = cursor.split("|")
+            after = (float(rank), kind, int(last_id))
+        conn = self._read()
+        hits: list[tuple[float, str, int]] = []
+        for kind in selected:
+            table, fts, _, _ = SEARCH_INDEXES[kind]
+            sql = f"SELECT f.rowid AS id, f.rank AS rank FROM {fts} f"
+            clauses, params = [f"{fts} MATCH ?"], [match]
+            if session_id:
+                sql += f" JOIN {table} t ON t.id = f.rowid"
+                clauses.append("t.session_id = ?")
+                params.append(session_id)
+            first, last = self._id_bounds(table, since, until)
+            if first is not None:
+                clauses.append("f.rowid >= ?")
+                params.append(first if first >= 0 else 2**63 - 1)
+            if last is not None:
+                clauses.append("f.rowid <= ?")
+                params.append(last)
+            if after is not None:
+                # Results are ordered by (rank, kind, id); each table only needs its slice of that cursor.
+                if kind < after[1]:
+                    clauses.append("f.rank > ?")
+                    params.append(after[0])
+                elif kind == after[1]:
+                    clauses.append("(f.rank > ? OR (f.rank = ? AND f.rowid > ?))")
+                    params += [after[0], after[0], after[2]]
+                else:
+                    clauses.append("f.rank >= ?")
+                    params.append(after[0])
+            rows = conn.execute(
+                f"{sql} WHERE {' AND '.join(clauses)} ORDER BY f.rank, f.rowid LIMIT ?", (*params, limit + 1)
             ).fetchall()
+            hits += [(r["rank"], kind, r["id"]) for r in rows]
+        hits.sort()
+        page = hits[:limit]
+        details: dict[tuple[str, int], dict[str, Any]] = {}
+        for kind in {k for _, k, _ in page}:
+            table, fts, _, meta = SEARCH_INDEXES[kind]
+            ids = [i for _, k, i in page if k == kind]
+            marks = ",".join("?" * len(ids))
+            for r in conn.execute(f"SELECT id, {meta} FROM {table} WHERE id IN ({marks})", ids):
+                details[(kind, r["id"])] = dict(r)
+            snippets = conn.execute(
+                f"SELECT rowid, snippet({fts}, -1, '«', '»', '…', 12) AS snippet FROM {fts} "
+                f"WHERE {fts} MATCH ? AND rowid IN ({marks})",
+                (match, *ids),
+            )
+            for r in snippets:
+                details[(kind, r["rowid"])]["snippet"] = r["snippet"]
+        results = [
+            {"kind": kind, "id": row_id, "rank": round(rank, 6), **details.get((kind, row_id), {})}
+            for rank, kind, row_id in page
+        ]
+        last_hit = page[-1] if len(hits) > limit else None
+        return {
+            "results": results,
+            "next_cursor": f"{last_hit[0]!r}|{last_hit[1]}|{last_hit[2]}" if last_hit else None,
+        }
+
+    def rebuild_search(self) -> dict[str, int]:
+        counts = {}
+        with self._write() as conn:
+            for kind, (table, fts, _, _) in SEARCH_INDEXES.items():
+                conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+                counts[kind] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return counts
+
+    def iter_export(
+        self,
+        table: str,
+        since: str | None = None,
+        until: str | None = None,
+        after_id: int | None = None,
+        before_id: int | None = None,
+        batch_size: int = 500,
+        **filters: Any,
+    ) -> Iterator[list[dict[str, Any]]]:
+        where, params = self._where(table, filters, since, until, before_id, after_id)
+        # A private connection keeps one cursor open for the whole stream without sharing the thread's reader.
+        conn = self._connect(read_only=True)
+        try:
+            cur = conn.execute(f"SELECT {', '.join(EXPORT_COLUMNS[table])} FROM {table}{where} ORDER BY id ASC", params)
+            while rows := cur.fetchmany(batch_size):
+                yield [dict(r) for r in rows]
+        finally:
+            conn.close()
+
+    def recent_interactions(
+        self,
+        session_id: str | None = None,
+        limit: int = 100,
+        before_id: int | None = None,
+        after_id: int | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[dict[str, Any]]:
+        rows = self._page(
+            "interaction_signals",
+            "id, session_id, user_text, bot_text, created_at",
+            {"session_id": session_id or None},
+            limit,
+            before_id,
+            after_id,
+            since,
+            until,
+        )
         return [dict(r) for r in rows]
 
     def create_session(self, session_id: str, display_name: str | None = None) -> dict[str, Any]:
         now = utc_now().isoformat()
         name = display_name or session_id
-        self.conn.execute(
-            "INSERT OR REPLACE INTO sessions(session_id, display_name, created_at, last_active) VALUES(?,?,COALESCE((SELECT created_at FROM sessions WHERE session_id=?),?),?)",
-            (session_id, name, session_id, now, now),
-        )
-        self.conn.commit()
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions(session_id, display_name, created_at, last_active) VALUES(?,?,COALESCE((SELECT created_at FROM sessions WHERE session_id=?),?),?)",
+                (session_id, name, session_id, now, now),
+            )
         return {"session_id": session_id, "display_name": name, "created_at": now, "last_active": now}
 
     def touch_session(self, session_id: str) -> None:
         now = utc_now().isoformat()
-        self.conn.execute(
-            "INSERT OR IGNORE INTO sessions(session_id, display_name, created_at, last_active) VALUES(?,?,?,?)",
-            (session_id, session_id, now, now),
-        )
-        self.conn.execute("UPDATE sessions SET last_active=? WHERE session_id=?", (now, session_id))
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO sessions(session_id, display_name, created_at, last_active) VALUES(?,?,?,?)",
+                (session_id, session_id, now, now),
+            )
+            conn.execute("UPDATE sessions SET last_active=? WHERE session_id=?", (now, session_id))
 
-    def list_sessions(self) -> list[dict[str, Any]]:
-        rows = self.conn.execute(
-            "SELECT session_id, display_name, created_at, last_active FROM sessions ORDER BY last_active DESC"
+    def list_sessions(self, limit: int | None = None, before: str | None = None) -> list[dict[str, Any]]:
+        where, params = "", []
+        if before:
+            last_active, _, session_id = before.partition("|")
+            where, params = " WHERE (last_active, session_id) < (?, ?)", [last_active, session_id]
+        rows = self._read().execute(
+            f"SELECT session_id, display_name, created_at, last_active FROM sessions{where} "
+            "ORDER BY last_active DESC, session_id DESC LIMIT ?",
+            (*params, -1 if limit is None else limit),
         ).fetchall()
         return [dict(r) for r in rows]
 
     def delete_session(self, session_id: str) -> None:
-        self.conn.execute("DELETE FROM sessions WHERE session_id=?", (session_id,))
-        self.conn.commit()
+        with self._write() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id=?", (session_id,))
 
-    def upsert_preference(self, key: str, value: str, confidence: float, ttl_days: int = 180) -> None:
-        self.conn.execute(
-            """
-            INSERT INTO preferences(key, value, confidence, last_seen, ttl_days)
-            VALUES(?,?,?,?,?)
-            ON CONFLICT(key) DO UPDATE SET
-                value=excluded.value,
-                confidence=excluded.confidence,
-                last_seen=excluded.last_seen,
-                ttl_days=excluded.ttl_days
-            """,
-            (key, value, confidence, utc_now().isoformat(), ttl_days),
-        )
-        self.conn.commit()
+    def upsert_preference(
+        self, key: str, value: str, confidence: float, ttl_days: int = 180, durable: bool = False
+    ) -> bool:
+        with self._write(batched=True, durable=durable) as conn:
+            row = conn.execute("SELECT value, confidence, ttl_days FROM preferences WHERE key=?", (key,)).fetchone()
+            changed = row is None or (row["value"], row["confidence"], row["ttl_days"]) != (value, confidence, ttl_days)
+            conn.execute(
+                """
+                INSERT INTO preferences(key, value, confidence, last_seen, ttl_days)
+                VALUES(?,?,?,?,?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value=excluded.value,
+                    confidence=excluded.confidence,
+                    last_seen=excluded.last_seen,
+                    ttl_days=excluded.ttl_days
+                """,
+                (key, value, confidence, utc_now().isoformat(), ttl_days),
+            )
+            if changed:
+                self._preferences_dirty = True
+        return changed
 
     def relevant_preferences(self) -> list[dict[str, Any]]:
-        rows = self.conn.execute("SELECT key, value, confidence, last_seen, ttl_days FROM preferences").fetchall()
+        rows = self._read().execute("SELECT key, value, confidence, last_seen, ttl_days FROM preferences").fetchall()
         out: list[dict[str, Any]] = []
         for row in rows:
             last_seen = datetime.fromisoformat(row["last_seen"])
@@ -241,32 +976,49 @@ class MemoryStore:
                 out.append(dict(row))
         return out
 
-    def recent_audit(self, limit: int = 100) -> list[dict[str, Any]]:
-        rows = self.conn.execute(
-            "SELECT id, timestamp, actor, action, payload, result, prev_hash, event_hash FROM audit_events ORDER BY id DESC LIMIT ?",
-            (limit,),
-        ).fetchall()
+    def recent_audit(
+        self,
+        limit: int = 100,
+        before_id: int | None = None,
+        after_id: int | None = None,
+        actor: str | None = None,
+        action: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[dict[str, Any]]:
+        rows = self._page(
+            "audit_events",
+            "id, timestamp, actor, action, payload, result, prev_hash, event_hash",
+            {"actor": actor, "action": action},
+            limit,
+            before_id,
+            after_id,
+            since,
+            until,
+        )
         return [dict(r) for r in rows]
 
-    def upsert_job(self, job_id: str, name: str, cron: str, enabled: bool, payload: dict[str, Any]) -> None:
+    def upsert_job(
+        self, job_id: str, name: str, cron: str, enabled: bool, payload: dict[str, Any], durable: bool = True
+    ) -> None:
         now = utc_now().isoformat()
-        self.conn.execute(
-            """
-            INSERT INTO scheduled_jobs(job_id, name, cron, enabled, payload, created_at, updated_at)
-            VALUES(?,?,?,?,?,?,?)
-            ON CONFLICT(job_id) DO UPDATE SET
-                name=excluded.name,
-                cron=excluded.cron,
-                enabled=excluded.enabled,
-                payload=excluded.payload,
-                updated_at=excluded.updated_at
-            """,
-            (job_id, name, cron, 1 if enabled else 0, json.dumps(payload), now, now),
-        )
-        self.conn.commit()
+        with self._write(batched=True, durable=durable) as conn:
+            conn.execute(
+                """
+                INSERT INTO scheduled_jobs(job_id, name, cron, enabled, payload, created_at, updated_at)
+                VALUES(?,?,?,?,?,?,?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    name=excluded.name,
+                    cron=excluded.cron,
+                    enabled=excluded.enabled,
+                    payload=excluded.payload,
+                    updated_at=excluded.updated_at
+                """,
+                (job_id, name, cron, 1 if enabled else 0, json.dumps(payload), now, now),
+            )
 
     def list_jobs(self) -> list[dict[str, Any]]:
-        rows = self.conn.execute(
+        rows = self._read().execute(
             "SELECT job_id, name, cron, enabled, payload, created_at, updated_at FROM scheduled_jobs ORDER BY created_at DESC"
         ).fetchall()
         out = []
@@ -278,31 +1030,312 @@ class MemoryStore:
         return out
 
     def delete_job(self, job_id: str) -> None:
-        self.conn.execute("DELETE FROM scheduled_jobs WHERE job_id=?", (job_id,))
-        self.conn.commit()
+        with self._write() as conn:
+            conn.execute("DELETE FROM scheduled_jobs WHERE job_id=?", (job_id,))
 
     def set_job_enabled(self, job_id: str, enabled: bool) -> None:
-        self.conn.execute(
-            "UPDATE scheduled_jobs SET enabled=?, updated_at=? WHERE job_id=?",
-            (1 if enabled else 0, utc_now().isoformat(), job_id),
-        )
-        self.conn.commit()
+        with self._write() as conn:
+            conn.execute(
+                "UPDATE scheduled_jobs SET enabled=?, updated_at=? WHERE job_id=?",
+                (1 if enabled else 0, utc_now().isoformat(), job_id),
+            )
 
-    def record_webhook(self, source: str, payload: dict[str, Any]) -> None:
-        self.conn.execute(
-            "INSERT INTO webhook_events(source, payload, created_at) VALUES(?,?,?)",
-            (source, json.dumps(payload), utc_now().isoformat()),
-        )
-        self.conn.commit()
+    def record_webhook(
+        self,
+        source: str,
+        payload: dict[str, Any],
+        status: str = "done",
+        attempts: int = 0,
+        error: str | None = None,
+        durable: bool = False,
+    ) -> int:
+        with self._write(batched=True, durable=durable) as conn:
+            now = utc_now().isoformat()
+            cur = conn.execute(
+                """
+                INSERT INTO webhook_events(source, payload, created_at, status, attempts, error, processed_at)
+                VALUES(?,?,?,?,?,?,?)
+                """,
+                (source, json.dumps(payload, ensure_ascii=False), now, status, attempts, error, None if status == "queued" else now),
+            )
+        return int(cur.lastrowid)
 
-    def recent_webhooks(self, limit: int = 100) -> list[dict[str, Any]]:
-        rows = self.conn.execute(
-            "SELECT id, source, payload, created_at FROM webhook_events ORDER BY id DESC LIMIT ?",
-            (limit,),
+    def mark_webhooks(self, event_ids: list[int], status: str, attempts: int = 0, error: str | None = None) -> None:
+        if not event_ids:
+            return
+        processed_at = utc_now().isoformat() if status in {"done", "failed"} else None
+        with self._write(batched=True) as conn:
+            conn.executemany(
+                "UPDATE webhook_events SET status=?, attempts=?, error=?, processed_at=? WHERE id=?",
+                [(status, attempts, error, processed_at, event_id) for event_id in event_ids],
+            )
+
+    def webhook_backlog(self) -> list[dict[str, Any]]:
+        rows = self._read().execute(
+            """
+            SELECT id, source, payload, created_at, status, attempts FROM webhook_events
+            WHERE status IN ('queued', 'running') ORDER BY id ASC
+            """
         ).fetchall()
+        return [dict(r, payload=json.loads(r["payload"])) for r in rows]
+
+    def recent_webhooks(
+        self,
+        limit: int = 100,
+        before_id: int | None = None,
+        after_id: int | None = None,
+        source: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[dict[str, Any]]:
+        rows = self._page(
+            "webhook_events",
+            "id, source, payload, created_at, status, attempts, error, processed_at",
+            {"source": source},
+            limit,
+            before_id,
+            after_id,
+            since,
+            until,
+        )
         out = []
         for r in rows:
             d = dict(r)
             d["payload"] = json.loads(d["payload"])
             out.append(d)
         return out
+
+    def record_usage(
+        self,
+        session_id: str,
+        task_id: str,
+        agent_id: str,
+        provider: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cached_tokens: int = 0,
+        estimated: bool = False,
+    ) -> None:
+        now = utc_now()
+        created_at = now.isoformat()
+        hour = now.replace(minute=0, second=0, microsecond=0).isoformat()
+        counts = (prompt_tokens, completion_tokens, cached_tokens, 1 if estimated else 0, created_at)
+        with self._write(batched=True) as conn:
+            conn.execute(
+                """
+                INSERT INTO token_usage(
+                    session_id, task_id, agent_id, provider, model,
+                    prompt_tokens, completion_tokens, cached_tokens, estimated, created_at
+                ) VALUES(?,?,?,?,?,?,?,?,?,?)
+                """,
+                (session_id, task_id, agent_id, provider, model, *counts),
+            )
+            keys = {
+                "usage_hourly": (hour, provider, model),
+                "usage_sessions": (session_id,),
+                "usage_providers": (provider, model),
+            }
+            for table, names in USAGE_ROLLUPS.items():
+                placeholders = ",".join("?" for _ in names)
+                conn.execute(
+                    f"""
+                    INSERT INTO {table}({", ".join(names)}, requests, prompt_tokens, completion_tokens,
+                        cached_tokens, estimated_requests, last_at)
+                    VALUES({placeholders},1,?,?,?,?,?)
+                    ON CONFLICT({", ".join(names)}) DO UPDATE SET
+                        requests=requests+1,
+                        prompt_tokens=prompt_tokens+excluded.prompt_tokens,
+                        completion_tokens=completion_tokens+excluded.completion_tokens,
+                        cached_tokens=cached_tokens+excluded.cached_tokens,
+                        estimated_requests=estimated_requests+excluded.estimated_requests,
+                        last_at=excluded.last_at
+                    """,
+                    (*keys[table], *counts),
+                )
+
+    def usage_by_provider(self) -> list[dict[str, Any]]:
+        rows = self._read().execute(
+            "SELECT * FROM usage_providers ORDER BY prompt_tokens + completion_tokens DESC"
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def usage_by_session(self, session_id: str | None = None, limit: int = 50) -> list[dict[str, Any]]:
+        if session_id:
+            rows = self._read().execute("SELECT * FROM usage_sessions WHERE session_id=?", (session_id,)).fetchall()
+        else:
+            rows = self._read().execute(
+                "SELECT * FROM usage_sessions ORDER BY prompt_tokens + completion_tokens DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def usage_hourly(self, hours: int = 24) -> list[dict[str, Any]]:
+        since = (utc_now() - timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0).isoformat()
+        rows = self._read().execute(
+            "SELECT * FROM usage_hourly WHERE hour >= ? ORDER BY hour ASC, provider ASC, model ASC",
+            (since,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def task_usage(self, task_id: str) -> list[dict[str, Any]]:
+        rows = self._read().execute(
+            """
+            SELECT agent_id, provider, model, prompt_tokens, completion_tokens, cached_tokens, estimated, created_at
+            FROM token_usage WHERE task_id=? ORDER BY id ASC
+            """,
+            (task_id,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def usage_summary(self, hours: int = 24, session_id: str | None = None) -> dict[str, Any]:
+        providers = self.usage_by_provider()
+        totals = {
+            key: sum(int(p[key]) for p in providers)
+            for key in ("requests", "prompt_tokens", "completion_tokens", "cached_tokens", "estimated_requests")
+        }
+        return {
+            "totals": totals,
+            "providers": providers,
+            "hourly": self.usage_hourly(hours),
+            "sessions": self.usage_by_session(session_id),
+        }
+
+    def archive_agents(self, agents: list[dict[str, Any]]) -> None:
+        with self._write() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO agent_archive(
+                    agent_id, task_id, parent_id, role, task, status, output, token_usage, started_at, ended_at
+                ) VALUES(
+                    :agent_id, :task_id, :parent_id, :role, :task, :status, :output, :token_usage, :started_at, :ended_at
+                )
+                """,
+                agents,
+            )
+
+    def archived_agents(
+        self,
+        task_id: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int = 200,
+    ) -> list[dict[str, Any]]:
+        clauses, params = [], []
+        if task_id:
+            clauses.append("task_id = ?")
+            params.append(task_id)
+        if since:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("started_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._read().execute(
+            f"""
+            SELECT agent_id, task_id, parent_id, role, task, status, output, token_usage, started_at, ended_at
+            FROM agent_archive {where}
+            ORDER BY started_at DESC, agent_id DESC
+            LIMIT ?
+            """,
+            (*params, limit),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def record_spans(self, task_id: str, trace_id: str, spans: list[dict[str, Any]]) -> None:
+        with self._write(batched=True) as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO trace_spans(
+                    span_id, task_id, trace_id, parent_id, name, start_ns, end_ns, duration_ms, status, attributes
+                ) VALUES(?,?,?,?,?,?,?,?,?,?)
+                """,
+                [
+                    (
+                        s["span_id"],
+                        task_id,
+                        trace_id,
+                        s["parent_id"],
+                        s["name"],
+                        s["start_ns"],
+                        s["end_ns"],
+                        s["duration_ms"],
+                        s["status"],
+                        json.dumps(s["attributes"], default=str),
+                    )
+                    for s in spans
+                ],
+            )
+
+    def prune_spans(self, before_ns: int) -> int:
+        with self._write(batched=True) as conn:
+            return conn.execute("DELETE FROM trace_spans WHERE start_ns < ?", (before_ns,)).rowcount
+
+    def trace_spans(self, task_id: str) -> list[dict[str, Any]]:
+        rows = self._read().execute(
+            """
+            SELECT span_id, trace_id, parent_id, name, start_ns, end_ns, duration_ms, status, attributes
+            FROM trace_spans WHERE task_id=? ORDER BY start_ns ASC
+            """,
+            (task_id,),
+        ).fetchall()
+        return [dict(r, attributes=json.loads(r["attributes"])) for r in rows]
+
+    def create_chat_job(
+        self, task_id: str, session_id: str, text: str, use_cache: bool, retention_seconds: float
+    ) -> dict[str, Any]:
+        now = utc_now()
+        with self._write() as conn:
+            conn.execute(
+                """
+                INSERT INTO chat_jobs(
+                    task_id, session_id, text, use_cache, status, stages, created_at, updated_at, expires_at
+                ) VALUES(?,?,?,?,?,?,?,?,?)
+                """,
+                (
+                    task_id,
+                    session_id,
+                    text,
+                    1 if use_cache else 0,
+                    "queued",
+                    "[]",
+                    now.isoformat(),
+                    now.isoformat(),
+                    (now + timedelta(seconds=retention_seconds)).isoformat(),
+                ),
+            )
+        return self.get_chat_job(task_id)
+
+    def update_chat_job(self, task_id: str, **fields: Any) -> None:
+        fields["updated_at"] = utc_now().isoformat()
+        for key in ("stages", "result"):
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key])
+        assignments = ", ".join(f"{key}=?" for key in fields)
+        with self._write() as conn:
+            conn.execute(f"UPDATE chat_jobs SET {assignments} WHERE task_id=?", (*fields.values(), task_id))
+
+    def get_chat_job(self, task_id: str) -> dict[str, Any] | None:
+        row = self._read().execute("SELECT * FROM chat_jobs WHERE task_id=?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        d = dict(row)
+        d["use_cache"] = bool(d["use_cache"])
+        d["stages"] = json.loads(d["stages"])
+        d["result"] = json.loads(d["result"]) if d["result"] else None
+        return d
+
+    def pending_chat_jobs(self) -> list[dict[str, Any]]:
+        rows = self._read().execute(
+            "SELECT task_id FROM chat_jobs WHERE status IN ('queued', 'running') ORDER BY created_at ASC"
+        ).fetchall()
+        return [self.get_chat_job(r["task_id"]) for r in rows]
+
+    def purge_chat_jobs(self) -> int:
+        with self._write() as conn:
+            cur = conn.execute(
+                "DELETE FROM chat_jobs WHERE expires_at < ? AND status IN ('done', 'failed')",
+                (utc_now().isoformat(),),
+            )
+        return cur.rowcount
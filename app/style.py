@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import json
+import os
 import re
+import threading
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 
 DEFAULT_STYLE = {
@@ -23,8 +25,16 @@ def load_or_create(path: Path) -> dict[str, Any]:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
+DEFAULT_FLUSH = {
+    "flush_interval": 5.0,
+    "flush_every": 20,
+}
+
+
 def save(path: Path, data: dict[str, Any]) -> None:
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
 
 
 def analyze_text(text: str) -> dict[str, float | str]:
@@ -59,3 +69,96 @@ def blend_style(existing: dict[str, Any], signal: dict[str, float | str], alpha:
     updated["language_hint"] = signal["language_hint"]
     updated["samples_seen"] = int(existing.get("samples_seen", 0)) + 1
     return updated
+
+
+class StyleBuffer:
+    def __init__(
+        self,
+        path: Path,
+        settings: dict[str, Any] | None = None,
+        on_flush: Callable[[dict[str, Any]], None] | None = None,
+    ):
+        self.path = path
+        self.on_flush = on_flush
+        self.flush_interval = DEFAULT_FLUSH["flush_interval"]
+        self.flush_every = DEFAULT_FLUSH["flush_every"]
+        self.flushes = 0
+        self.failures = 0
+        self._pending: list[dict[str, float | str]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.configure(settings or {})
+
+    def configure(self, settings: dict[str, Any]) -> None:
+        merged = dict(DEFAULT_FLUSH, **settings)
+        self.flush_interval = max(0.1, float(merged["flush_interval"]))
+        self.flush_every = max(1, int(merged["flush_every"]))
+
+    def record(self, signal: dict[str, float | str]) -> None:
+        with self._lock:
+            self._pending.append(signal)
+            due = len(self._pending) >= self.flush_every
+        if not due:
+            return
+        if self._thread is not None:
+            self._wake.set()
+        else:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                style = load_or_create(self.path)
+                for signal in batch:
+                    style = blend_style(style, signal)
+                save(self.path, style)
+            except Exception:
+                with self._lock:
+                    self._pending = batch + self._pending
+                    self.failures += 1
+                raise
+            self.flushes += 1
+        if self.on_flush:
+            self.on_flush(style)
+        return len(batch)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="style-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout=5)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # noqa: BLE001
+                continue
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "running": self._thread is not None,
+        }
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator
+
+from .store import MemoryStore
+
+
+DEFAULT_TRACING = {
+    "enabled": True,
+    "max_traces": 200,
+    "export_dir": "",
+    "span_ttl_days": 7.0,
+}
+
+SPAN_PRUNE_INTERVAL = 300.0
+
+
+@dataclass(slots=True)
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    status: str = "ok"
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        end_ns = self.end_ns or time.time_ns()
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NullSpan:
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    def __init__(self, task_id: str, trace_id: str):
+        self.task_id = task_id
+        self.trace_id = trace_id
+        self.spans: list[Span] = []
+        self.closed = False
+        self.late_spans = 0
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            if self.closed:
+                # Stage threads that outlived a wave timeout finish after the trace was persisted.
+                self.late_spans += 1
+                return
+            self.spans.append(span)
+
+    def close(self, root: Span) -> None:
+        with self._lock:
+            self.spans.append(root)
+            self.closed = True
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            spans = sorted((s.to_dict() for s in self.spans), key=lambda s: s["start_ns"])
+            late = self.late_spans
+        data = trace_dict(self.task_id, self.trace_id, spans)
+        if late:
+            data["late_spans"] = late
+        return data
+
+
+_active: ContextVar[tuple[Trace, Span] | None] = ContextVar("ontoti_span", default=None)
+
+
+def trace_dict(task_id: str, trace_id: str, spans: list[dict[str, Any]]) -> dict[str, Any]:
+    root = next((s for s in spans if s["parent_id"] is None), spans[0] if spans else None)
+    return {
+        "task_id": task_id,
+        "trace_id": trace_id,
+        "name": root["name"] if root else None,
+        "duration_ms": root["duration_ms"] if root else 0.0,
+        "span_count": len(spans),
+        "spans": spans,
+    }
+
+
+def _restore(token: Any, previous: tuple[Trace, Span] | None) -> None:
+    try:
+        _active.reset(token)
+    except ValueError:
+        # Async generators can be closed from another context than the one that opened the span.
+        _active.set(previous)
+
+
+def _fail(current: Span, exc: BaseException) -> None:
+    current.status = "error"
+    current.attributes["error"] = str(exc)[:200] or type(exc).__name__
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NullSpan]:
+    active = _active.get()
+    if active is None:
+        yield NULL_SPAN
+        return
+    trace, parent = active
+    current = Span(trace.trace_id, uuid.uuid4().hex[:16], parent.span_id, name, attributes=attributes)
+    token = _active.set((trace, current))
+    try:
+        yield current
+    except BaseException as exc:
+        _fail(current, exc)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _restore(token, active)
+        trace.add(current)
+
+
+def annotate(**attributes: Any) -> None:
+    active = _active.get()
+    if active is not None:
+        active[1].set(**attributes)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(trace: dict[str, Any], service_name: str = "ontoti") -> dict[str, Any]:
+    spans = []
+    for s in trace["spans"]:
+        otlp_span = {
+            "traceId": trace["trace_id"],
+            "spanId": s["span_id"],
+            "name": s["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["end_ns"] or s["start_ns"]),
+            "attributes": [
+                {"key": "ontoti.task_id", "value": {"stringValue": trace["task_id"]}},
+                *({"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items()),
+            ],
+            "status": {"code": 2, "message": str(s["attributes"].get("error", ""))}
+            if s["status"] == "error"
+            else {"code": 1},
+        }
+        if s["parent_id"]:
+            otlp_span["parentSpanId"] = s["parent_id"]
+        spans.append(otlp_span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+                "scopeSpans": [{"scope": {"name": "ontoti.orchestrator"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class Tracer:
+    def __init__(self, store: MemoryStore, settings: dict[str, Any] | None = None):
+        self.store = store
+        self.enabled = True
+        self.max_traces = DEFAULT_TRACING["max_traces"]
+        self.export_dir: Path | None = None
+        self.span_ttl_days = DEFAULT_TRACING["span_ttl_days"]
+        self._next_prune = 0.0
+        self._traces: OrderedDict[str, Trace] = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(settings or {})
+
+    def configure(self, settings: dict[str, Any]) -> None:
+        merged = dict(DEFAULT_TRACING, **settings)
+        self.enabled = bool(merged["enabled"])
+        self.max_traces = max(1, int(merged["max_traces"]))
+        self.export_dir = Path(merged["export_dir"]) if merged["export_dir"] else None
+        self.span_ttl_days = max(0.0, float(merged["span_ttl_days"]))
+
+    @contextmanager
+    def trace(self, task_id: str, name: str, **attributes: Any) -> Iterator[Span | _NullSpan]:
+        if not self.enabled:
+            yield NULL_SPAN
+            return
+        if _active.get() is not None:
+            with span(name, **attributes) as nested:
+                yield nested
+            return
+        current, root = self._root(task_id, name, attributes)
+        token = _active.set((current, root))
+        try:
+            yield root
+        except BaseException as exc:
+            _fail(root, exc)
+            raise
+        finally:
+            _restore(token, None)
+            self._finish(self._close(current, root))
+
+    @asynccontextmanager
+    async def atrace(self, task_id: str, name: str, **attributes: Any) -> AsyncIterator[Span | _NullSpan]:
+        if not self.enabled or _active.get() is not None:
+            with self.trace(task_id, name, **attributes) as nested:
+                yield nested
+            return
+        current, root = self._root(task_id, name, attributes)
+        token = _active.set((current, root))
+        try:
+            yield root
+        except BaseException as exc:
+            _fail(root, exc)
+            raise
+        finally:
+            _restore(token, None)
+            # Persisting spans touches SQLite and the export dir, so keep it off the event loop.
+            await asyncio.to_thread(self._finish, self._close(current, root))
+
+    def _root(self, task_id: str, name: str, attributes: dict[str, Any]) -> tuple[Trace, Span]:
+        trace_id = uuid.uuid4().hex
+        return Trace(task_id, trace_id), Span(trace_id, uuid.uuid4().hex[:16], None, name, attributes=attributes)
+
+    def _close(self, trace: Trace, root: Span) -> Trace:
+        root.end_ns = time.time_ns()
+        trace.close(root)
+        return trace
+
+    def _finish(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.task_id] = trace
+            self._traces.move_to_end(trace.task_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        data = trace.to_dict()
+        self.store.record_spans(trace.task_id, trace.trace_id, data["spans"])
+        self.prune()
+        if self.export_dir is not None:
+            self.export_dir.mkdir(parents=True, exist_ok=True)
+            path = self.export_dir / f"{trace.task_id}.otlp.json"
+            path.write_text(json.dumps(to_otlp(data)), encoding="utf-8")
+
+    def prune(self, force: bool = False) -> int:
+        now = time.monotonic()
+        if not self.span_ttl_days or (not force and now < self._next_prune):
+            return 0
+        self._next_prune = now + SPAN_PRUNE_INTERVAL
+        return self.store.prune_spans(time.time_ns() - int(self.span_ttl_days * 86400 * 1e9))
+
+    def get(self, task_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            trace = self._traces.get(task_id)
+        if trace is not None:
+            return trace.to_dict()
+        rows = self.store.trace_spans(task_id)
+        if not rows:
+            return None
+        return trace_dict(task_id, rows[0]["trace_id"], [{k: v for k, v in r.items() if k != "trace_id"} for r in rows])
+
+    def recent(self, limit: int = 50) -> list[dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces.values())[-limit:]
+        out = []
+        for trace in reversed(traces):
+            data = trace.to_dict()
+            data.pop("spans")
+            out.append(data)
+        return out
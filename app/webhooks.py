@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import Any, Callable
+
+from .metrics import CounterSet
+from .orchestrator import Orchestrator
+from .store import MemoryStore, utc_now
+
+
+DEFAULT_WEBHOOKS = {
+    "workers": 4,
+    "max_per_source": 1,
+    "coalesce_window": 0.0,
+    "coalesce_max": 20,
+    "max_attempts": 3,
+    "retry_delay": 5.0,
+    "redis_key": "ontoti:webhooks",
+}
+
+SOURCE_KEYS = ("max_per_source", "coalesce_window", "coalesce_max")
+
+
+class SQLiteWebhookQueue:
+    name = "sqlite"
+
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    def push(self, source: str, payload: dict[str, Any]) -> dict[str, Any]:
+        event_id = self.store.record_webhook(source, payload, status="queued", durable=True)
+        return {"id": event_id, "queue": "sqlite", "source": source, "payload": payload, "attempts": 0}
+
+    def backlog(self) -> list[dict[str, Any]]:
+        return [dict(event, queue="sqlite") for event in self.store.webhook_backlog()]
+
+    def mark(self, events: list[dict[str, Any]], status: str, error: str | None = None) -> None:
+        for attempts in sorted({e["attempts"] for e in events}):
+            ids = [e["id"] for e in events if e["attempts"] == attempts]
+            self.store.mark_webhooks(ids, status, attempts=attempts, error=error)
+
+
+class RedisWebhookQueue(SQLiteWebhookQueue):
+    name = "redis"
+
+    def __init__(self, store: MemoryStore, redis_url: str, key: str = "ontoti:webhooks"):
+        super().__init__(store)
+        self.key = key
+        try:
+            import redis  # type: ignore
+
+            self._redis = redis.from_url(redis_url, decode_responses=True)
+        except Exception:
+            self._redis = None
+
+    def push(self, source: str, payload: dict[str, Any]) -> dict[str, Any]:
+        if self._redis is not None:
+            event = {
+                "id": uuid.uuid4().hex,
+                "queue": "redis",
+                "source": source,
+                "payload": payload,
+                "attempts": 0,
+                "created_at": utc_now().isoformat(),
+            }
+            try:
+                self._redis.hset(self.key, event["id"], json.dumps(event))
+                return event
+            except Exception:
+                pass
+        return super().push(source, payload)
+
+    def backlog(self) -> list[dict[str, Any]]:
+        events: list[dict[str, Any]] = []
+        if self._redis is not None:
+            try:
+                events = [json.loads(raw) for raw in self._redis.hvals(self.key)]
+            except Exception:
+                events = []
+        events.sort(key=lambda e: e["created_at"])
+        return events + super().backlog()
+
+    def mark(self, events: list[dict[str, Any]], status: str, error: str | None = None) -> None:
+        super().mark([e for e in events if e["queue"] == "sqlite"], status, error)
+        remote = [e for e in events if e["queue"] == "redis"]
+        if not remote or self._redis is None:
+            return
+        if status == "queued":
+            # Retries write the attempt count back so max_attempts holds across restarts.
+            try:
+                self._redis.hset(self.key, mapping={e["id"]: json.dumps(dict(e, error=error)) for e in remote})
+            except Exception:
+                pass
+            return
+        if status not in {"done", "failed"}:
+            return
+        # Finished Redis events move into webhook_events so GET /webhooks keeps the history.
+        for event in remote:
+            self.store.record_webhook(
+                event["source"], event["payload"], status=status, attempts=event["attempts"], error=error
+            )
+        try:
+            self._redis.hdel(self.key, *[e["id"] for e in remote])
+        except Exception:
+            pass
+
+
+def create_webhook_queue(store: MemoryStore, config: dict[str, Any]) -> SQLiteWebhookQueue:
+    bus_cfg = config.get("bus", {}) if isinstance(config, dict) else {}
+    if str(bus_cfg.get("backend", "local")).lower() == "redis":
+        key = str(config.get("webhooks", {}).get("redis_key", DEFAULT_WEBHOOKS["redis_key"]))
+        return RedisWebhookQueue(store, str(bus_cfg.get("redis_url", "redis://localhost:6379/0")), key)
+    return SQLiteWebhookQueue(store)
+
+
+def webhook_text(source: str, events: list[dict[str, Any]]) -> str:
+    texts = [str(e["payload"].get("text") or f"Webhook {source}: {e['payload']}") for e in events]
+    if len(texts) == 1:
+        return texts[0]
+    return f"Webhook {source}: {len(texts)} Ereignisse\n" + "\n".join(f"- {t}" for t in texts)
+
+
+class WebhookIngest:
+    def __init__(
+        self,
+        queue: SQLiteWebhookQueue,
+        orchestrator: Callable[[], Orchestrator],
+        settings: dict[str, Any] | None = None,
+    ):
+        self.queue = queue
+        self.orchestrator = orchestrator
+        self.counters = CounterSet()
+        self._pending: dict[str, deque[dict[str, Any]]] = {}
+        self._active: dict[str, int] = {}
+        self._scheduled: set[str] = set()
+        self._ready: asyncio.Queue[str] | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+        self.configure(settings or {})
+
+    def configure(self, settings: dict[str, Any]) -> None:
+        merged = dict(DEFAULT_WEBHOOKS, **settings)
+        self.workers = max(1, int(merged["workers"]))
+        self.max_attempts = max(1, int(merged["max_attempts"]))
+        self.retry_delay = max(0.0, float(merged["retry_delay"]))
+        self.defaults = {key: merged[key] for key in SOURCE_KEYS}
+        self.sources = dict(merged.get("sources") or {})
+
+    def source_settings(self, source: str) -> dict[str, Any]:
+        merged = dict(self.defaults, **self.sources.get(source, {}))
+        return {
+            "max_per_source": max(1, int(merged["max_per_source"])),
+            "coalesce_window": max(0.0, float(merged["coalesce_window"])),
+            "coalesce_max": max(1, int(merged["coalesce_max"])),
+        }
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        backlog = await asyncio.to_thread(self.queue.backlog)
+        # Events accepted while the backlog was loading are already pending.
+        seen = {(e["queue"], e["id"]) for pending in self._pending.values() for e in pending}
+        for event in backlog:
+            if (event["queue"], event["id"]) not in seen:
+                self._enqueue(event)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._ready = None
+        self._pending.clear()
+        self._active.clear()
+        self._scheduled.clear()
+
+    async def asubmit(self, source: str, payload: dict[str, Any]) -> dict[str, Any]:
+        # The durable push waits for a group commit; keep that wait off the event loop.
+        return self._accept(await asyncio.to_thread(self.queue.push, source, payload))
+
+    def _accept(self, event: dict[str, Any]) -> dict[str, Any]:
+        self.counters.incr(event["source"], "received")
+        if self._ready is not None:
+            self._enqueue(event)
+        return event
+
+    def _enqueue(self, event: dict[str, Any]) -> None:
+        self._pending.setdefault(event["source"], deque()).append(event)
+        self._schedule(event["source"])
+
+    def _schedule(self, source: str, delay: float | None = None) -> None:
+        if self._ready is None or source in self._scheduled or not self._pending.get(source):
+            return
+        settings = self.source_settings(source)
+        if self._active.get(source, 0) >= settings["max_per_source"]:
+            return
+        self._scheduled.add(source)
+        wait = settings["coalesce_window"] if delay is None else delay
+        if wait > 0:
+            asyncio.get_running_loop().call_later(wait, self._ready.put_nowait, source)
+        else:
+            self._ready.put_nowait(source)
+
+    def _take(self, source: str) -> list[dict[str, Any]]:
+        pending = self._pending.get(source)
+        if not pending:
+            return []
+        settings = self.source_settings(source)
+        size = settings["coalesce_max"] if settings["coalesce_window"] > 0 else 1
+        batch = [pending.popleft() for _ in range(min(size, len(pending)))]
+        if not pending:
+            del self._pending[source]
+        return batch
+
+    async def _worker(self) -> None:
+        assert self._ready is not None
+        ready = self._ready
+        while True:
+            source = await ready.get()
+            self._scheduled.discard(source)
+            batch = self._take(source)
+            if not batch:
+                continue
+            self._active[source] = self._active.get(source, 0) + 1
+            self._schedule(source)
+            retry = False
+            try:
+                retry = await self._process(source, batch)
+            finally:
+                self._active[source] -= 1
+                if not self._active[source]:
+                    del self._active[source]
+                self._schedule(source, self.retry_delay if retry else None)
+
+    async def _process(self, source: str, batch: list[dict[str, Any]]) -> bool:
+        await asyncio.to_thread(self.queue.mark, batch, "running")
+        orchestrator = self.orchestrator()
+        try:
+            await orchestrator.aprocess_user_message(session_id=f"webhook:{source}", text=webhook_text(source, batch))
+        except Exception as exc:  # noqa: BLE001
+            for event in batch:
+                event["attempts"] += 1
+            failed = [e for e in batch if e["attempts"] >= self.max_attempts]
+            retry = [e for e in batch if e["attempts"] < self.max_attempts]
+            if failed:
+                await asyncio.to_thread(self.queue.mark, failed, "failed", str(exc))
+                self.counters.incr(source, "failed", len(failed))
+                await asyncio.to_thread(
+                    orchestrator.store.log_audit, "webhook", "ingest", {"source": source, "events": len(failed)}, "error"
+                )
+            if retry:
+                await asyncio.to_thread(self.queue.mark, retry, "queued", str(exc))
+                self.counters.incr(source, "retried", len(retry))
+                self._pending.setdefault(source, deque()).extendleft(reversed(retry))
+            return bool(retry)
+        await asyncio.to_thread(self.queue.mark, batch, "done")
+        self.counters.incr(source, "processed", len(batch))
+        self.counters.incr(source, "runs")
+        await asyncio.to_thread(
+            orchestrator.store.log_audit, "webhook", "ingest", {"source": source, "events": len(batch)}, "ok"
+        )
+        return False
+
+    def stats(self) -> dict[str, Any]:
+        counters = self.counters.snapshot()
+        sources = {}
+        for source in sorted(set(counters) | set(self._pending) | set(self._active)):
+            values = counters.get(source, {})
+            runs = values.get("runs", 0)
+            sources[source] = {
+                "queued": len(self._pending.get(source, ())),
+                "active": self._active.get(source, 0),
+                "received": values.get("received", 0),
+                "processed": values.get("processed", 0),
+                "retried": values.get("retried", 0),
+                "failed": values.get("failed", 0),
+                "runs": runs,
+                "events_per_run": round(values.get("processed", 0) / runs, 2) if runs else None,
+                **self.source_settings(source),
+            }
+        return {
+            "backend": self.queue.name,
+            "running": bool(self._tasks),
+            "workers": self.workers,
+            "sources": sources,
+        }
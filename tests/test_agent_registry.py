@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from app.agent_registry import AgentRegistry, AgentStatus
+from app.store import MemoryStore
+
+
+def _agent(idx: int, task_id: str = "t1") -> AgentStatus:
+    return AgentStatus(
+        agent_id=f"a-{idx:03d}",
+        parent_id=None,
+        role="worker",
+        task=f"task {idx}",
+        status="running",
+        task_id=task_id,
+        started_at=f"2026-01-01T00:00:{idx:02d}+00:00",
+    )
+
+
+class AgentRegistryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = MemoryStore(Path(self._tmp.name) / "memory.db")
+
+    def tearDown(self) -> None:
+        self.store.conn.close()
+        self._tmp.cleanup()
+
+    def finish(self, registry: AgentRegistry, agent: AgentStatus) -> None:
+        agent.status = "done"
+        registry.finished(agent)
+
+    def test_evicts_finished_agents_over_cap_and_archives_them(self):
+        registry = AgentRegistry(self.store, {"max_live": 3, "flush_batch": 100})
+        for idx in range(5):
+            agent = _agent(idx)
+            registry.add(agent)
+            self.finish(registry, agent)
+        registry.add(_agent(5))
+
+        stats = registry.stats()
+        self.assertLessEqual(stats["live"], 3)
+        self.assertEqual(stats["running"], 1)
+        self.assertEqual(len(self.store.archived_agents()), 5)
+
+    def test_running_agents_are_never_evicted(self):
+        registry = AgentRegistry(self.store, {"max_live": 1, "max_age_seconds": 0})
+        registry.add(_agent(0))
+        registry.add(_agent(1))
+        self.assertEqual(registry.stats()["live"], 2)
+
+    def test_running_agents_have_their_own_cap(self):
+        registry = AgentRegistry(self.store, {"max_live": 10, "max_running": 2})
+        for idx in range(4):
+            registry.add(_agent(idx))
+        stats = registry.stats()
+        self.assertEqual((stats["live"], stats["running"], stats["evicted_running"]), (2, 2, 2))
+        self.assertEqual({a["status"] for a in self.store.archived_agents()}, {"evicted"})
+
+    def test_started_registry_archives_in_background(self):
+        registry = AgentRegistry(self.store, {"flush_batch": 1})
+        registry.start()
+        try:
+            writes = []
+            original = self.store.archive_agents
+            self.store.archive_agents = lambda rows: writes.append(threading.current_thread()) or original(rows)
+            agent = _agent(0)
+            registry.add(agent)
+            self.finish(registry, agent)
+            self.assertEqual([a["agent_id"] for a in registry.snapshot()["agents"]], ["a-000"])
+        finally:
+            registry.stop()
+        self.assertTrue(writes)
+        self.assertNotIn(threading.current_thread(), writes)
+        self.assertEqual(len(self.store.archived_agents()), 1)
+
+    def test_snapshot_merges_live_and_archive_with_pagination(self):
+        registry = AgentRegistry(self.store, {"max_live": 2, "flush_batch": 1})
+        for idx in range(6):
+            agent = _agent(idx, task_id="t1" if idx % 2 else "t2")
+            registry.add(agent)
+            self.finish(registry, agent)
+
+        first = registry.snapshot(limit=4)
+        self.assertEqual([a["agent_id"] for a in first["agents"]], ["a-005", "a-004", "a-003", "a-002"])
+        self.assertTrue(first["has_more"])
+        second = registry.snapshot(limit=4, offset=4)
+        self.assertEqual([a["agent_id"] for a in second["agents"]], ["a-001", "a-000"])
+        self.assertFalse(second["has_more"])
+
+        by_task = registry.snapshot(task_id="t1")
+        self.assertEqual({a["agent_id"] for a in by_task["agents"]}, {"a-001", "a-003", "a-005"})
+        window = registry.snapshot(since="2026-01-01T00:00:02+00:00", until="2026-01-01T00:00:04+00:00")
+        self.assertEqual([a["agent_id"] for a in window["agents"]], ["a-003", "a-002"])
+
+
+if __name__ == "__main__":
+    unittest.main()
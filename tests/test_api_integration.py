@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import csv
+import gzip
+import hashlib
+import io
+import json
+import threading
+import time
 import unittest
 
 from fastapi.testclient import TestClient
 
-from app.main import app
+from app.main import app, chat_jobs
 
 
 class ApiIntegrationTests(unittest.TestCase):
@@ -25,8 +33,65 @@ class ApiIntegrationTests(unittest.TestCase):
         self.assertEqual(chat.status_code, 200)
         self.assertIn('reply', chat.json())
 
+        trace = self.client.get(f"/traces/{chat.json()['task_id']}")
+        self.assertEqual(trace.status_code, 200)
+        self.assertEqual(trace.json()['name'], 'process_user_message')
+        self.assertEqual(self.client.get('/traces/t-missing').status_code, 404)
+
         sessions = self.client.get('/sessions')
         self.assertEqual(sessions.status_code, 200)
+        self.assertEqual(len(self.client.get('/sessions', params={'limit': -1}).json()['sessions']), 1)
+
+        page = self.client.get('/interactions', params={'session_id': 'itest', 'limit': 1}).json()
+        self.assertEqual(len(page['events']), 1)
+        self.assertGreaterEqual(page['total_estimate']['value'], 1)
+        older = self.client.get('/interactions', params={'session_id': 'itest', 'before_id': page['cursor']['before_id']})
+        self.assertTrue(all(e['id'] < page['cursor']['before_id'] for e in older.json()['events']))
+
+    def test_chat_stream(self):
+        r = self.client.post('/chat/stream', json={'session_id': 'itest', 'text': 'Hallo'})
+        self.assertEqual(r.status_code, 200)
+        self.assertIn('event: start', r.text)
+        self.assertRegex(r.text, r'event: (done|error)\n')
+        tokens = [line for line in r.text.split('\n\n') if line.startswith('event: token')]
+        self.assertFalse(any('Provider call failed' in t for t in tokens))
+
+    def test_chat_job_unknown_task(self):
+        self.assertEqual(self.client.get('/chat/jobs/t-missing').status_code, 404)
+        self.assertEqual(self.client.get('/chat/jobs/t-missing/wait', params={'timeout': 0}).status_code, 404)
+
+    def test_chat_job_submitted_over_http_runs(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        asyncio.run_coroutine_threadsafe(chat_jobs.start(), loop).result(5)
+        try:
+            r = self.client.post('/chat/jobs', json={'session_id': 'jobs', 'text': 'Hallo'})
+            self.assertEqual(r.status_code, 202)
+            job = r.json()
+            for _ in range(250):
+                job = self.client.get(f"/chat/jobs/{r.json()['task_id']}").json()
+                if job['status'] in {'done', 'failed'}:
+                    break
+                time.sleep(0.02)
+            self.assertEqual(job['status'], 'done')
+        finally:
+            asyncio.run_coroutine_threadsafe(chat_jobs.stop(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+
+    def test_usage_rollups_endpoint(self):
+        r = self.client.get('/usage', params={'hours': 6})
+        self.assertEqual(r.status_code, 200)
+        body = r.json()
+        self.assertIn('totals', body)
+        self.assertIn('hourly', body)
+        self.assertIn('usage', self.client.get('/topology').json())
+
+    def test_retention_run_requires_enabled_policy(self):
+        self.assertFalse(self.client.get('/retention').json()['enabled'])
+        self.assertEqual(self.client.post('/retention/run').status_code, 409)
 
     def test_jobs_and_policy(self):
         payload = {
@@ -48,10 +113,35 @@ class ApiIntegrationTests(unittest.TestCase):
         self.assertEqual(policy.status_code, 200)
         self.assertTrue(policy.json()['ok'])
 
+    def test_exports_stream_verifiable_rows(self):
+        self.client.post('/sessions', json={'session_id': 'export', 'display_name': 'Export'})
+        r = self.client.get('/audit/export')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.headers['content-type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in r.text.splitlines()]
+        self.assertTrue(rows)
+        for row in rows[1:]:
+            src = '|'.join([row['timestamp'], row['actor'], row['action'], row['payload'], row['result'], row['prev_hash']])
+            self.assertEqual(hashlib.sha256(src.encode('utf-8')).hexdigest(), row['event_hash'])
+
+        packed = self.client.get('/audit/export', params={'format': 'csv', 'gzip': 'true', 'after_id': rows[0]['id']})
+        table = list(csv.DictReader(io.StringIO(gzip.decompress(packed.content).decode('utf-8'))))
+        self.assertEqual([int(t['id']) for t in table][: len(rows) - 1], [row['id'] for row in rows[1:]])
+
+        interactions = self.client.get('/interactions/export', params={'format': 'csv', 'session_id': 'nobody'})
+        self.assertEqual(interactions.text.strip(), 'id,session_id,user_text,bot_text,created_at')
+        self.assertEqual(self.client.get('/audit/export', params={'format': 'xml'}).status_code, 400)
+
     def test_webhook_ingest(self):
         r = self.client.post('/webhooks/manual', json={'payload': {'text': 'Hallo vom Webhook'}})
-        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.status_code, 202)
         self.assertEqual(r.json()['status'], 'accepted')
+        events = self.client.get('/webhooks').json()['events']
+        self.assertIn(r.json()['event_id'], [e['id'] for e in events])
+
+        found = self.client.get('/search', params={'q': 'Webhook', 'kind': 'webhooks'}).json()['results']
+        self.assertIn(r.json()['event_id'], [e['id'] for e in found])
+        self.assertEqual(self.client.get('/search', params={'q': 'x', 'kind': 'mails'}).status_code, 400)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.chat_jobs import ChatJobQueue
+from app.message_bus import LocalMessageBus
+from app.orchestrator import Orchestrator
+from app.store import MemoryStore, default_paths
+from tests.test_orchestrator import FakeProvider
+
+
+class ChatJobQueueTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.paths = default_paths(str(root / "data"))
+        self.store = MemoryStore(self.paths.db)
+        (root / "config.json").write_text(
+            json.dumps({"agents": {"max_active": 4}, "pipelines": {"mode": "parallel", "max_retries": 0}}),
+            encoding="utf-8",
+        )
+        self.orchestrator = Orchestrator(
+            store=self.store,
+            paths=self.paths,
+            provider=FakeProvider(delay=0.05),
+            config_path=root / "config.json",
+            bus=LocalMessageBus(),
+        )
+
+    def tearDown(self) -> None:
+        self.store.conn.close()
+        self._tmp.cleanup()
+
+    def test_submit_runs_job_and_keeps_stage_outputs(self):
+        jobs = ChatJobQueue(self.store, lambda: self.orchestrator, {"workers": 2})
+
+        async def run() -> tuple[dict, dict]:
+            await jobs.start()
+            try:
+                job = jobs.submit("s1", "Erkläre A; Erkläre B")
+                self.assertEqual(job["status"], "queued")
+                first = await jobs.wait(job["task_id"], timeout=5)
+                while first["status"] not in {"done", "failed"}:
+                    first = await jobs.wait(job["task_id"], timeout=5)
+                return job, first
+            finally:
+                await jobs.stop()
+
+        job, done = asyncio.run(run())
+        self.assertEqual(done["status"], "done")
+        self.assertEqual(done["result"]["task_id"], job["task_id"])
+        self.assertEqual([s["stage"] for s in done["stages"]], ["s1", "s2"])
+        self.assertEqual(self.store.get_chat_job(job["task_id"])["status"], "done")
+
+    def test_interrupted_jobs_are_requeued_on_start(self):
+        self.store.create_chat_job("t-left", "s1", "Hallo", True, 60)
+        self.store.update_chat_job("t-left", status="running")
+        jobs = ChatJobQueue(self.store, lambda: self.orchestrator)
+
+        async def run() -> dict:
+            await jobs.start()
+            try:
+                job = await jobs.wait("t-left", timeout=5)
+                while job["status"] not in {"done", "failed"}:
+                    job = await jobs.wait("t-left", timeout=5)
+                return job
+            finally:
+                await jobs.stop()
+
+        self.assertEqual(asyncio.run(run())["status"], "done")
+
+    def test_submit_requires_running_workers(self):
+        jobs = ChatJobQueue(self.store, lambda: self.orchestrator)
+        with self.assertRaises(RuntimeError):
+            jobs.submit("s1", "Hallo")
+
+    def test_configure_resizes_running_workers(self):
+        jobs = ChatJobQueue(self.store, lambda: self.orchestrator, {"workers": 2})
+
+        async def run() -> tuple[int, int]:
+            await jobs.start()
+            try:
+                jobs.configure({"workers": 4})
+                await asyncio.sleep(0.01)
+                grown = len(jobs._tasks)
+                jobs.configure({"workers": 1})
+                await asyncio.sleep(0.01)
+                return grown, len(jobs._tasks)
+            finally:
+                await jobs.stop()
+
+        self.assertEqual(asyncio.run(run()), (4, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
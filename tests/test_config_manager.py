@@ -38,6 +38,48 @@ class ConfigManagerTests(unittest.TestCase):
             ok, _ = mgr.validate(cfg)
             self.assertFalse(ok)
 
+    def test_snapshot_shared_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "config.json"
+            path.write_text('{"agents": {"max_active": 2}}', encoding="utf-8")
+            mgr = ConfigManager(path, check_interval=0)
+            first = mgr.snapshot()
+            self.assertIs(mgr.snapshot(), first)
+            self.assertEqual(first.version, 1)
+
+            mgr.save({"agents": {"max_active": 5}})
+            saved = mgr.snapshot()
+            self.assertEqual(saved.version, 2)
+            self.assertEqual(mgr.current()["agents"]["max_active"], 5)
+
+            path.write_text('{"agents": {"max_active": 7}, "bus": {}}', encoding="utf-8")
+            external = mgr.snapshot()
+            self.assertEqual(external.version, 3)
+            self.assertEqual(external.data["agents"]["max_active"], 7)
+
+    def test_load_returns_private_copy(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "config.json"
+            path.write_text('{"security": {"allowed_paths": []}}', encoding="utf-8")
+            mgr = ConfigManager(path)
+            cfg = mgr.load()
+            cfg["security"]["allowed_paths"].append("/tmp")
+            self.assertEqual(mgr.current()["security"]["allowed_paths"], [])
+
+    def test_current_is_read_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "config.json"
+            path.write_text('{"security": {"allowed_paths": ["/tmp"]}}', encoding="utf-8")
+            mgr = ConfigManager(path)
+            cfg = mgr.current()
+            with self.assertRaises(TypeError):
+                cfg["security"]["allowed_paths"].append("/etc")
+            with self.assertRaises(TypeError):
+                cfg["bus"] = {}
+            section = dict(cfg["security"], sandbox_mode=False)
+            self.assertEqual(mgr.current(), {"security": {"allowed_paths": ["/tmp"]}})
+            self.assertFalse(section["sandbox_mode"])
+
 
 if __name__ == "__main__":
     unittest.main()
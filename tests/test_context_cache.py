@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import persona as persona_mod
+from app.context_cache import ContextCache
+from app.store import MemoryStore, default_paths
+
+
+class ContextCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.paths = default_paths(str(Path(self._tmp.name) / "data"))
+        self.store = MemoryStore(self.paths.db)
+        self.prompts: list[str] = []
+
+        def build(snapshot: dict) -> str:
+            self.prompts.append(snapshot["persona"]["name"])
+            return f"Du bist {snapshot['persona']['name']}"
+
+        self.cache = ContextCache(self.paths, self.store, build)
+
+    def tearDown(self) -> None:
+        self.store.conn.close()
+        self._tmp.cleanup()
+
+    def test_snapshot_and_prompt_are_reused(self):
+        first, prompt = self.cache.snapshot()
+        second, again = self.cache.snapshot()
+        self.assertIs(first, second)
+        self.assertEqual(prompt, again)
+        self.assertEqual(len(self.prompts), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_unchanged_preference_does_not_invalidate(self):
+        self.store.upsert_preference("tone", "direkt", confidence=0.7)
+        first, _ = self.cache.snapshot()
+        self.assertFalse(self.store.upsert_preference("tone", "direkt", confidence=0.7))
+        self.assertIs(self.cache.snapshot()[0], first)
+        self.assertTrue(self.store.upsert_preference("tone", "locker", confidence=0.7))
+        self.assertEqual(self.cache.snapshot()[0]["preferences"][0]["value"], "locker")
+
+    def test_grouped_preference_write_reaches_snapshot(self):
+        store = MemoryStore(self.paths.root / "grouped.db", group_commit={"enabled": True, "interval_ms": 50})
+        cache = ContextCache(self.paths, store, lambda snapshot: "")
+        try:
+            self.assertEqual(cache.preferences(), [])
+            self.assertTrue(store.upsert_preference("tone", "locker", confidence=0.7))
+            cache.preferences()
+            store.flush()
+            self.assertEqual(cache.preferences()[0]["value"], "locker")
+        finally:
+            store.close()
+
+    def test_update_and_external_edit_refresh_cache(self):
+        self.cache.snapshot()
+        persona = dict(persona_mod.load_or_create(self.paths.persona), name="Ada")
+        persona_mod.save(self.paths.persona, persona)
+        self.cache.update("persona", persona)
+        self.assertEqual(self.cache.snapshot()[1], "Du bist Ada")
+
+        external = dict(persona, name="Grace Hopper")
+        self.paths.persona.write_text(json.dumps(external), encoding="utf-8")
+        stat = self.paths.persona.stat()
+        os.utime(self.paths.persona, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertEqual(self.cache.snapshot()[1], "Du bist Grace Hopper")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import unittest
+
+from app.dispatcher import SessionDispatcher, SessionQueueFull
+
+
+class SessionDispatcherTests(unittest.TestCase):
+    def test_same_session_runs_in_order(self):
+        dispatcher = SessionDispatcher({"max_concurrent": 4})
+        order: list[int] = []
+
+        async def work(idx: int) -> None:
+            async with dispatcher.aslot("s1"):
+                order.append(idx)
+                await asyncio.sleep(0.02 if idx == 0 else 0)
+                order.append(idx)
+
+        async def run() -> None:
+            await asyncio.gather(*(work(i) for i in range(3)))
+
+        asyncio.run(run())
+        self.assertEqual(order, [0, 0, 1, 1, 2, 2])
+        self.assertEqual(dispatcher.stats()["sessions"]["s1"]["completed"], 3)
+
+    def test_sessions_run_in_parallel_up_to_global_limit(self):
+        dispatcher = SessionDispatcher({"max_concurrent": 2})
+        peak = {"now": 0, "max": 0}
+        lock = threading.Lock()
+
+        def work(session_id: str) -> None:
+            with dispatcher.slot(session_id):
+                with lock:
+                    peak["now"] += 1
+                    peak["max"] = max(peak["max"], peak["now"])
+                time.sleep(0.05)
+                with lock:
+                    peak["now"] -= 1
+
+        threads = [threading.Thread(target=work, args=(f"s{i}",)) for i in range(4)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(peak["max"], 2)
+        self.assertLess(time.perf_counter() - started, 0.19)
+
+    def test_queue_depth_limit_rejects(self):
+        dispatcher = SessionDispatcher({"max_queue_per_session": 1})
+
+        async def run() -> list:
+            async def hold() -> None:
+                async with dispatcher.aslot("s1"):
+                    await asyncio.sleep(0.05)
+
+            first = asyncio.create_task(hold())
+            second = asyncio.create_task(hold())
+            await asyncio.sleep(0.01)
+            with self.assertRaises(SessionQueueFull):
+                async with dispatcher.aslot("s1"):
+                    pass
+            return await asyncio.gather(first, second)
+
+        asyncio.run(run())
+        stats = dispatcher.stats()["sessions"]["s1"]
+        self.assertEqual((stats["completed"], stats["rejected"], stats["queue_depth"]), (2, 1, 0))
+
+    def test_idle_session_counters_are_bounded(self):
+        dispatcher = SessionDispatcher({"max_tracked_sessions": 2})
+        for i in range(5):
+            with dispatcher.slot(f"s{i}"):
+                pass
+        stats = dispatcher.stats()
+        self.assertEqual(set(stats["sessions"]), {"s3", "s4"})
+        self.assertEqual(stats["retired_sessions"]["sessions"], 3)
+        self.assertEqual(stats["retired_sessions"]["completed"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
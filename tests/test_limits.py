@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import httpx
+
+from app.limits import LimitTimeout, ProviderLimiter, retry_after_seconds
+from app.provider import DEFAULT_HTTP, ProviderRouter
+from app.secrets_store import SecretsStore
+
+
+class ProviderLimiterTests(unittest.TestCase):
+    def test_max_in_flight_queues_in_fifo_order(self):
+        limiter = ProviderLimiter({"max_in_flight": 1})
+        limiter.acquire()
+        order: list[int] = []
+
+        def worker(idx: int) -> None:
+            limiter.acquire(timeout=5)
+            order.append(idx)
+            limiter.release()
+
+        threads = []
+        for idx in range(3):
+            t = threading.Thread(target=worker, args=(idx,))
+            t.start()
+            threads.append(t)
+            while limiter.stats()["queue_depth"] < idx + 1:
+                time.sleep(0.001)
+        self.assertEqual(limiter.stats()["in_flight"], 1)
+        limiter.release()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(order, [0, 1, 2])
+        self.assertEqual(limiter.stats()["admitted"], 4)
+
+    def test_queue_timeout_raises_and_leaves_queue(self):
+        limiter = ProviderLimiter({"max_in_flight": 1})
+        limiter.acquire()
+        with self.assertRaises(LimitTimeout):
+            limiter.acquire(timeout=0.05)
+        stats = limiter.stats()
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["timeouts"], 1)
+
+    def test_request_bucket_blocks_when_empty(self):
+        limiter = ProviderLimiter({"requests_per_minute": 1})
+        limiter.acquire()
+        limiter.release()
+        with self.assertRaises(LimitTimeout):
+            limiter.acquire(timeout=0.05)
+
+    def test_enabled_token_bucket_starts_full(self):
+        limiter = ProviderLimiter({})
+        limiter.configure({"tokens_per_minute": 1000})
+        limiter.acquire(800, timeout=0.05)
+        limiter.release()
+        with self.assertRaises(LimitTimeout):
+            limiter.acquire(800, timeout=0.05)
+
+    def test_async_waiter_is_woken_by_sync_release(self):
+        limiter = ProviderLimiter({"max_in_flight": 1})
+        limiter.acquire()
+
+        async def run() -> None:
+            task = asyncio.create_task(limiter.aacquire(timeout=5))
+            await asyncio.sleep(0.01)
+            self.assertEqual(limiter.stats()["queue_depth"], 1)
+            threading.Timer(0.01, limiter.release).start()
+            await task
+
+        asyncio.run(run())
+        self.assertEqual(limiter.stats()["in_flight"], 1)
+
+    def test_retry_after_parsing(self):
+        self.assertIsNone(retry_after_seconds(500, {"retry-after": "3"}))
+        self.assertEqual(retry_after_seconds(429, {"retry-after": "3"}), 3.0)
+        self.assertEqual(retry_after_seconds(503, {"retry-after-ms": "250"}), 0.25)
+        self.assertIsNone(retry_after_seconds(429, {}))
+        self.assertEqual(retry_after_seconds(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}), 0.0)
+
+
+class ProviderRetryAfterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        provider = {
+            "active": "openai",
+            "options": {"openai": {"base_url": "http://primary.test/v1", "model": "a"}},
+            "limits": {"retry_after_attempts": 1, "max_retry_after": 1},
+        }
+        (root / "config.json").write_text(json.dumps({"provider": provider}), encoding="utf-8")
+        self.router = ProviderRouter(root / "config.json", SecretsStore(root / "secrets.json"))
+
+    def tearDown(self) -> None:
+        self.router.close()
+        self._tmp.cleanup()
+
+    def install(self, handler) -> None:
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        self.router._clients["openai"] = (tuple(sorted(DEFAULT_HTTP.items())), client)
+
+    def test_retry_after_is_honoured_once(self):
+        calls: list[float] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                return httpx.Response(429, headers={"retry-after-ms": "50"}, json={})
+            return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+        self.install(handler)
+        result = self.router.generate_result("sys", "hi", use_cache=False)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.text, "ok")
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.04)
+        limits = self.router.provider_metrics()["providers"]["openai"]["limits"]
+        self.assertEqual(limits["retry_after_pauses"], 1)
+
+    def test_retry_after_above_cap_fails_fast(self):
+        calls: list[int] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(1)
+            return httpx.Response(429, headers={"retry-after": "120"}, json={})
+
+        self.install(handler)
+        result = self.router.generate_result("sys", "hi", use_cache=False)
+        self.assertFalse(result.ok)
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import httpx
+
+from app.llm_cache import ResponseCache, cache_key
+from app.provider import DEFAULT_HTTP, ProviderRouter
+from app.secrets_store import SecretsStore
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(Path(self._tmp.name) / "llm_cache.db")
+
+    def tearDown(self) -> None:
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def test_key_depends_on_all_parts(self):
+        base = cache_key("openai", "m", "sys", "user", 0.4)
+        self.assertEqual(base, cache_key("openai", "m", "sys", "user", 0.4))
+        self.assertNotEqual(base, cache_key("anthropic", "m", "sys", "user", 0.4))
+        self.assertNotEqual(base, cache_key("openai", "m", "sys", "user", 0.7))
+
+    def test_hit_miss_and_ttl(self):
+        self.assertIsNone(self.cache.get("k", "openai", ttl_seconds=60))
+        self.cache.put("k", "openai", "m", "answer", max_entries=10)
+        self.assertEqual(self.cache.get("k", "openai", ttl_seconds=60), "answer")
+        self.cache.conn.execute("UPDATE llm_cache SET created_at=?", (time.time() - 120,))
+        self.assertIsNone(self.cache.get("k", "openai", ttl_seconds=60))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["entries"], 0)
+
+    def test_lru_eviction(self):
+        for i in range(3):
+            self.cache.put(f"k{i}", "openai", "m", f"v{i}", max_entries=3)
+        self.cache.conn.execute("UPDATE llm_cache SET last_used=last_used+10 WHERE key='k0'")
+        self.cache.put("k3", "openai", "m", "v3", max_entries=3)
+        self.assertEqual(self.cache.get("k0", "openai", ttl_seconds=0), "v0")
+        self.assertIsNone(self.cache.get("k1", "openai", ttl_seconds=0))
+
+    def test_hits_are_flushed_in_batches(self):
+        self.cache.put("k", "openai", "m", "answer", max_entries=10)
+        changes = self.cache.conn.total_changes
+        for _ in range(3):
+            self.assertEqual(self.cache.get("k", "openai", ttl_seconds=0), "answer")
+        self.assertEqual(self.cache.conn.total_changes, changes)
+        self.cache.flush()
+        self.assertEqual(self.cache.conn.execute("SELECT hits FROM llm_cache").fetchone()["hits"], 3)
+
+    def test_put_keeps_a_running_entry_count(self):
+        self.cache.put("k0", "openai", "m", "v0", max_entries=2)
+        statements: list[str] = []
+        self.cache.conn.set_trace_callback(statements.append)
+        for i in range(1, 4):
+            self.cache.put(f"k{i}", "openai", "m", f"v{i}", max_entries=2)
+        self.cache.put("k3", "openai", "m", "v3b", max_entries=2)
+        self.cache.conn.set_trace_callback(None)
+        self.assertFalse([sql for sql in statements if "COUNT(*)" in sql])
+        self.assertEqual(self.cache.stats()["entries"], 2)
+        self.assertEqual(self.cache.stats()["providers"]["openai"]["evictions"], 2)
+
+
+class ProviderCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        (root / "config.json").write_text(
+            '{"provider":{"active":"openai","options":{"openai":{"base_url":"http://llm.test/v1","model":"x"}}}}',
+            encoding="utf-8",
+        )
+        self.cache = ResponseCache(root / "llm_cache.db")
+        self.router = ProviderRouter(root / "config.json", SecretsStore(root / "secrets.json"), cache=self.cache)
+        self.calls = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.calls += 1
+            return httpx.Response(200, json={"choices": [{"message": {"content": f"antwort {self.calls}"}}]})
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        self.router._clients["openai"] = (tuple(sorted(DEFAULT_HTTP.items())), client)
+
+    def tearDown(self) -> None:
+        self.router.close()
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def test_generate_uses_cache_and_bypass(self):
+        self.assertEqual(self.router.generate("sys", "hallo"), "antwort 1")
+        self.assertEqual(self.router.generate("sys", "hallo"), "antwort 1")
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.router.generate("sys", "hallo", use_cache=False), "antwort 2")
+        self.assertEqual(self.calls, 2)
+
+    def test_provider_opt_out(self):
+        cfg_path = self.router.config_path
+        cfg_path.write_text(
+            '{"provider":{"active":"openai","options":{"openai":{"base_url":"http://llm.test/v1","model":"x","cache":false}}}}',
+            encoding="utf-8",
+        )
+        self.router.generate("sys", "hallo")
+        self.router.generate("sys", "hallo")
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from app.message_bus import LocalMessageBus
+from app.orchestrator import Orchestrator
+from app.provider import Completion
+from app.store import MemoryStore, default_paths
+
+
+TASK = "Erkläre A; Erkläre B; Erkläre C"
+
+
+class FakeProvider:
+    def __init__(self, delay: float = 0.2, fail: str | None = None):
+        self.delay = delay
+        self.fail = fail
+
+    def _result(self, user_prompt: str) -> Completion:
+        ok = not (self.fail and self.fail in user_prompt)
+        return Completion(
+            text=f"out:{user_prompt[-9:]}", provider="fake", model="m", ok=ok, usage={"prompt_tokens": 3, "completion_tokens": 2}
+        )
+
+    def generate_result(self, system_prompt: str, user_prompt: str, use_cache: bool = True) -> Completion:
+        if not user_prompt.startswith("Konsolidiere"):
+            time.sleep(self.delay)
+        return self._result(user_prompt)
+
+    async def agenerate_result(self, system_prompt: str, user_prompt: str, use_cache: bool = True) -> Completion:
+        if not user_prompt.startswith("Konsolidiere"):
+            await asyncio.sleep(self.delay)
+        return self._result(user_prompt)
+
+    async def astream(self, system_prompt: str, user_prompt: str, use_cache: bool = True, on_complete=None):
+        result = await self.agenerate_result(system_prompt, user_prompt, use_cache)
+        for word in result.text.split(":"):
+            await asyncio.sleep(self.delay)
+            yield word
+        if on_complete:
+            on_complete(result)
+
+
+class ParallelPipelineTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.paths = default_paths(str(Path(self._tmp.name) / "data"))
+        self.config_path = Path(self._tmp.name) / "config.json"
+        self.store = MemoryStore(self.paths.db)
+
+    def tearDown(self) -> None:
+        self.store.conn.close()
+        self._tmp.cleanup()
+
+    def orchestrator(self, provider: FakeProvider, **pipelines) -> Orchestrator:
+        cfg = {"agents": {"max_active": 4}, "pipelines": {"mode": "parallel", "max_retries": 0, **pipelines}}
+        self.config_path.write_text(json.dumps(cfg), encoding="utf-8")
+        return Orchestrator(
+            store=self.store, paths=self.paths, provider=provider, config_path=self.config_path, bus=LocalMessageBus()
+        )
+
+    def test_parallel_stages_overlap_and_keep_order(self):
+        orch = self.orchestrator(FakeProvider(delay=0.2))
+        started = time.perf_counter()
+        out = orch.process_user_message("s", TASK)
+        elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual([s["stage"] for s in out["sub_agents"]], ["s1", "s2", "s3"])
+        self.assertTrue(all(s["status"] == "done" for s in out["sub_agents"]))
+        self.assertEqual(out["token_usage"], 20)
+
+    def test_async_parallel_stages_overlap(self):
+        orch = self.orchestrator(FakeProvider(delay=0.2))
+        started = time.perf_counter()
+        out = asyncio.run(orch.aprocess_user_message("s", TASK))
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual([s["stage"] for s in out["sub_agents"]], ["s1", "s2", "s3"])
+
+    def test_async_paths_keep_store_writes_off_the_loop(self):
+        orch = self.orchestrator(FakeProvider(delay=0.01))
+        threads: list[threading.Thread] = []
+        for name in ("record_interaction", "record_usage", "log_audit"):
+            original = getattr(self.store, name)
+
+            def wrapped(*args, _original=original, **kwargs):
+                threads.append(threading.current_thread())
+                return _original(*args, **kwargs)
+
+            setattr(self.store, name, wrapped)
+
+        async def run() -> None:
+            await orch.aprocess_user_message("s", TASK)
+            async for _ in orch.astream_user_message("s", "Hallo"):
+                pass
+
+        asyncio.run(run())
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_aborted_stream_closes_root_agent(self):
+        orch = self.orchestrator(FakeProvider(delay=0.01))
+
+        async def run() -> str:
+            stream = orch.astream_user_message("s", "Hallo")
+            async for event in stream:
+                if event["event"] == "token":
+                    await stream.aclose()
+                    return event["task_id"]
+            return ""
+
+        task_id = asyncio.run(run())
+        root = orch.agents_snapshot(task_id=task_id)[0]
+        self.assertEqual((root["status"], root["role"]), ("cancelled", "orchestrator"))
+        self.assertEqual(self.store.recent_interactions()[0]["bot_text"], "out")
+
+    def test_failed_stream_ends_with_error_event(self):
+        orch = self.orchestrator(FakeProvider(delay=0.01, fail="Hallo"))
+
+        async def run() -> list[dict]:
+            return [event async for event in orch.astream_user_message("s", "Hallo")]
+
+        events = asyncio.run(run())
+        self.assertEqual(events[-1]["event"], "error")
+        self.assertNotIn("done", [e["event"] for e in events])
+        root = orch.agents_snapshot(task_id=events[-1]["task_id"])[0]
+        self.assertEqual(root["status"], "failed")
+
+    def test_stage_timeout(self):
+        orch = self.orchestrator(FakeProvider(delay=0.5), stage_timeout=0.05)
+        out = asyncio.run(orch.aprocess_user_message("s", TASK))
+        self.assertEqual({s["status"] for s in out["sub_agents"]}, {"timeout"})
+
+    def test_timed_out_stage_threads_skip_billing_and_cache(self):
+        orch = self.orchestrator(FakeProvider(delay=0.3), stage_timeout=0.05, stage_cache={"enabled": True})
+        billed: list[str] = []
+        original = self.store.record_usage
+        self.store.record_usage = lambda **kw: billed.append(kw["agent_id"]) or original(**kw)
+        out = orch.process_user_message("s", TASK)
+        time.sleep(0.4)
+        self.assertEqual({s["status"] for s in out["sub_agents"]}, {"timeout"})
+        self.assertEqual(billed, [orch.agents_snapshot(task_id=out["task_id"], limit=10)[-1]["agent_id"]])
+        self.assertEqual(orch.stage_cache.stats()["entries"], 0)
+
+    def test_fail_fast_cancels_siblings_and_later_stages(self):
+        provider = FakeProvider(delay=0.0, fail="A")
+        orch = self.orchestrator(provider, mode="sequential", fail_fast=True)
+        out = asyncio.run(orch.aprocess_user_message("s", TASK))
+        self.assertEqual([s["status"] for s in out["sub_agents"]], ["failed", "skipped", "skipped"])
+        self.assertEqual(self.store.recent_audit(5)[1]["action"], "pipeline_aborted")
+
+    def test_stage_cache_skips_unchanged_stages(self):
+        provider = FakeProvider(delay=0.0)
+        orch = self.orchestrator(provider, stage_cache={"enabled": True})
+        first = orch.process_user_message("s", TASK)
+        self.assertFalse(any(s["cache_hit"] for s in first["sub_agents"]))
+
+        second = asyncio.run(orch.aprocess_user_message("s", "Erkläre A; Erkläre B; Erkläre D"))
+        self.assertEqual([s["cache_hit"] for s in second["sub_agents"]], [True, True, False])
+        self.assertEqual(second["sub_agents"][0]["output"], first["sub_agents"][0]["output"])
+        self.assertEqual(second["sub_agents"][0]["token_usage"], 0)
+        stage_msgs = [m["payload"] for m in orch.bus.recent() if "stage" in m["payload"]]
+        self.assertEqual([m["cache_hit"] for m in stage_msgs[-3:]], [True, True, False])
+        orch.stage_cache.close()
+
+    def test_stage_cache_is_opt_in(self):
+        orch = self.orchestrator(FakeProvider(delay=0.0))
+        orch.process_user_message("s", TASK)
+        out = orch.process_user_message("s", TASK)
+        self.assertFalse(any(s["cache_hit"] for s in out["sub_agents"]))
+        self.assertEqual(orch.stage_cache.stats()["entries"], 0)
+        orch.stage_cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
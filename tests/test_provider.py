@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+
+from app.llm_cache import ResponseCache
+from app.metrics import LatencyHistogram
+from app.provider import DEFAULT_HTTP, ProviderConfig, ProviderRouter, iter_sse, parse_usage
+from app.secrets_store import SecretsStore
+
+
+class ProviderPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        (root / "config.json").write_text(
+            '{"provider":{"active":"openai","options":{"openai":{"base_url":"http://localhost","model":"x"}}}}',
+            encoding="utf-8",
+        )
+        self.router = ProviderRouter(root / "config.json", SecretsStore(root / "secrets.json"))
+
+    def tearDown(self) -> None:
+        self.router.close()
+        self._tmp.cleanup()
+
+    def test_client_is_reused_per_provider(self):
+        first = self.router._client("openai", dict(DEFAULT_HTTP))
+        second = self.router._client("openai", dict(DEFAULT_HTTP))
+        other = self.router._client("anthropic", dict(DEFAULT_HTTP))
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+    def test_client_rebuilt_when_settings_change(self):
+        first = self.router._client("openai", dict(DEFAULT_HTTP))
+        second = self.router._client("openai", dict(DEFAULT_HTTP, timeout=5.0))
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed)
+
+    def test_http_settings_merge_provider_override(self):
+        cfg = ProviderConfig(
+            active="openai",
+            options={"openai": {"http": {"max_connections": 3}}},
+            http={"timeout": 12},
+        )
+        merged = cfg.http_settings("openai")
+        self.assertEqual(merged["timeout"], 12)
+        self.assertEqual(merged["max_connections"], 3)
+        self.assertEqual(merged["keepalive_expiry"], DEFAULT_HTTP["keepalive_expiry"])
+
+
+class ProviderStreamTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        (root / "config.json").write_text('{"provider":{"active":"openai","options":{"openai":{}}}}', encoding="utf-8")
+        self.router = ProviderRouter(root / "config.json", SecretsStore(root / "secrets.json"))
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def collect(self, handler, active: str, request, usage: dict[str, int] | None = None) -> list[str]:
+        async def run() -> list[str]:
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return [chunk async for chunk in self.router._astream_with(client, active, request, usage)]
+
+        return asyncio.run(run())
+
+    def test_iter_sse_events(self):
+        lines = ["event: a", "data: 1", "", ": comment", "data: 2", "data: 3", ""]
+        self.assertEqual(list(iter_sse(lines)), [("a", "1"), ("message", "2\n3")])
+
+    def test_openai_stream_yields_deltas(self):
+        body = (
+            'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n'
+            'data: {"choices":[{"delta":{"content":"Hal"}}]}\n\n'
+            'data: {"choices":[{"delta":{"content":"lo"}}]}\n\n'
+            "data: [DONE]\n\n"
+        )
+        settings = {"base_url": "http://llm.test/v1", "model": "x"}
+        request = self.router._build_request("openai", settings, "sys", "hi")
+        chunks = self.collect(lambda req: httpx.Response(200, text=body), "openai", request)
+        self.assertEqual(chunks, ["Hal", "lo"])
+
+    def test_async_stream_yields_deltas(self):
+        body = 'data: {"choices":[{"delta":{"content":"A"}}]}\n\ndata: {"choices":[{"delta":{"content":"B"}}]}\n\n'
+
+        async def collect() -> list[str]:
+            transport = httpx.MockTransport(lambda req: httpx.Response(200, text=body))
+            async with httpx.AsyncClient(transport=transport) as client:
+                request = self.router._build_request("openai", {"base_url": "http://llm.test/v1"}, "sys", "hi")
+                return [chunk async for chunk in self.router._astream_with(client, "openai", request)]
+
+        self.assertEqual(asyncio.run(collect()), ["A", "B"])
+
+    def test_agenerate_reports_errors_as_text(self):
+        out = asyncio.run(self.router.agenerate("sys", "hi"))
+        self.assertIn("Provider call failed", out)
+
+    def test_anthropic_stream_yields_text_deltas(self):
+        body = (
+            "event: message_start\ndata: {}\n\n"
+            'event: content_block_delta\ndata: {"delta":{"type":"text_delta","text":"Hi"}}\n\n'
+            "event: message_stop\ndata: {}\n\n"
+        )
+        settings = {"base_url": "http://llm.test/v1", "api_key_env": "ONTOTI_TEST_KEY"}
+        self.router.secrets.set_secret("ONTOTI_TEST_KEY", "k")
+        request = self.router._build_request("anthropic", settings, "sys", "hi")
+        chunks = self.collect(lambda req: httpx.Response(200, text=body), "anthropic", request)
+        self.assertEqual(chunks, ["Hi"])
+        self.assertEqual(request[1]["max_tokens"], 512)
+        request = self.router._build_request("anthropic", dict(settings, max_tokens=2048), "sys", "hi")
+        self.assertEqual(request[1]["max_tokens"], 2048)
+
+    def test_parse_usage(self):
+        openai = {"usage": {"prompt_tokens": 12, "completion_tokens": 5, "prompt_tokens_details": {"cached_tokens": 8}}}
+        self.assertEqual(parse_usage("openai", openai), {"prompt_tokens": 12, "completion_tokens": 5, "cached_tokens": 8})
+        anthropic = {"usage": {"input_tokens": 10, "cache_read_input_tokens": 30, "output_tokens": 7}}
+        self.assertEqual(parse_usage("anthropic", anthropic), {"prompt_tokens": 40, "completion_tokens": 7, "cached_tokens": 30})
+        self.assertEqual(parse_usage("openai", {"choices": []}), {})
+
+    def test_stream_collects_usage(self):
+        seen: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(json.loads(request.content))
+            return httpx.Response(
+                200,
+                text=(
+                    'data: {"choices":[{"delta":{"content":"A"}}]}\n\n'
+                    'data: {"choices":[],"usage":{"prompt_tokens":9,"completion_tokens":1}}\n\n'
+                    "data: [DONE]\n\n"
+                ),
+            )
+
+        request = self.router._build_request("openai", {"base_url": "http://llm.test/v1"}, "sys", "hi")
+        usage: dict[str, int] = {}
+        self.assertEqual(self.collect(handler, "openai", request, usage), ["A"])
+        self.assertEqual(usage["prompt_tokens"], 9)
+        self.assertEqual(usage["completion_tokens"], 1)
+        self.assertTrue(seen[0]["stream_options"]["include_usage"])
+
+        request = self.router._build_request("lmstudio", {"base_url": "http://llm.test/v1"}, "sys", "hi")
+        self.assertEqual(self.collect(handler, "lmstudio", request), ["A"])
+        self.assertNotIn("stream_options", seen[1])
+
+
+def _reply(text: str, delay: float = 0.0):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if delay:
+            time.sleep(delay)
+        return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+    return handler
+
+
+class _BrokenStream(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        yield b'data: {"choices":[{"delta":{"content":"Hal"}}]}\n\n'
+        raise httpx.ReadError("connection reset")
+
+
+class ProviderFailoverTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.router = ProviderRouter(self.root / "config.json", SecretsStore(self.root / "secrets.json"))
+        self.write_config({})
+
+    def tearDown(self) -> None:
+        self.router.close()
+        self._tmp.cleanup()
+
+    def write_config(self, extra: dict) -> None:
+        provider = {
+            "active": "openai",
+            "options": {
+                "openai": {"base_url": "http://primary.test/v1", "model": "a"},
+                "lmstudio": {"base_url": "http://backup.test/v1", "model": "b"},
+            },
+            "failover": ["lmstudio"],
+        }
+        provider.update(extra)
+        (self.root / "config.json").write_text(json.dumps({"provider": provider}), encoding="utf-8")
+
+    def install(self, name: str, handler) -> None:
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        self.router._clients[name] = (tuple(sorted(DEFAULT_HTTP.items())), client)
+
+    def test_fails_over_to_next_provider(self):
+        self.install("openai", lambda req: httpx.Response(503, json={}))
+        self.install("lmstudio", _reply("backup"))
+        result = self.router.generate_result("sys", "hi")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.provider, "lmstudio")
+        self.assertEqual(result.text, "backup")
+        self.assertEqual(self.router.counters.snapshot()["openai"]["errors"], 1)
+
+    def test_failover_answer_is_cached_under_chain_head(self):
+        cache = ResponseCache(self.root / "llm_cache.db")
+        self.router.cache = cache
+        self.write_config({"cache": {"enabled": True}})
+        self.install("openai", lambda req: httpx.Response(503, json={}))
+        self.install("lmstudio", _reply("backup"))
+        self.assertEqual(self.router.generate_result("sys", "hi").provider, "lmstudio")
+        cached = self.router.generate_result("sys", "hi")
+        self.assertEqual((cached.cached, cached.text), (True, "backup"))
+        self.assertEqual(self.router.counters.snapshot()["openai"]["errors"], 1)
+        cache.close()
+
+    def test_all_failures_report_error_text(self):
+        self.install("openai", lambda req: httpx.Response(500, json={}))
+        self.install("lmstudio", lambda req: httpx.Response(500, json={}))
+        result = self.router.generate_result("sys", "hi")
+        self.assertFalse(result.ok)
+        self.assertIn("Provider call failed", result.text)
+        self.assertEqual(len(result.errors), 2)
+
+    def test_stream_failure_after_first_token_reports_failed_completion(self):
+        fallback = []
+
+        def backup(request: httpx.Request) -> httpx.Response:
+            fallback.append(request)
+            return httpx.Response(200, text='data: {"choices":[{"delta":{"content":"B"}}]}\n\n')
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            key = tuple(sorted(DEFAULT_HTTP.items()))
+            broken = httpx.MockTransport(lambda req: httpx.Response(200, stream=_BrokenStream()))
+            self.router._aclients["openai", loop] = (key, httpx.AsyncClient(transport=broken))
+            self.router._aclients["lmstudio", loop] = (key, httpx.AsyncClient(transport=httpx.MockTransport(backup)))
+            completions = []
+            chunks = [c async for c in self.router.astream("sys", "hi", on_complete=completions.append)]
+            return chunks, completions
+
+        chunks, completions = asyncio.run(run())
+        self.assertEqual(chunks, ["Hal"])
+        self.assertEqual(fallback, [])
+        self.assertEqual(len(completions), 1)
+        self.assertFalse(completions[0].ok)
+        self.assertIn("connection reset", completions[0].text)
+
+    def test_hedge_fires_when_primary_is_slow(self):
+        self.write_config({"hedging": {"enabled": True, "min_samples": 5, "min_delay_ms": 20, "max_delay_ms": 50}})
+        histogram = LatencyHistogram()
+        for _ in range(10):
+            histogram.observe(10)
+        self.router.latency["openai"] = histogram
+        self.install("openai", _reply("slow", delay=0.5))
+        self.install("lmstudio", _reply("fast"))
+
+        started = time.perf_counter()
+        result = self.router.generate_result("sys", "hi")
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(result.text, "fast")
+        self.assertTrue(result.hedged)
+        self.assertEqual(self.router.counters.snapshot()["lmstudio"]["hedge_wins"], 1)
+
+    def test_async_hedge_cancels_slow_primary(self):
+        self.write_config({"hedging": {"enabled": True, "min_samples": 5, "min_delay_ms": 20, "max_delay_ms": 50}})
+        histogram = LatencyHistogram()
+        for _ in range(10):
+            histogram.observe(10)
+        self.router.latency["openai"] = histogram
+
+        async def slow(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(5)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "slow"}}]})
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            key = tuple(sorted(DEFAULT_HTTP.items()))
+            self.router._aclients["openai", loop] = (key, httpx.AsyncClient(transport=httpx.MockTransport(slow)))
+            fast = httpx.AsyncClient(transport=httpx.MockTransport(_reply("fast")))
+            self.router._aclients["lmstudio", loop] = (key, fast)
+            return await self.router.agenerate_result("sys", "hi")
+
+        started = time.perf_counter()
+        result = asyncio.run(run())
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(result.provider, "lmstudio")
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            time.sleep(0.2)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "shared"}}]})
+
+        self.install("openai", handler)
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(lambda _: self.router.generate_result("sys", "same"), range(5)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({r.text for r in results}, {"shared"})
+        self.assertEqual(sum(r.coalesced for r in results), 4)
+        self.assertEqual(self.router.provider_metrics()["single_flight"]["coalesced"], 4)
+
+    def test_async_requests_coalesce(self):
+        calls = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "shared"}}]})
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            key = tuple(sorted(DEFAULT_HTTP.items()))
+            self.router._aclients["openai", loop] = (key, httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+            return await asyncio.gather(*(self.router.agenerate_result("sys", "same") for _ in range(3)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r.text for r in results], ["shared"] * 3)
+
+    def test_cancelled_leader_hands_flight_to_followers(self):
+        calls = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "shared"}}]})
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            key = tuple(sorted(DEFAULT_HTTP.items()))
+            self.router._aclients["openai", loop] = (key, httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+            leader = asyncio.create_task(self.router.agenerate_result("sys", "same"))
+            await asyncio.sleep(0.02)
+            followers = [asyncio.create_task(self.router.agenerate_result("sys", "same")) for _ in range(2)]
+            await asyncio.sleep(0.02)
+            leader.cancel()
+            return await asyncio.gather(*followers)
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([r.text for r in results], ["shared"] * 2)
+        self.assertEqual(sum(r.coalesced for r in results), 1)
+        self.assertIsNot(results[0].usage, results[1].usage)
+
+    def test_async_clients_are_tracked_per_loop(self):
+        http = dict(DEFAULT_HTTP)
+
+        async def client():
+            return await self.router._aclient("openai", http)
+
+        first = asyncio.run(client())
+
+        async def run():
+            second = await client()
+            self.assertIsNot(second, first)
+            self.assertEqual(len(self.router._aclients), 1)
+            await self.router.aclose()
+            return second
+
+        self.assertTrue(asyncio.run(run()).is_closed)
+        self.assertEqual(self.router._aclients, {})
+
+    def test_histogram_quantile(self):
+        histogram = LatencyHistogram()
+        for value in [10] * 90 + [900] * 10:
+            histogram.observe(value)
+        self.assertLessEqual(histogram.quantile(0.5), 25)
+        self.assertGreater(histogram.quantile(0.95), 750)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.retention import RetentionCompactor, list_segments
+from app.store import MemoryStore
+
+
+class RetentionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.store = MemoryStore(self.root / "memory.db")
+        self.archive = self.root / "archive"
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self._tmp.cleanup()
+
+    def backdate(self, table: str, column: str, day: str, ids: list[int]) -> None:
+        with self.store._write() as conn:
+            for row_id in ids:
+                conn.execute(f"UPDATE {table} SET {column} = ? WHERE id = ?", (f"{day}T10:00:00+00:00", row_id))
+
+    def test_expired_rows_move_to_daily_segments(self):
+        for i in range(5):
+            self.store.record_interaction("s", f"Nachricht {i}")
+        self.backdate("interaction_signals", "created_at", "2020-01-01", [1, 2])
+        self.backdate("interaction_signals", "created_at", "2020-01-02", [3])
+        queued = self.store.record_webhook("gh", {"text": "offen"}, status="queued")
+        self.backdate("webhook_events", "created_at", "2020-01-01", [queued])
+
+        compactor = RetentionCompactor(
+            self.store,
+            {"archive_dir": str(self.archive), "batch_size": 2, "tables": {"webhook_events": {"days": 1}}},
+        )
+        report = compactor.run_once()
+        self.assertEqual(report["tables"]["interaction_signals"]["archived"], 3)
+        self.assertEqual(report["tables"]["webhook_events"]["archived"], 0)
+        self.assertEqual(report["vacuum"]["auto_vacuum"], "incremental")
+        self.assertEqual(len(self.store.recent_interactions()), 2)
+        self.assertEqual([s["day"] for s in list_segments(self.archive, "interaction_signals")], ["2020-01-01", "2020-01-02"])
+
+        rows = compactor.read("interaction_signals", since="2020-01-02")
+        self.assertEqual([r["user_text"] for r in rows], ["Nachricht 2"])
+        self.assertEqual({r["id"] for r in self.store.search("Nachricht")["results"]}, {4, 5})
+
+    def test_tampered_audit_range_is_not_archived(self):
+        compactor = RetentionCompactor(self.store, {"archive_dir": str(self.archive)})
+        for i in range(3):
+            self.store.log_audit("a", "x", {"i": i}, "ok")
+        self.store.verify_audit_chain()
+        with self.store._write() as conn:
+            conn.execute("UPDATE audit_events SET result = 'error' WHERE id = 2")
+
+        result = compactor._archive_audit("2999-01-01")
+        self.assertEqual((result["archived"], result["error"]), (0, "chain broken at 2"))
+        self.assertEqual(len(self.store.recent_audit()), 3)
+        self.assertIsNone(self.store.audit_anchor())
+
+    def test_archived_audit_prefix_keeps_anchor(self):
+        compactor = RetentionCompactor(
+            self.store,
+            {"archive_dir": str(self.archive), "tables": {"interaction_signals": {"days": 0}, "audit_events": {"days": 1}}},
+        )
+        for i in range(3):
+            self.store.log_audit("a", "x", {"i": i}, "ok")
+        checkpoint = self.store.verify_audit_chain()["checkpoint"]
+        self.store.log_audit("a", "x", {"i": 3}, "ok")
+
+        result = compactor._archive_audit("2999-01-01")
+        self.assertEqual((result["archived"], result["checkpoint"]), (3, checkpoint["event_id"]))
+        self.assertEqual([r["id"] for r in self.store.recent_audit()], [4])
+
+        self.store._audit_tail = None
+        self.store.log_audit("a", "x", {"i": 4}, "ok")
+        full = self.store.verify_audit_chain(full=True)
+        self.assertEqual((full["ok"], full["count"]), (True, 5))
+        segment = list_segments(self.archive, "audit_events")[0]
+        self.assertEqual((segment["prev_hash"], segment["last_id"]), ("GENESIS", 3))
+        self.assertEqual(len(compactor.read("audit_events")), 3)
+
+    def test_live_vacuum_never_converts_existing_database(self):
+        legacy = MemoryStore(self.root / "legacy.db", {"auto_vacuum": "none"})
+        legacy.close()
+        store = MemoryStore(self.root / "legacy.db")
+        self.assertEqual(store.vacuum()["auto_vacuum"], "none")
+        self.assertTrue(store.convert_auto_vacuum())
+        self.assertEqual(store.vacuum()["auto_vacuum"], "incremental")
+        store.close()
+
+    def test_convert_is_an_explicit_audited_action(self):
+        legacy = MemoryStore(self.root / "legacy.db", {"auto_vacuum": "none"})
+        legacy.close()
+        store = MemoryStore(self.root / "legacy.db")
+        compactor = RetentionCompactor(store, {"archive_dir": str(self.archive)})
+        report = compactor.convert()
+        self.assertEqual((report["converted"], report["vacuum"]["auto_vacuum"]), (True, "incremental"))
+        self.assertEqual(store.recent_audit()[0]["action"], "convert_auto_vacuum")
+        self.assertFalse(compactor.convert()["converted"])
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
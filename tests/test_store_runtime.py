@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import sqlite3
 import tempfile
+import threading
 import unittest
 from pathlib import Path
 
+from app.audit import AuditMonitor
 from app.store import MemoryStore
 
 
@@ -17,6 +20,66 @@ class StoreRuntimeTests(unittest.TestCase):
             out = store.verify_audit_chain()
             self.assertTrue(out["ok"])
 
+    def test_audit_checkpoints_limit_incremental_verification(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MemoryStore(Path(tmp) / "memory.db")
+            for i in range(5):
+                store.log_audit("a", "x", {"i": i}, "ok")
+            first = store.verify_audit_chain(chunk_size=2)
+            self.assertEqual((first["count"], first["verified"]), (5, 5))
+
+            store.log_audit("b", "y", {}, "ok")
+            second = store.verify_audit_chain()
+            self.assertEqual((second["count"], second["verified"], second["checkpoint"]["event_id"]), (6, 1, 6))
+
+            with store._write() as conn:
+                conn.execute("UPDATE audit_events SET payload = '{\"i\": 9}' WHERE id = 2")
+            self.assertTrue(store.verify_audit_chain()["ok"])
+            full = store.verify_audit_chain(full=True, chunk_size=2)
+            self.assertEqual((full["ok"], full["broken_at"]), (False, 2))
+
+            with store._write() as conn:
+                conn.execute("UPDATE audit_checkpoints SET row_count = 99")
+            self.assertEqual(store.verify_audit_chain()["reason"], "checkpoint")
+            store.close()
+
+    def test_audit_checkpoints_are_throttled_and_pruned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MemoryStore(Path(tmp) / "memory.db")
+            store.log_audit("a", "x", {}, "ok")
+            self.assertEqual(store.verify_audit_chain()["checkpoint"]["event_id"], 1)
+            with store._write() as conn:
+                conn.execute("UPDATE audit_checkpoints SET archived_at = 'x'")
+            store.log_audit("a", "x", {}, "ok")
+            self.assertEqual(store.verify_audit_chain(checkpoint_every=3)["checkpoint"]["event_id"], 1)
+            store.log_audit("a", "x", {}, "ok")
+            store.log_audit("a", "x", {}, "ok")
+            self.assertEqual(store.verify_audit_chain(checkpoint_every=3)["checkpoint"]["event_id"], 4)
+
+            with store._write() as conn:
+                conn.execute("UPDATE audit_checkpoints SET created_at = '2020-01-01T00:00:00+00:00' WHERE event_id = 4")
+            for _ in range(3):
+                store.log_audit("a", "x", {}, "ok")
+                store.verify_audit_chain()
+            rows = store._read().execute("SELECT event_id, archived_at FROM audit_checkpoints ORDER BY id").fetchall()
+            self.assertEqual([(r["event_id"], r["archived_at"]) for r in rows], [(1, "x"), (4, None), (7, None)])
+            store.close()
+
+    def test_audit_monitor_keeps_failed_full_verify(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MemoryStore(Path(tmp) / "memory.db")
+            store.log_audit("a", "x", {}, "ok")
+            monitor = AuditMonitor(store, {"checkpoint_every": 1})
+            self.assertTrue(monitor.state()["ok"])
+
+            with store._write() as conn:
+                conn.execute("UPDATE audit_events SET actor = 'z' WHERE id = 1")
+            store.log_audit("b", "y", {}, "ok")
+            self.assertFalse(monitor.verify(full=True)["ok"])
+            self.assertTrue(monitor.verify()["ok"])
+            self.assertEqual(monitor.state()["broken_at"], 1)
+            store.close()
+
     def test_sessions_jobs_webhooks(self):
         with tempfile.TemporaryDirectory() as tmp:
             db = Path(tmp) / "memory.db"
@@ -30,6 +93,137 @@ class StoreRuntimeTests(unittest.TestCase):
             store.record_webhook("manual", {"x": 1})
             self.assertEqual(len(store.recent_webhooks()), 1)
 
+    def test_keyset_pagination_and_filter_indexes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MemoryStore(Path(tmp) / "memory.db")
+            self.assertGreaterEqual(store.schema_version(), 1)
+            for i in range(6):
+                store.record_interaction("a" if i % 2 else "b", f"u{i}")
+                store.log_audit("tester" if i < 4 else "other", "x", {"i": i}, "ok")
+
+            first = store.recent_interactions("a", limit=2)
+            self.assertEqual([r["user_text"] for r in first], ["u5", "u3"])
+            rest = store.recent_interactions("a", limit=2, before_id=first[-1]["id"])
+            self.assertEqual([r["user_text"] for r in rest], ["u1"])
+            newer = store.recent_interactions(limit=2, after_id=rest[0]["id"])
+            self.assertEqual([r["user_text"] for r in newer], ["u2", "u3"])
+
+            self.assertEqual(len(store.recent_audit(actor="tester")), 4)
+            self.assertEqual(store.recent_audit(since="2999-01-01"), [])
+            self.assertEqual(store.estimate_count("audit_events"), {"value": 6, "exact": False})
+            self.assertEqual(store.estimate_count("interaction_signals", session_id="a"), {"value": 3, "exact": True})
+
+            plan = " ".join(
+                r[3] for r in store._read().execute(
+                    "EXPLAIN QUERY PLAN SELECT id FROM interaction_signals WHERE session_id = ? ORDER BY id DESC", ("a",)
+                )
+            )
+            self.assertIn("idx_interaction_signals_session", plan)
+
+            store.create_session("s1")
+            store.create_session("s2")
+            page = store.list_sessions(limit=1)
+            cursor = f"{page[0]['last_active']}|{page[0]['session_id']}"
+            self.assertEqual(len(store.list_sessions(before=cursor)), len(store.list_sessions()) - 1)
+            store.close()
+
+    def test_full_text_search_follows_writes_and_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MemoryStore(Path(tmp) / "memory.db")
+            for i in range(5):
+                store.record_interaction("a" if i % 2 else "b", f"Wetter in Köln {i}", f"Regen über Koeln {i}")
+            store.log_audit("tester", "note", {"text": "koln gesperrt"}, "ok")
+            event_id = store.record_webhook("github", {"text": "Deploy nach Köln"})
+
+            seen, cursor = [], None
+            while True:
+                page = store.search("koln", limit=2, cursor=cursor)
+                seen += [(r["kind"], r["id"]) for r in page["results"]]
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+            self.assertEqual(len(seen), len(set(seen)))
+            self.assertEqual({k for k, _ in seen}, {"interactions", "audit", "webhooks"})
+            self.assertEqual(len(seen), 7)
+
+            only_a = store.search("wetter", session_id="a")["results"]
+            self.assertEqual({r["session_id"] for r in only_a}, {"a"})
+            self.assertIn("«Wetter in»", store.search('"wetter in"', kinds=["interactions"], limit=1)["results"][0]["snippet"])
+
+            with store._write() as conn:
+                conn.execute("DELETE FROM webhook_events WHERE id = ?", (event_id,))
+            self.assertEqual(store.search("deploy")["results"], [])
+            self.assertEqual(store.rebuild_search()["interactions"], 5)
+            store.close()
+
+    def test_usage_rollups(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MemoryStore(Path(tmp) / "memory.db")
+            store.record_usage("s1", "t1", "a1", "openai", "gpt", 100, 20, cached_tokens=40)
+            store.record_usage("s1", "t1", "a2", "openai", "gpt", 50, 10)
+            store.record_usage("s2", "t2", "a3", "ollama", "llama", 30, 5, estimated=True)
+
+            summary = store.usage_summary()
+            self.assertEqual(summary["totals"]["requests"], 3)
+            self.assertEqual(summary["totals"]["prompt_tokens"], 180)
+            self.assertEqual(summary["totals"]["estimated_requests"], 1)
+            openai = next(p for p in summary["providers"] if p["provider"] == "openai")
+            self.assertEqual((openai["completion_tokens"], openai["cached_tokens"]), (30, 40))
+            self.assertEqual(sum(h["requests"] for h in summary["hourly"]), 3)
+            self.assertEqual(store.usage_by_session("s1")[0]["prompt_tokens"], 150)
+            self.assertEqual(len(store.task_usage("t1")), 2)
+
+    def test_wal_readers_do_not_wait_for_writer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MemoryStore(Path(tmp) / "memory.db")
+            store.log_audit("a", "x", {"k": 1}, "ok")
+            self.assertEqual(store.stats()["journal_mode"], "wal")
+
+            seen: list[int] = []
+            with store._write() as conn:
+                conn.execute(
+                    "INSERT INTO audit_events(timestamp, actor, action, payload, result) VALUES('t','b','y','{}','ok')"
+                )
+                reader = threading.Thread(target=lambda: seen.append(len(store.recent_audit())))
+                reader.start()
+                reader.join(2)
+            self.assertEqual(seen, [1])
+            self.assertEqual(len(store.recent_audit()), 2)
+            self.assertEqual(store.stats()["readers"], 1)
+            with self.assertRaises(sqlite3.OperationalError):
+                store._read().execute("DELETE FROM audit_events")
+            store.close()
+
+    def test_group_commit_batches_and_flushes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "memory.db"
+            store = MemoryStore(db, group_commit={"enabled": True, "interval_ms": 50, "max_batch": 1000})
+
+            def burst(idx: int) -> None:
+                for n in range(20):
+                    store.record_interaction(f"s{idx}", f"msg {n}")
+
+            threads = [threading.Thread(target=burst, args=(i,)) for i in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(5)
+            with self.assertRaises(sqlite3.IntegrityError):
+                with store._write(batched=True) as conn:
+                    conn.execute("INSERT INTO preferences(key) VALUES('broken')")
+
+            store.log_audit("a", "x", {}, "ok", durable=True)
+            self.assertEqual(len(store.recent_audit()), 1)
+            self.assertEqual(len(store.recent_interactions(limit=500)), 80)
+            group = store.stats()["group_commit"]
+            self.assertLess(group["grouped_commits"], group["grouped_writes"])
+
+            store.record_interaction("late", "vor dem Shutdown")
+            store.close()
+            reopened = MemoryStore(db)
+            self.assertEqual(len(reopened.recent_interactions("late")), 1)
+            reopened.close()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from app import style as style_mod
+
+
+class StyleBufferTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "style_profile.json"
+        style_mod.load_or_create(self.path)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def samples(self) -> int:
+        return json.loads(self.path.read_text(encoding="utf-8"))["samples_seen"]
+
+    def test_record_batches_until_threshold(self):
+        flushed: list[dict] = []
+        buffer = style_mod.StyleBuffer(self.path, {"flush_every": 3}, on_flush=flushed.append)
+        signal = style_mod.analyze_text("Mach das bitte direkt.")
+        buffer.record(signal)
+        buffer.record(signal)
+        self.assertEqual(self.samples(), 0)
+        buffer.record(signal)
+        self.assertEqual(self.samples(), 3)
+        self.assertEqual(len(flushed), 1)
+        self.assertEqual(buffer.stats()["pending"], 0)
+
+    def test_batched_blend_matches_sequential_blend(self):
+        texts = ["Hallo du, bitte schnell.", "Could you check this?", "Danke! Jetzt direkt."]
+        expected = dict(style_mod.DEFAULT_STYLE)
+        for text in texts:
+            expected = style_mod.blend_style(expected, style_mod.analyze_text(text))
+
+        buffer = style_mod.StyleBuffer(self.path, {"flush_every": 100})
+        for text in texts:
+            buffer.record(style_mod.analyze_text(text))
+        buffer.flush()
+        self.assertEqual(json.loads(self.path.read_text(encoding="utf-8")), expected)
+
+    def test_background_flusher_and_stop(self):
+        buffer = style_mod.StyleBuffer(self.path, {"flush_interval": 0.05, "flush_every": 100})
+        buffer.start()
+        buffer.record(style_mod.analyze_text("Hallo"))
+        deadline = time.monotonic() + 2
+        while self.samples() == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.samples(), 1)
+        buffer.record(style_mod.analyze_text("Noch eins"))
+        buffer.stop()
+        self.assertEqual(self.samples(), 2)
+        self.assertFalse(buffer.stats()["running"])
+
+
+if __name__ == "__main__":
+    unittest.main()
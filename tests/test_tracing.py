@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.message_bus import LocalMessageBus
+from app.orchestrator import Orchestrator
+from app.store import MemoryStore, default_paths
+from app.tracing import NULL_SPAN, Span, Tracer, span, to_otlp
+from tests.test_orchestrator import TASK, FakeProvider
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.paths = default_paths(str(root / "data"))
+        self.store = MemoryStore(self.paths.db)
+        self.export_dir = root / "traces"
+        cfg = {
+            "agents": {"max_active": 4},
+            "pipelines": {"mode": "parallel", "max_retries": 0},
+            "tracing": {"export_dir": str(self.export_dir)},
+        }
+        (root / "config.json").write_text(json.dumps(cfg), encoding="utf-8")
+        self.orchestrator = Orchestrator(
+            store=self.store,
+            paths=self.paths,
+            provider=FakeProvider(delay=0.01),
+            config_path=root / "config.json",
+            bus=LocalMessageBus(),
+        )
+
+    def tearDown(self) -> None:
+        self.orchestrator.stage_cache.close()
+        self.store.conn.close()
+        self._tmp.cleanup()
+
+    def assert_pipeline_trace(self, trace: dict) -> None:
+        spans = {s["span_id"]: s for s in trace["spans"]}
+        names = [s["name"] for s in trace["spans"]]
+        self.assertEqual(names[0], "process_user_message")
+        self.assertEqual(names.count("stage"), 3)
+        self.assertEqual(names.count("stage.attempt"), 3)
+        self.assertEqual(names.count("provider.call"), 4)
+        self.assertIn("context.build", names)
+        self.assertIn("store.write", names)
+        for s in trace["spans"]:
+            if s["name"] == "stage.attempt":
+                self.assertEqual(spans[s["parent_id"]]["name"], "stage")
+            if s["name"] == "provider.call":
+                self.assertEqual(s["attributes"]["prompt_tokens"], 3)
+
+    def test_sync_pipeline_spans_cross_worker_threads(self):
+        out = self.orchestrator.process_user_message("s", TASK)
+        self.assert_pipeline_trace(self.orchestrator.tracer.get(out["task_id"]))
+
+    def test_async_trace_is_persisted_and_exported(self):
+        out = asyncio.run(self.orchestrator.aprocess_user_message("s", TASK))
+        stored = Tracer(self.store).get(out["task_id"])
+        self.assert_pipeline_trace(stored)
+
+        exported = json.loads((self.export_dir / f"{out['task_id']}.otlp.json").read_text(encoding="utf-8"))
+        otlp_spans = exported["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual(len(otlp_spans), stored["span_count"])
+        self.assertEqual({s["traceId"] for s in otlp_spans}, {stored["trace_id"]})
+
+    def test_span_outside_trace_is_noop(self):
+        with span("idle") as s:
+            s.set(x=1)
+        self.assertIs(s, NULL_SPAN)
+        self.assertEqual(to_otlp({"task_id": "t", "trace_id": "x", "spans": []})["resourceSpans"][0]["scopeSpans"][0]["spans"], [])
+
+    def test_late_spans_are_flagged_and_old_spans_pruned(self):
+        tracer = self.orchestrator.tracer
+        with tracer.trace("t1", "root"):
+            pass
+        trace = tracer._traces["t1"]
+        trace.add(Span(trace.trace_id, "late", None, "stage"))
+        data = tracer.get("t1")
+        self.assertEqual((data["span_count"], data["late_spans"]), (1, 1))
+
+        tracer.span_ttl_days = 1e-12
+        self.assertEqual(tracer.prune(force=True), 1)
+        self.assertIsNone(Tracer(self.store).get("t1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
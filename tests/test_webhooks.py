@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from app.message_bus import LocalMessageBus
+from app.orchestrator import Orchestrator
+from app.store import MemoryStore, default_paths
+from app.webhooks import RedisWebhookQueue, SQLiteWebhookQueue, WebhookIngest
+from tests.test_orchestrator import FakeProvider
+
+
+class BrokenProvider(FakeProvider):
+    async def agenerate_result(self, system_prompt: str, user_prompt: str, use_cache: bool = True):
+        raise RuntimeError("provider down")
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, dict[str, str]] = {}
+
+    def hset(self, key: str, field: str | None = None, value: str | None = None, mapping: dict | None = None) -> None:
+        items = self.data.setdefault(key, {})
+        if field is not None:
+            items[field] = value
+        items.update(mapping or {})
+
+    def hvals(self, key: str) -> list[str]:
+        return list(self.data.get(key, {}).values())
+
+    def hdel(self, key: str, *fields: str) -> None:
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+
+class WebhookIngestTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.paths = default_paths(str(root / "data"))
+        self.store = MemoryStore(self.paths.db)
+        (root / "config.json").write_text(json.dumps({"agents": {"max_active": 2}}), encoding="utf-8")
+        self.provider = FakeProvider(delay=0.02)
+        self.orchestrator = Orchestrator(
+            store=self.store,
+            paths=self.paths,
+            provider=self.provider,
+            config_path=root / "config.json",
+            bus=LocalMessageBus(),
+        )
+
+    def tearDown(self) -> None:
+        self.store.conn.close()
+        self._tmp.cleanup()
+
+    def drain(self, ingest: WebhookIngest, submit: list[tuple[str, dict]]) -> dict:
+        async def run() -> dict:
+            await ingest.start()
+            try:
+                for source, payload in submit:
+                    await ingest.asubmit(source, payload)
+                for _ in range(500):
+                    if not self.store.webhook_backlog():
+                        break
+                    await asyncio.sleep(0.01)
+                return ingest.stats()
+            finally:
+                await ingest.stop()
+
+        return asyncio.run(run())
+
+    def test_submit_persists_before_processing(self):
+        ingest = WebhookIngest(SQLiteWebhookQueue(self.store), lambda: self.orchestrator)
+        event = asyncio.run(ingest.asubmit("github", {"text": "Push"}))
+        self.assertEqual(self.store.webhook_backlog()[0]["id"], event["id"])
+        self.assertEqual(self.store.recent_interactions("webhook:github"), [])
+
+        stats = self.drain(ingest, [])
+        self.assertEqual(stats["sources"]["github"]["processed"], 1)
+        self.assertEqual(self.store.recent_webhooks()[0]["status"], "done")
+
+    def test_event_accepted_during_backlog_load_runs_once(self):
+        class SlowQueue(SQLiteWebhookQueue):
+            def backlog(self):
+                time.sleep(0.05)
+                return super().backlog()
+
+        ingest = WebhookIngest(SlowQueue(self.store), lambda: self.orchestrator)
+
+        async def run() -> dict:
+            starting = asyncio.create_task(ingest.start())
+            await asyncio.sleep(0.01)
+            await ingest.asubmit("github", {"text": "Push"})
+            await starting
+            for _ in range(500):
+                if not self.store.webhook_backlog():
+                    break
+                await asyncio.sleep(0.01)
+            await ingest.stop()
+            return ingest.stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["sources"]["github"]["processed"], 1)
+        self.assertEqual(len(self.store.recent_interactions("webhook:github")), 1)
+
+    def test_burst_is_coalesced_into_one_run(self):
+        ingest = WebhookIngest(
+            SQLiteWebhookQueue(self.store),
+            lambda: self.orchestrator,
+            {"sources": {"github": {"coalesce_window": 0.05}}},
+        )
+        stats = self.drain(ingest, [("github", {"text": f"Push {i}"}) for i in range(5)])
+        self.assertEqual(stats["sources"]["github"]["processed"], 5)
+        self.assertEqual(stats["sources"]["github"]["runs"], 1)
+        self.assertIn("5 Ereignisse", self.store.recent_interactions("webhook:github")[0]["user_text"])
+
+    def test_per_source_limit_and_failures(self):
+        self.orchestrator.provider = BrokenProvider()
+        ingest = WebhookIngest(
+            SQLiteWebhookQueue(self.store),
+            lambda: self.orchestrator,
+            {"max_attempts": 2, "retry_delay": 0},
+        )
+        stats = self.drain(ingest, [("a", {"text": "x"}), ("a", {"text": "y"}), ("b", {"text": "z"})])
+        self.assertEqual(stats["sources"]["a"]["max_per_source"], 1)
+        self.assertEqual((stats["sources"]["a"]["failed"], stats["sources"]["a"]["retried"]), (2, 2))
+        self.assertEqual({e["status"] for e in self.store.recent_webhooks()}, {"failed"})
+        self.assertEqual({e["attempts"] for e in self.store.recent_webhooks()}, {2})
+
+    def test_redis_retry_attempts_survive_restart(self):
+        queue = RedisWebhookQueue(self.store, "redis://localhost:6379/0")
+        queue._redis = FakeRedis()
+        event = queue.push("gh", {"text": "x"})
+        event["attempts"] = 1
+        queue.mark([event], "queued", error="boom")
+
+        restarted = RedisWebhookQueue(self.store, "redis://localhost:6379/0")
+        restarted._redis = queue._redis
+        backlog = restarted.backlog()
+        self.assertEqual((backlog[0]["id"], backlog[0]["attempts"], backlog[0]["error"]), (event["id"], 1, "boom"))
+
+
+if __name__ == "__main__":
+    unittest.main()